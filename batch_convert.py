@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+批量将Markdown文件转换为DOCX
+
+用进程池把多个文件分发给各个 CPU 核心，每个工作进程只导入一次转换器。
+结果按输入顺序逐个输出，单个文件失败不会影响其他文件；
+工作进程崩溃（被 OOM 杀掉、段错误等）时，只把当时正在转换的几个文件放进单进程池逐个重跑，
+让进程崩溃的那个文件记为失败，其余文件换新进程池照常并行转换。
+
+用法：
+    python batch_convert.py 'articles/**/*.md' --workers 8 --out-dir docx
+    python batch_convert.py --manifest manifest.txt --converter word
+    python batch_convert.py 'articles/*.md' --profile profile.json --trace-memory
+    python batch_convert.py 'articles/*.md' --compression fast     # 用体积换速度
+
+清单文件每行一个 Markdown 路径，可用制表符追加输出路径，# 开头为注释。
+--profile 把每个文件的分阶段耗时、计数（见 instrument.py）和汇总写成 JSON。
+"""
+import argparse
+import contextlib
+import glob
+import importlib
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from docx_save import COMPRESSION, SPOOLS, SaveOptions
+from image_embed import ImageOptions
+from instrument import Instrument
+
+# 转换器名 -> (模块, 函数)
+CONVERTERS = {
+    'final': ('convert_final', 'markdown_to_docx'),
+    'article': ('convert_updated_article', 'markdown_to_docx'),
+    'word': ('generate_word', 'markdown_to_docx'),
+    'update': ('convert_update', 'parse_markdown_to_docx'),
+}
+
+
+def _load_converter(name):
+    module_name, func_name = CONVERTERS[name]
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _init_worker(converter):
+    """工作进程启动时预先导入转换器（docx、lxml 等只导入一次）"""
+    _load_converter(converter)
+
+
+def convert_one(job):
+    """
+    转换单个文件，返回结果字典；转换器自身的输出被吞掉，异常记录在结果里
+
+    job 为 (转换器, 输入, 输出, 剖析方式, 保存选项, 图片选项)，剖析方式为 None、'time' 或 'memory'，
+    保存选项为 docx_save.SaveOptions 或 None，图片选项为 image_embed.ImageOptions 或 None；开启剖析时结果里带 'profile'
+    （instrument.Instrument.report() 的内容）。成功时 'bytes' 为输出文件大小。
+    """
+    converter, md_file, docx_file, profile, save, images = job
+    result = {'input': md_file, 'output': docx_file, 'ok': False, 'error': None}
+    instrument = Instrument(trace_memory=profile == 'memory') if profile else None
+    start = time.perf_counter()
+    try:
+        func = _load_converter(converter)
+        with contextlib.redirect_stdout(io.StringIO()):
+            kwargs = {}
+            if instrument is not None:
+                kwargs['instrument'] = instrument
+            if save is not None:
+                kwargs['save'] = save
+            if images is not None:
+                kwargs['images'] = images
+            func(md_file, docx_file, **kwargs)
+        result['ok'] = True
+        result['bytes'] = os.path.getsize(docx_file)
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+    result['seconds'] = time.perf_counter() - start
+    if instrument is not None:
+        result['profile'] = instrument.report()
+    return result
+
+
+def _crashed(job):
+    """转换时工作进程意外退出的文件的结果字典"""
+    md_file, docx_file = job[1:3]
+    return {'input': md_file, 'output': docx_file, 'ok': False,
+            'error': 'BrokenProcessPool: 转换时工作进程意外退出', 'seconds': 0.0}
+
+
+def _run_isolated(jobs, indices, converter):
+    """
+    在单进程池里按顺序转换 indices 指定的文件，产出 (下标, 结果)
+
+    只有一个工作进程时第一个中断的就是让进程崩溃的文件，记为失败，其后的文件换新进程池继续。
+    """
+    pending = list(indices)
+    while pending:
+        with ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(converter,)) as pool:
+            futures = [(i, pool.submit(convert_one, jobs[i])) for i in pending]
+            pending = []
+            for n, (i, future) in enumerate(futures):
+                try:
+                    yield i, future.result()
+                except BrokenProcessPool:
+                    yield i, _crashed(jobs[i])
+                    pending = [j for j, _ in futures[n + 1:]]
+                    break
+
+
+def _run_pool(jobs, workers, converter):
+    """
+    用 workers 个进程转换 jobs，按完成顺序产出 (下标, 结果)
+
+    同时提交的任务不超过 workers 个，进程池崩溃时正在转换的就是这几个：
+    把它们交给 _run_isolated 找出元凶，剩下的文件在新进程池里恢复并行。
+    """
+    queue = deque(range(len(jobs)))
+    while queue:
+        suspects = []
+        size = min(workers, len(queue))
+        with ProcessPoolExecutor(max_workers=size, initializer=_init_worker, initargs=(converter,)) as pool:
+            running = {}
+            while queue or running:
+                while queue and len(running) < size:
+                    i = queue.popleft()
+                    running[pool.submit(convert_one, jobs[i])] = i
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    try:
+                        yield i, future.result()
+                    except BrokenProcessPool:
+                        suspects.append(i)
+                if suspects:
+                    # 进程池已经坏了：其余在跑的任务要么刚好完成，要么也一起中断
+                    for future in wait(running)[0]:
+                        i = running.pop(future)
+                        try:
+                            yield i, future.result()
+                        except BrokenProcessPool:
+                            suspects.append(i)
+                    break
+        if suspects:
+            yield from _run_isolated(jobs, sorted(suspects), converter)
+
+
+def expand_inputs(patterns):
+    """展开通配符（支持 **），去重并保持顺序"""
+    seen = set()
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if path not in seen:
+                seen.add(path)
+                files.append(path)
+    return files
+
+
+def read_manifest(manifest_file):
+    """读取清单文件，返回 [(输入, 输出或None)]"""
+    pairs = []
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            src, _, dst = line.partition('\t')
+            pairs.append((src.strip(), dst.strip() or None))
+    return pairs
+
+
+def output_path(md_file, out_dir=None):
+    """默认输出：同目录同名 .docx；指定 out_dir 时放到该目录下"""
+    stem = os.path.splitext(os.path.basename(md_file))[0] + '.docx'
+    if out_dir:
+        return os.path.join(out_dir, stem)
+    return os.path.join(os.path.dirname(md_file), stem)
+
+
+def batch_convert(pairs, converter='final', workers=None, profile=None, save=None, images=None):
+    """
+    批量转换 [(输入, 输出)]，按输入顺序逐个产出结果字典
+
+    workers 为 1 时在当前进程内顺序转换，否则使用进程池（默认 CPU 核数）。
+    profile 为 'time' 或 'memory' 时记录每个文件的分阶段剖析结果；
+    save 为 docx_save.SaveOptions，指定压缩方式和组装方式；未指定压缩线程数时
+    按进程数平分 CPU 核数，避免进程池和压缩线程池一起超额占用 CPU。
+    images 为 image_embed.ImageOptions，指定图片缩放的分辨率和 JPEG 质量。
+    """
+    workers = workers or os.cpu_count() or 1
+    save = save or SaveOptions()
+    if save.workers is None:
+        processes = min(workers, len(pairs)) or 1
+        save = save._replace(workers=max(1, (os.cpu_count() or 1) // processes))
+    jobs = [(converter, src, dst, profile, save, images) for src, dst in pairs]
+    if workers == 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield convert_one(job)
+        return
+
+    # 结果先按下标收下，凑齐前面的再按输入顺序产出
+    results = {}
+    next_index = 0
+    for i, result in _run_pool(jobs, workers, converter):
+        results[i] = result
+        while next_index in results:
+            yield results.pop(next_index)
+            next_index += 1
+
+
+def summarize_profiles(results):
+    """把各文件的剖析结果按阶段和计数器累加"""
+    stages = {}
+    counters = {}
+    for result in results:
+        report = result.get('profile')
+        if not report:
+            continue
+        for name, stage in report['stages'].items():
+            total = stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+            total['seconds'] += stage['seconds']
+            total['calls'] += stage['calls']
+        for name, value in report['counters'].items():
+            counters[name] = counters.get(name, 0) + value
+    for stage in stages.values():
+        stage['seconds'] = round(stage['seconds'], 6)
+    return {
+        'stages': dict(sorted(stages.items(), key=lambda item: -item[1]['seconds'])),
+        'counters': dict(sorted(counters.items())),
+    }
+
+
+def write_profile(path, results, converter, elapsed):
+    report = {
+        'converter': converter,
+        'wall_seconds': round(elapsed, 6),
+        'summary': summarize_profiles(results),
+        'files': [{key: result[key] for key in ('input', 'ok', 'seconds', 'bytes', 'profile') if key in result}
+                  for result in results],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量将Markdown文件转换为DOCX')
+    parser.add_argument('inputs', nargs='*', help='Markdown 文件或通配符（支持 **）')
+    parser.add_argument('-m', '--manifest', help='清单文件，每行一个输入路径，可用制表符追加输出路径')
+    parser.add_argument('-o', '--out-dir', help='输出目录（默认与输入文件同目录）')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='工作进程数（默认 CPU 核数）')
+    parser.add_argument('-c', '--converter', choices=sorted(CONVERTERS), default='final',
+                        help='使用的转换器（默认 final）')
+    parser.add_argument('--profile', metavar='JSON', help='把分阶段耗时和计数写入该 JSON 文件')
+    parser.add_argument('-z', '--compression', choices=list(COMPRESSION), default='default',
+                        help='压缩方式：store 不压缩最快，max 体积最小（默认 default）')
+    parser.add_argument('--spool', choices=SPOOLS, default='memory',
+                        help='先在内存还是临时文件里组装 zip，最后都原子替换目标文件（默认 memory）')
+    parser.add_argument('--zip-threads', type=int, default=None,
+                        help='每个文件的压缩线程数（默认按进程数平分 CPU 核数）')
+    parser.add_argument('--image-dpi', type=int, default=ImageOptions().dpi,
+                        help='图片缩到版心宽度时的分辨率（默认 %(default)s）')
+    parser.add_argument('--image-quality', type=int, default=ImageOptions().quality,
+                        help='图片重新压缩的 JPEG 质量 1-95（默认 %(default)s）')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='剖析时同时用 tracemalloc 记录各阶段峰值内存（较慢）')
+    args = parser.parse_args(argv)
+
+    pairs = [(src, None) for src in expand_inputs(args.inputs)]
+    if args.manifest:
+        pairs.extend(read_manifest(args.manifest))
+    if not pairs:
+        parser.error('没有找到要转换的文件')
+    pairs = [(src, dst or output_path(src, args.out_dir)) for src, dst in pairs]
+
+    outputs = [dst for _, dst in pairs]
+    if len(set(outputs)) != len(outputs):
+        parser.error('多个输入会写到同一个输出文件，请改用清单指定输出路径')
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    profile = None
+    if args.profile:
+        profile = 'memory' if args.trace_memory else 'time'
+
+    save = SaveOptions(args.compression, args.spool, args.zip_threads)
+    images = ImageOptions(args.image_dpi, args.image_quality)
+
+    start = time.perf_counter()
+    failed = 0
+    total_bytes = 0
+    results = []
+    for i, result in enumerate(batch_convert(pairs, args.converter, args.workers, profile, save, images), 1):
+        results.append(result)
+        if result['ok']:
+            total_bytes += result['bytes']
+            print(f"✅ [{i}/{len(pairs)}] {result['input']} -> {result['output']} "
+                  f"({result['seconds']:.2f}s, {result['bytes'] / 1024:.1f} KB)")
+        else:
+            failed += 1
+            print(f"❌ [{i}/{len(pairs)}] {result['input']}: {result['error']}")
+    elapsed = time.perf_counter() - start
+
+    print(f"\n共 {len(pairs)} 个文件，成功 {len(pairs) - failed}，失败 {failed}，耗时 {elapsed:.2f}s，"
+          f"写出 {total_bytes / 1024 / 1024:.2f} MB（压缩方式 {args.compression}）")
+
+    if args.profile:
+        write_profile(args.profile, results, args.converter, elapsed)
+        print(f"📊 剖析结果已写入: {args.profile}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""
+Markdown→DOCX 转换器基准测试
+
+按固定随机种子生成 10KB～50MB 的 Markdown 语料（中文正文、围栏代码、表格、列表混排），
+对每个转换器分别计时 解析 / 构建 / 保存 三个阶段，并用 tracemalloc 记录峰值内存。
+结果写成 JSON；指定基线时与基线比较吞吐量，下降超过阈值则以退出码 1 结束。
+
+用法：
+    python bench_converters.py                             # 默认语料规模，全部转换器
+    python bench_converters.py -s 10KB 1MB -c final word   # 指定规模和转换器
+    python bench_converters.py --save-baseline             # 把本次结果写成基线
+    python bench_converters.py --threshold 0.15            # 吞吐量下降超过 15% 判为退化
+
+构建阶段测的是冷启动渲染：不经过章节缓存和代码高亮的磁盘缓存，每次计时前清空进程内的
+高亮结果和拆解好的模板；样式模板本身在计时前预先构建好。
+"""
+import argparse
+import gc
+import importlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import code_highlight
+from batch_convert import CONVERTERS
+from doc_builder import DocxBuilder
+from md_tokenizer import iter_file_blocks
+from ooxml_writer import XmlBuilder, read_template, write_package
+from section_cache import CACHE_DIR, iter_sections, write_atomic
+from style_template import get_template, new_document
+
+# 语料生成规则变化时递增，旧语料自动重新生成
+CORPUS_VERSION = 1
+DEFAULT_SIZES = ['10KB', '100KB', '1MB', '10MB', '50MB']
+DEFAULT_BASELINE = 'bench_baseline.json'
+
+_UNITS = {'KB': 1024, 'MB': 1024 * 1024, 'B': 1}
+
+_WORDS = [
+    '多语言', '编程助手', '代码生成', '评测', '开发者', '模型', '上下文', '重构', '性能',
+    '并发', '内存安全', '类型系统', '错误处理', '依赖注入', '单元测试', '接口', '协程',
+    '异步', '编译器', '运行时', '生态', '工程实践', '可维护性', '推理能力', '长文本',
+    '后端服务', '移动端', '前端框架', '数据库', '缓存', '部署', '日志', '监控',
+]
+_CONNECTORS = ['在', '对于', '通过', '结合', '针对', '围绕', '随着', '基于']
+_VERBS = ['提升了', '体现了', '验证了', '改善了', '暴露了', '决定了', '影响了', '简化了']
+_PUNCT = ['，', '，', '；', '。']
+
+_CODE_SNIPPETS = {
+    'go': '''func (s *Service) Handle(ctx context.Context, req *Request) (*Response, error) {
+    if err := req.Validate(); err != nil {
+        return nil, fmt.Errorf("invalid request: %w", err)
+    }
+    user, err := s.repo.Find(ctx, req.UserID)
+    if err != nil {
+        return nil, err
+    }
+    return &Response{User: user, Items: make([]Item, 0, {n})}, nil
+}''',
+    'rust': '''pub fn parse_config(input: &str) -> Result<Config, ConfigError> {
+    let mut config = Config::default();
+    for (line_no, line) in input.lines().enumerate() {
+        let (key, value) = line.split_once('=').ok_or(ConfigError::Syntax(line_no))?;
+        config.set(key.trim(), value.trim())?;
+    }
+    config.retries = {n};
+    Ok(config)
+}''',
+    'swift': '''struct EpisodeListView: View {
+    @StateObject private var model = EpisodeListModel(pageSize: {n})
+
+    var body: some View {
+        List(model.episodes) { episode in
+            EpisodeRow(episode: episode)
+                .task { await model.loadMoreIfNeeded(current: episode) }
+        }
+        .refreshable { await model.reload() }
+    }
+}''',
+    'kotlin': '''class PlayerViewModel(private val repo: EpisodeRepository) : ViewModel() {
+    private val _state = MutableStateFlow(PlayerState())
+    val state: StateFlow<PlayerState> = _state
+
+    fun play(id: Long) = viewModelScope.launch {
+        val episode = repo.load(id) ?: return@launch
+        _state.update { it.copy(current = episode, bufferSize = {n}) }
+    }
+}''',
+    'typescript': '''export async function fetchEpisodes(podcastId: string, limit = {n}): Promise<Episode[]> {
+  const res = await fetch(`/api/podcasts/${podcastId}/episodes?limit=${limit}`);
+  if (!res.ok) {
+    throw new Error(`request failed: ${res.status}`);
+  }
+  const data: { items: Episode[] } = await res.json();
+  return data.items.filter((e) => e.published);
+}''',
+}
+
+
+def parse_size(text):
+    """'10KB' / '1.5MB' / '2048' -> 字节数"""
+    text = text.strip().upper()
+    for unit, factor in _UNITS.items():
+        if text.endswith(unit) and text[:-len(unit)]:
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def format_size(size):
+    if size >= _UNITS['MB'] and size % _UNITS['MB'] == 0:
+        return f'{size // _UNITS["MB"]}MB'
+    if size >= _UNITS['KB'] and size % _UNITS['KB'] == 0:
+        return f'{size // _UNITS["KB"]}KB'
+    return f'{size}B'
+
+
+def _sentence(rng):
+    words = [rng.choice(_CONNECTORS)]
+    for _ in range(rng.randint(3, 7)):
+        word = rng.choice(_WORDS)
+        roll = rng.random()
+        if roll < 0.08:
+            word = f'**{word}**'
+        elif roll < 0.12:
+            word = f'`{rng.choice(list(_CODE_SNIPPETS))}`'
+        elif roll < 0.14:
+            word = f'[{word}](https://example.com/{rng.randint(1, 999)})'
+        words.append(word)
+        words.append(rng.choice(_VERBS) if rng.random() < 0.3 else '')
+    return ''.join(words) + rng.choice(_PUNCT)
+
+
+def _paragraph(rng):
+    return ''.join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+
+
+def _table(rng):
+    cols = rng.randint(3, 5)
+    lines = ['| ' + ' | '.join(rng.choice(_WORDS) for _ in range(cols)) + ' |',
+             '|' + '|'.join(rng.choice([':---', ':---:', '---:', '---']) for _ in range(cols)) + '|']
+    for _ in range(rng.randint(3, 8)):
+        cells = [rng.choice(_WORDS) if rng.random() < 0.6 else f'{rng.uniform(0, 100):.1f}%'
+                 for _ in range(cols)]
+        lines.append('| ' + ' | '.join(cells) + ' |')
+    return '\n'.join(lines)
+
+
+def _list(rng):
+    lines = []
+    ordered = rng.random() < 0.3
+    for i in range(rng.randint(3, 7)):
+        marker = f'{i + 1}.' if ordered else '-'
+        lines.append(f'{marker} {_sentence(rng)}')
+        if rng.random() < 0.25:
+            lines.append(f'  - {_sentence(rng)}')
+    return '\n'.join(lines)
+
+
+def _code(rng):
+    lang = rng.choice(list(_CODE_SNIPPETS))
+    # 少量变化让代码块内容不完全重复，但大部分仍能命中高亮缓存
+    code = _CODE_SNIPPETS[lang].replace('{n}', str(rng.randint(1, 16)))
+    return f'```{lang}\n{code}\n```'
+
+
+def generate_corpus(size, seed=0):
+    """生成约 size 字节（UTF-8）的 Markdown 文本，同样的 size 和 seed 结果完全相同"""
+    rng = random.Random(f'{seed}:{size}')
+    parts = ['# 多语言编程助手评测语料\n']
+    total = len(parts[0].encode('utf-8'))
+    section = 0
+    while total < size:
+        roll = rng.random()
+        if roll < 0.08:
+            section += 1
+            block = f'## {section}. {rng.choice(_WORDS)}与{rng.choice(_WORDS)}'
+        elif roll < 0.12:
+            block = f'### {rng.choice(_WORDS)}'
+        elif roll < 0.55:
+            block = _paragraph(rng)
+        elif roll < 0.70:
+            block = _list(rng)
+        elif roll < 0.82:
+            block = _code(rng)
+        elif roll < 0.92:
+            block = _table(rng)
+        else:
+            block = '> ' + _sentence(rng)
+        block += '\n\n'
+        parts.append(block)
+        total += len(block.encode('utf-8'))
+    return ''.join(parts)
+
+
+def corpus_path(size, seed=0, cache_dir=CACHE_DIR):
+    """语料文件落盘在缓存目录下，已存在则直接复用"""
+    path = os.path.join(cache_dir, 'bench', f'corpus-v{CORPUS_VERSION}-{seed}-{format_size(size)}.md')
+    if not os.path.exists(path):
+        write_atomic(path, generate_corpus(size, seed).encode('utf-8'))
+    return path
+
+
+def _load(converter):
+    module_name, _ = CONVERTERS[converter]
+    return importlib.import_module(module_name)
+
+
+def _clear_memory_caches():
+    """清空上一次转换留下的进程内缓存，每次计时都从冷状态开始"""
+    code_highlight._memory.clear()
+    read_template.cache_clear()
+
+
+def run_phases(module, md_file, engine='fast', cache_dir=CACHE_DIR):
+    """执行一次完整转换并分别计时，返回 ({阶段: 秒}, 块数, 输出字节数)；cache_dir 只用于样式模板"""
+    _clear_memory_caches()
+    name = module.CONVERTER_VERSION
+    timings = {}
+
+    start = time.perf_counter()
+    blocks = list(iter_file_blocks(md_file))
+    timings['parse'] = time.perf_counter() - start
+
+    out = io.BytesIO()
+    if engine == 'fast':
+        template = read_template(get_template(name, module.setup_styles, cache_dir))
+        start = time.perf_counter()
+        builder = XmlBuilder(template)
+        fragments = []
+        for section in iter_sections(blocks):
+            module.render_blocks(builder, section, cache_dir=None)
+            fragments.append(builder.take())
+        timings['build'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        write_package(template, fragments, out)
+        timings['save'] = time.perf_counter() - start
+    else:
+        get_template(name, module.setup_styles, cache_dir)
+        start = time.perf_counter()
+        doc = new_document(name, module.setup_styles, cache_dir)
+        module.render_blocks(DocxBuilder(doc), blocks, cache_dir=None)
+        timings['build'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        doc.save(out)
+        timings['save'] = time.perf_counter() - start
+
+    return timings, len(blocks), out.tell()
+
+
+def bench_one(converter, md_file, engine='fast', repeat=3, cache_dir=CACHE_DIR):
+    """对一个转换器和一份语料计时（各阶段取 repeat 次中的最小值），再单独跑一次测峰值内存"""
+    module = _load(converter)
+    size = os.path.getsize(md_file)
+
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        timings, blocks, output_bytes = run_phases(module, md_file, engine, cache_dir)
+        if best is None:
+            best = timings
+        else:
+            best = {phase: min(best[phase], seconds) for phase, seconds in timings.items()}
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run_phases(module, md_file, engine, cache_dir)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    total = sum(best.values())
+    return {
+        'converter': converter,
+        'engine': engine,
+        'input_bytes': size,
+        'blocks': blocks,
+        'output_bytes': output_bytes,
+        'phases': {phase: round(seconds, 6) for phase, seconds in best.items()},
+        'total_seconds': round(total, 6),
+        'throughput_mb_s': round(size / _UNITS['MB'] / total, 3) if total else None,
+        'peak_memory_mb': round(peak / _UNITS['MB'], 2),
+    }
+
+
+def result_key(result):
+    return f"{result['converter']}/{result['engine']}/{format_size(result['size'])}"
+
+
+def compare(results, baseline, threshold, min_seconds=0.05):
+    """
+    返回吞吐量相对基线下降超过 threshold 的条目 [(键, 基线, 当前)]
+
+    耗时不到 min_seconds 的小语料测量噪声太大，不参与比较。
+    """
+    previous = {result_key(r): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        old = previous.get(result_key(result))
+        if not old or not old.get('throughput_mb_s') or not result['throughput_mb_s']:
+            continue
+        if min(old['total_seconds'], result['total_seconds']) < min_seconds:
+            continue
+        if result['throughput_mb_s'] < old['throughput_mb_s'] * (1 - threshold):
+            regressions.append((result_key(result), old['throughput_mb_s'], result['throughput_mb_s']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Markdown→DOCX 转换器基准测试')
+    parser.add_argument('-s', '--sizes', nargs='+', default=DEFAULT_SIZES,
+                        help='语料规模，如 10KB 1MB 50MB（默认 %(default)s）')
+    parser.add_argument('-c', '--converters', nargs='+', choices=sorted(CONVERTERS),
+                        default=sorted(CONVERTERS), help='参与测试的转换器（默认全部）')
+    parser.add_argument('-e', '--engine', choices=['fast', 'docx'], default='fast',
+                        help='fast 为直接写 OOXML，docx 为 python-docx 对象模型（默认 fast）')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='每项重复次数，取最小值（10MB 及以上的语料只跑一次）')
+    parser.add_argument('--seed', type=int, default=0, help='语料随机种子')
+    parser.add_argument('-o', '--output', help='本次结果写入的 JSON 文件')
+    parser.add_argument('-b', '--baseline', default=DEFAULT_BASELINE, help='基线 JSON 文件（默认 %(default)s）')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果写成基线，不做比较')
+    parser.add_argument('-t', '--threshold', type=float, default=0.2,
+                        help='吞吐量低于基线的比例超过该值即判为退化（默认 0.2）')
+    parser.add_argument('--min-seconds', type=float, default=0.05,
+                        help='总耗时低于该值的条目不参与比较（默认 0.05）')
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(s) for s in args.sizes]
+    results = []
+    for size in sizes:
+        md_file = corpus_path(size, args.seed)
+        repeat = 1 if size >= 10 * _UNITS['MB'] else max(args.repeat, 1)
+        for converter in args.converters:
+            result = bench_one(converter, md_file, args.engine, repeat)
+            result['size'] = size
+            results.append(result)
+            phases = ' '.join(f'{phase} {seconds:.3f}s' for phase, seconds in result['phases'].items())
+            print(f"⏱️ {converter:<8} {format_size(size):>6}  {phases}  "
+                  f"{result['throughput_mb_s']} MB/s  峰值 {result['peak_memory_mb']} MB")
+
+    report = {
+        'corpus_version': CORPUS_VERSION,
+        'seed': args.seed,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📄 结果已写入: {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📌 基线已更新: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠️ 没有基线文件 {args.baseline}，跳过比较（可用 --save-baseline 生成）")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('corpus_version') != CORPUS_VERSION or baseline.get('seed') != args.seed:
+        print("⚠️ 基线的语料版本或种子不同，跳过比较")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold, args.min_seconds)
+    for key, old, new in regressions:
+        print(f"❌ 吞吐量退化: {key} {old} -> {new} MB/s")
+    if regressions:
+        return 1
+    print(f"✅ 与基线相比没有超过 {args.threshold:.0%} 的吞吐量退化")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+代码块语法高亮，结果按（语言, 代码内容哈希）缓存
+
+用 Pygments 的词法分析器把代码切成带颜色的片段，相邻同格式的片段合并成一个 Run。
+同一段代码（各篇文章里反复出现的 Go/Swift/Kotlin/TS 示例）只分析一次：
+进程内有内存缓存，磁盘上 .docx_cache/highlight/ 里保存 JSON，跨进程、跨次运行复用。
+
+没有安装 Pygments 或语言不认识时，整段代码作为一个 Run 输出。
+"""
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+from doc_builder import Run
+from section_cache import CACHE_DIR, LruCache, write_atomic
+
+try:
+    from pygments.lexers import get_lexer_by_name
+    from pygments.styles import get_style_by_name
+    from pygments.util import ClassNotFound
+except ImportError:
+    get_lexer_by_name = None
+
+# 高亮方案或合并规则变化时递增，旧缓存自动失效
+HIGHLIGHT_VERSION = 1
+HIGHLIGHT_STYLE = 'default'
+
+# 进程内缓存的上限：条目数 / 源代码总字节数
+MEMORY_ENTRIES = 1024
+MEMORY_BYTES = 16 * 1024 * 1024
+
+_memory = LruCache(MEMORY_ENTRIES, MEMORY_BYTES)
+
+
+@lru_cache(maxsize=64)
+def _lexer(lang):
+    if get_lexer_by_name is None or not lang:
+        return None
+    try:
+        return get_lexer_by_name(lang, stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return None
+
+
+@lru_cache(maxsize=1)
+def _style():
+    return get_style_by_name(HIGHLIGHT_STYLE)
+
+
+def _tokenize(code, lexer):
+    """词法分析并合并相邻同格式片段，返回 [(文本, 粗体, 斜体, 颜色)]"""
+    style = _style()
+    formats = {}
+    pieces = []
+    for token_type, text in lexer.get_tokens(code):
+        if not text:
+            continue
+        # 空白的颜色看不出来，直接并入前一个片段
+        if pieces and text.isspace():
+            pieces[-1][0] += text
+            continue
+        fmt = formats.get(token_type)
+        if fmt is None:
+            token_style = style.style_for_token(token_type)
+            fmt = formats[token_type] = (token_style['bold'], token_style['italic'],
+                                         token_style['color'])
+        if pieces and tuple(pieces[-1][1:]) == fmt:
+            pieces[-1][0] += text
+        else:
+            pieces.append([text, *fmt])
+    return pieces
+
+
+def _cache_path(cache_dir, key):
+    return os.path.join(cache_dir, 'highlight', key[:2], key + '.json')
+
+
+def highlight_pieces(code, lang, cache_dir=CACHE_DIR):
+    """返回高亮片段 [(文本, 粗体, 斜体, 颜色)]；无法高亮时返回 None"""
+    # 语言名不区分大小写，```Go 与 ```go 共用同一条缓存
+    lang = (lang or '').lower()
+    lexer = _lexer(lang)
+    if lexer is None:
+        return None
+
+    source = code.encode('utf-8')
+    digest = hashlib.sha256(f'{HIGHLIGHT_VERSION}\0{HIGHLIGHT_STYLE}\0{lang}\0'.encode('utf-8'))
+    digest.update(source)
+    key = digest.hexdigest()
+
+    pieces = _memory.get(key)
+    if pieces is not None:
+        return pieces
+
+    path = _cache_path(cache_dir, key) if cache_dir else None
+    if path:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                pieces = json.load(f)
+        except (OSError, ValueError):
+            pieces = None
+    if pieces is None:
+        pieces = _tokenize(code, lexer)
+        if path:
+            write_atomic(path, json.dumps(pieces, ensure_ascii=False).encode('utf-8'))
+
+    _memory.put(key, pieces, len(source))
+    return pieces
+
+
+def highlight_runs(code, lang, font='Consolas', size=10, fallback_color=None, cache_dir=CACHE_DIR):
+    """把代码转换成带语法颜色的 Run 列表；无法高亮时整段使用 fallback_color"""
+    pieces = highlight_pieces(code, lang, cache_dir)
+    if pieces is None:
+        return [Run(code, font=font, size=size, color=fallback_color)]
+    return [Run(text, bold, italic, font, size, color) for text, bold, italic, color in pieces]
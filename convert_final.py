@@ -1,66 +1,29 @@
-from docx import Document
-from docx.shared import Inches, Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-import markdown
 import os
+from functools import partial
 
-def markdown_to_docx(md_file, docx_file):
-    """将Markdown文件转换为DOCX"""
-    
-    with open(md_file, 'r', encoding='utf-8') as f:
-        md_content = f.read()
-    
-    html_content = markdown.markdown(md_content, extensions=['extra', 'fenced_code', 'tables'])
-    
-    doc = Document()
-    
-    section = doc.sections[0]
-    section.left_margin = Inches(0.8)
-    section.right_margin = Inches(0.8)
-    section.top_margin = Inches(0.8)
-    section.bottom_margin = Inches(0.8)
-    
-    lines = html_content.split('\n')
+import md_converter
+from md_converter import CodeStyle, Profile
+from section_cache import CACHE_DIR
+
+PROFILE = Profile(
+    name='convert_final/5',
+    margins=0.8,
+    code=CodeStyle(style='No Spacing'),
+    quote_indent=0.5,
+)
+
+CONVERTER_VERSION = PROFILE.name
+setup_styles = partial(md_converter.setup_styles, PROFILE)
+render_blocks = partial(md_converter.render_blocks, PROFILE)
+
+def markdown_to_docx(md_file, docx_file, cache_dir=CACHE_DIR, fast=True, instrument=None, save=None, images=None):
+    """将Markdown文件转换为DOCX，未改动的章节直接复用缓存；fast=False 时使用python-docx对象模型，
+    instrument 为 instrument.Instrument 时记录各阶段耗时和计数，save 为 docx_save.SaveOptions 时指定压缩方式，
+    images 为 image_embed.ImageOptions 时指定图片分辨率和质量"""
     
-    for line in lines:
-        line = line.strip()
-        
-        # 处理代码块
-        if '```' in line:
-            continue
-        
-        # 清理HTML标签
-        for tag in ['<h1>', '</h1>', '<h2>', '</h2>', '<h3>', '</h3>', 
-                    '<p>', '</p>', '<strong>', '</strong>', '<em>', '</em>',
-                    '<br>', '<ul>', '</ul>', '<li>', '</li>']:
-            line = line.replace(tag, '')
-        
-        # 处理HTML实体
-        entities = {'&gt;': '>', '&lt;': '<', '&amp;': '&', '&quot;': '"'}
-        for entity, char in entities.items():
-            line = line.replace(entity, char)
-        
-        line = line.strip()
-        if not line:
-            continue
-        
-        # 添加段落
-        if line.startswith('#'):
-            level = line.count('#')
-            text = line.replace('#', '').strip()
-            doc.add_heading(text, level=min(level, 3))
-        elif line.startswith('•') or line.startswith('-'):
-            doc.add_paragraph(line[1:].strip(), style='List Bullet')
-        elif '**' in line:
-            p = doc.add_paragraph()
-            text = line.replace('**', '')
-            run = p.add_run(text)
-            run.bold = True
-        else:
-            doc.add_paragraph(line)
+    hits, misses = md_converter.convert(PROFILE, md_file, docx_file, cache_dir, fast, instrument, save, images)
     
-    doc.save(docx_file)
-    print(f"✅ 转换完成: {docx_file}")
+    print(f"✅ 转换完成: {docx_file}（复用 {hits} 个章节，重新渲染 {misses} 个）")
 
 if __name__ == '__main__':
     md_file = 'M2.1评测文章_多语言方向_完整版_更新.md'
@@ -1,55 +1,85 @@
 # -*- coding: utf-8 -*-
 """
-将播客项目文件复制到 minimax 文件夹
+将播客项目文件同步到 minimax 文件夹
+
+增量同步（见 tree_sync.py）：只复制新增或改动过的文件，源里删掉的文件在目标里也删掉
+（目标文件被手动改过的只报告、不删除）。什么都没变时重新运行只需要几毫秒。
+复制方式按文件系统自动选择（见 fast_copy.py），支持 reflink 的文件系统上只复制元数据；
+--hardlink 用硬链接做只读镜像（注意：在目标里改文件会同时改掉源文件）。
+各文件在线程池里并发比较和复制，-j 指定线程数，结束时输出吞吐量和每秒文件数。
+遵守源目录里各级 .gitignore，并且总是排除 DEFAULT_EXCLUDES 里的依赖和构建产物目录，
+--exclude 可以再加 gitignore 语法的排除模式；被排除的目录整棵跳过，不会遍历。
+--delta 对目标里已有旧版本的大文件（如 package-lock.json）做 rsync 式增量复制，只写变化的块。
+
+用法：
+    python copy_to_minimax.py              # 同步
+    python copy_to_minimax.py -n           # 只显示要做的操作
+    python copy_to_minimax.py --keep-deleted
+    python copy_to_minimax.py --hardlink
+    python copy_to_minimax.py --copy-method buffered
+    python copy_to_minimax.py -j 64              # 网络盘上多开线程
+    python copy_to_minimax.py --exclude '*.map' --exclude 'src/fixtures/'
+    python copy_to_minimax.py --delta inplace --delta-min-size 32768
 """
+import argparse
 import os
-import shutil
-
-def copy_project_to_minimax():
-    src_base = '.'
-    dst_base = 'minimax'
-    
-    # 需要复制的文件列表
-    files_to_copy = [
-        'README.md',
-        'README_RSS.md',
-        'RSS测试指南.md',
-        'index.html',
-        'package.json',
-        'package-lock.json',
-        'vite.config.js',
-        'tailwind.config.js',
-        'postcss.config.js',
-        '.gitignore',
-    ]
-    
-    # 需要复制的文件夹
-    dirs_to_copy = ['src']
-    
-    # 创建目标目录
-    if not os.path.exists(dst_base):
-        os.makedirs(dst_base)
-    
-    # 复制文件
-    for file in files_to_copy:
-        src_path = os.path.join(src_base, file)
-        dst_path = os.path.join(dst_base, file)
-        if os.path.exists(src_path):
-            shutil.copy2(src_path, dst_path)
-            print(f'已复制: {file}')
-        else:
-            print(f'文件不存在: {file}')
-    
-    # 复制目录
-    for dir_name in dirs_to_copy:
-        src_dir = os.path.join(src_base, dir_name)
-        dst_dir = os.path.join(dst_base, dir_name)
-        if os.path.exists(src_dir):
-            shutil.copytree(src_dir, dst_dir)
-            print(f'已复制目录: {dir_name}')
-        else:
-            print(f'目录不存在: {dir_name}')
-    
+import sys
+import time
+
+from delta_copy import DeltaOptions
+from fast_copy import METHODS, FastCopier
+from ignore_rules import IgnoreRules
+from tree_sync import DEFAULT_WORKERS, sync_tree
+
+# 需要复制的文件列表
+FILES_TO_COPY = [
+    'README.md',
+    'README_RSS.md',
+    'RSS测试指南.md',
+    'index.html',
+    'package.json',
+    'package-lock.json',
+    'vite.config.js',
+    'tailwind.config.js',
+    'postcss.config.js',
+    '.gitignore',
+]
+
+# 需要复制的文件夹
+DIRS_TO_COPY = ['src']
+
+# 依赖和构建产物，不论 .gitignore 怎么写都不同步
+DEFAULT_EXCLUDES = [
+    'node_modules/',
+    'dist/',
+    'build/',
+    '.next/',
+    '.gradle/',
+    'coverage/',
+    '__pycache__/',
+    '.docx_cache/',
+    '.DS_Store',
+]
+
+
+def copy_project_to_minimax(src_base='.', dst_base='minimax', delete=True, dry_run=False,
+                            copy_method='auto', hardlink=False, workers=None, excludes=(),
+                            gitignore=True, delta=None):
+    start = time.perf_counter()
+    rules = IgnoreRules(src_base, DEFAULT_EXCLUDES + list(excludes), gitignore)
+    result = sync_tree(src_base, dst_base, FILES_TO_COPY, DIRS_TO_COPY,
+                       delete=delete, dry_run=dry_run, log=print,
+                       copier=FastCopier(copy_method, hardlink), workers=workers, rules=rules,
+                       delta=delta)
+    for rel in result.excluded:
+        print(f'⏭️ 已排除: {rel}')
+    elapsed = time.perf_counter() - start
+
+    if dry_run:
+        print(f'\n[预览] 将复制 {len(result.copied)} 个文件（{result.bytes / 1024:.1f} KB），'
+              f'删除 {len(result.deleted)} 个')
+        return result
+
     # 创建 .gitignore（如不存在）
     gitignore_path = os.path.join(dst_base, '.gitignore')
     if not os.path.exists(gitignore_path):
@@ -91,9 +121,52 @@ coverage/
 .temp_huanhuan/
 ''')
         print('已创建 .gitignore')
-    
-    print('\n项目文件已复制到 minimax 文件夹')
+
+    print(f'\n同步完成: 复制 {len(result.copied)} 个（{result.bytes / 1024:.1f} KB），'
+          f'仅更新时间戳 {len(result.touched)} 个，未变化 {len(result.unchanged)} 个，'
+          f'删除 {len(result.deleted)} 个，保留 {len(result.kept)} 个，排除 {len(result.excluded)} 项，'
+          f'失败 {len(result.failed)} 个，耗时 {elapsed * 1000:.1f} ms')
+    if result.methods:
+        print('复制方式: ' + '，'.join(f'{method} {n} 个' for method, n in result.methods.items()))
+    if result.saved:
+        print(f'增量复制: 从目标旧版本复用 {result.saved / 1024:.1f} KB，'
+              f'只从源传输 {(result.bytes - result.saved) / 1024:.1f} KB')
+    scanned = len(result.copied) + len(result.touched) + len(result.unchanged)
+    ops = len(result.copied) + len(result.touched) + len(result.deleted)
+    seconds = max(elapsed, 1e-9)
+    print(f'吞吐: {result.bytes / 1024 / 1024 / seconds:.1f} MB/s，写入操作 {ops / seconds:.0f} 个/s，'
+          f'检查文件 {scanned / seconds:.0f} 个/s（{workers or DEFAULT_WORKERS} 个线程）')
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='将播客项目文件增量同步到 minimax 文件夹')
+    parser.add_argument('-o', '--dst', default='minimax', help='目标目录（默认 minimax）')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='只显示要做的操作，不改动目标目录')
+    parser.add_argument('--keep-deleted', action='store_true', help='源里已删除的文件只报告，不从目标删除')
+    parser.add_argument('--copy-method', choices=('auto',) + METHODS[1:], default='auto',
+                        help='从哪种复制方式开始尝试（默认 auto：reflink → copy_file_range → sendfile → buffered）')
+    parser.add_argument('--hardlink', action='store_true', help='优先用硬链接（只读镜像）')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help=f'并发线程数（默认 {DEFAULT_WORKERS}，1 为逐个复制）')
+    parser.add_argument('-x', '--exclude', action='append', default=[], metavar='PATTERN',
+                        help='额外的排除模式（gitignore 语法，相对项目目录，可重复）')
+    parser.add_argument('--no-gitignore', action='store_true', help='不读取 .gitignore')
+    parser.add_argument('--delta', nargs='?', const='temp', choices=('temp', 'inplace'),
+                        help='大文件增量复制：temp 写临时文件后改名（默认），inplace 直接改写目标文件')
+    parser.add_argument('--delta-min-size', type=int, default=DeltaOptions().min_size,
+                        help=f'增量复制的最小文件大小（字节，默认 {DeltaOptions().min_size}）')
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error('--workers 至少为 1')
+    delta = DeltaOptions(args.delta_min_size, args.delta == 'inplace') if args.delta else None
+    result = copy_project_to_minimax(dst_base=args.dst, delete=not args.keep_deleted, dry_run=args.dry_run,
+                                     copy_method=args.copy_method, hardlink=args.hardlink,
+                                     workers=args.workers, excludes=args.exclude,
+                                     gitignore=not args.no_gitignore, delta=delta)
+    return 1 if result.failed else 0
+
 
 if __name__ == '__main__':
-    copy_project_to_minimax()
+    sys.exit(main())
 
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+rsync 式增量复制
+
+目标里已有旧版本时，把旧文件（基准）按块算出弱校验（rsync 的滚动和）和强校验（MD5），
+再用滚动窗口在新文件里找能在基准里找到的块：找到的块从基准复制（或原地不动），
+其余字节才从新文件写入。只改了几行的 package-lock.json 这类文件，绝大部分块都能复用。
+
+两种写法：
+    temp     在同目录写临时文件再原子改名（默认），中途失败不影响旧文件
+    inplace  直接改写目标文件，只写变化的块；只复用不早于写入位置的基准块，保证读到的还是旧内容。
+             目标有多个硬链接时（可能与源共用 inode）自动改用 temp。
+
+滚动窗口逐字节前进是纯 Python 循环，每段连续未匹配的字节超过 ROLL_BUDGET 后改为按整块跳着找，
+整个文件都变了时开销也只与块数成正比。
+"""
+import hashlib
+import math
+import mmap
+import os
+import shutil
+import threading
+from collections import namedtuple
+from itertools import accumulate
+
+# min_size 以上（字节）的文件才做增量复制；inplace 为真时直接改写目标文件
+DeltaOptions = namedtuple('DeltaOptions', ['min_size', 'inplace'], defaults=(64 * 1024, False))
+
+# literal 从源写入的字节数，matched 从基准复用的字节数，written 实际写盘的字节数
+DeltaResult = namedtuple('DeltaResult', ['literal', 'matched', 'written'])
+
+BLOCK_MIN = 1024
+BLOCK_MAX = 128 * 1024
+ROLL_BUDGET = 64 * 1024
+
+_MOD = 1 << 16
+
+
+def block_size(size):
+    """块大小：约为文件大小的平方根（与 rsync 相同），限定在 BLOCK_MIN 到 BLOCK_MAX 之间"""
+    return max(BLOCK_MIN, min(BLOCK_MAX, math.isqrt(size) // 64 * 64))
+
+
+def _checksum(data):
+    """rsync 弱校验的两个分量：a = Σx，b = Σ(L-i)·x（即前缀和之和）"""
+    return sum(data) % _MOD, sum(accumulate(data)) % _MOD
+
+
+def _strong(data):
+    return hashlib.md5(data).digest()
+
+
+def _signature(basis, size, block):
+    """基准文件各整块的 {弱校验: [(强校验, 块号), ...]}"""
+    table = {}
+    for index in range(size // block):
+        data = basis[index * block:(index + 1) * block]
+        a, b = _checksum(data)
+        table.setdefault(a | b << 16, []).append((_strong(data), index))
+    return table
+
+
+def _match(table, src, pos, block, weak, inplace):
+    """在基准里找与 src[pos:pos+block] 相同的块，返回基准偏移或 None"""
+    candidates = table.get(weak)
+    if not candidates:
+        return None
+    strong = _strong(src[pos:pos + block])
+    found = None
+    for digest, index in candidates:
+        offset = index * block
+        if digest != strong or (inplace and offset < pos):
+            continue
+        if offset == pos:
+            return offset
+        if found is None:
+            found = offset
+    return found
+
+
+def compute_delta(src, size, basis, basis_size, block, inplace=False):
+    """
+    比较新文件 src 与基准 basis（都是 bytes 或 mmap），返回操作列表
+
+    每项为 ('copy', 基准偏移, 长度) 或 ('data', 源起点, 源终点)，按输出顺序排列，相邻的复制已合并。
+    """
+    ops = []
+
+    def emit_literal(start, end):
+        if start < end:
+            ops.append(('data', start, end))
+
+    def emit_copy(offset, length):
+        if ops and ops[-1][0] == 'copy' and ops[-1][1] + ops[-1][2] == offset:
+            ops[-1] = ('copy', ops[-1][1], ops[-1][2] + length)
+        else:
+            ops.append(('copy', offset, length))
+
+    table = _signature(basis, basis_size, block)
+    pos = literal_start = 0
+    if not table or size < block:
+        emit_literal(0, size)
+        return ops
+
+    a, b = _checksum(src[0:block])
+    while True:
+        offset = _match(table, src, pos, block, a | b << 16, inplace)
+        if offset is not None:
+            emit_literal(literal_start, pos)
+            emit_copy(offset, block)
+            pos += block
+            literal_start = pos
+        elif pos - literal_start < ROLL_BUDGET:
+            # 滚动一个字节
+            if pos + block >= size:
+                break
+            out, new = src[pos], src[pos + block]
+            a = (a - out + new) % _MOD
+            b = (b - block * out + a) % _MOD
+            pos += 1
+            continue
+        else:
+            # 连续太久没匹配，改为按整块对齐检查
+            pos += block
+        if pos + block > size:
+            break
+        a, b = _checksum(src[pos:pos + block])
+    emit_literal(literal_start, size)
+    return ops
+
+
+def _map(f, size):
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+
+def _close(*maps):
+    for m in maps:
+        if isinstance(m, mmap.mmap):
+            m.close()
+
+
+def _write_inplace(out, ops, src_map, basis_map):
+    """按操作改写基准文件本身，与基准同位置的块跳过不写；返回写入的字节数"""
+    written = 0
+    for kind, start, end in ops:
+        if kind == 'copy':
+            offset, length = start, end
+            if offset == out.tell():
+                out.seek(length, os.SEEK_CUR)
+                continue
+            data = basis_map[offset:offset + length]
+        else:
+            data = src_map[start:end]
+        out.write(data)
+        written += len(data)
+    return written
+
+
+def _write_new(out, ops, src_map, basis_map):
+    for kind, start, end in ops:
+        if kind == 'copy':
+            offset, length = start, end
+            out.write(basis_map[offset:offset + length])
+        else:
+            out.write(src_map[start:end])
+
+
+def delta_copy(src, dst, inplace=False):
+    """
+    以目标现有内容为基准，把 src 增量复制到 dst（连同权限和时间戳），返回 DeltaResult
+
+    dst 必须已存在；inplace 见模块说明。
+    """
+    size = os.path.getsize(src)
+    dst_st = os.stat(dst)
+    if dst_st.st_nlink > 1:
+        inplace = False
+    block = block_size(max(size, dst_st.st_size))
+    tmp_path = f'{dst}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'rb') as fbasis:
+            src_map = _map(fsrc, size)
+            basis_map = _map(fbasis, dst_st.st_size)
+            try:
+                ops = compute_delta(src_map, size, basis_map, dst_st.st_size, block, inplace)
+                if inplace:
+                    with open(dst, 'r+b') as out:
+                        written = _write_inplace(out, ops, src_map, basis_map)
+                        out.truncate(size)
+                else:
+                    with open(tmp_path, 'wb') as out:
+                        _write_new(out, ops, src_map, basis_map)
+                    written = size
+            finally:
+                _close(src_map, basis_map)
+        if inplace:
+            shutil.copystat(src, dst)
+        else:
+            shutil.copystat(src, tmp_path)
+            os.replace(tmp_path, dst)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    literal = sum(end - start for kind, start, end in ops if kind == 'data')
+    return DeltaResult(literal, size - literal, written)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+文档构建接口
+
+转换器不直接调用 python-docx，而是把标题、段落、表格、图片交给构建器。
+DocxBuilder 用 python-docx 对象模型写入 Document；
+ooxml_writer.XmlBuilder 提供同样的方法，直接拼出 document.xml 片段。
+两者产出的 XML 一致，转换器的渲染逻辑只需写一份。
+html_writer.HtmlBuilder、rtf_writer.RtfBuilder 用同一套方法输出 HTML 和 RTF。
+"""
+from collections import namedtuple
+from io import BytesIO
+
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.shared import Emu, Pt, RGBColor
+from docx.text.paragraph import Paragraph
+
+# 一段文本及其格式；size 为磅值，color 为 'RRGGBB'
+Run = namedtuple('Run', ['text', 'bold', 'italic', 'font', 'size', 'color'],
+                 defaults=(False, False, None, None, None))
+
+# python-docx 默认模板的正文字体、字号和标题样式 {样式名: (字号, 'RRGGBB')}，
+# 不经过 DOCX 模板的输出格式（html_writer、rtf_writer）照此排版，转换配置里的设置覆盖在上面
+DEFAULT_FONT = 'Calibri'
+DEFAULT_SIZE = 11
+DEFAULT_HEADING_STYLES = {
+    'Title': (26, '17365D'),
+    'Heading 1': (14, '365F91'),
+    'Heading 2': (13, '4F81BD'),
+    'Heading 3': (11, '4F81BD'),
+    'Heading 4': (11, '4F81BD'),
+}
+
+
+def heading_formats(heading_styles=None):
+    """默认标题样式叠加转换配置的 heading_styles；配置里颜色为 None 时沿用默认颜色（与 setup_styles 一致）"""
+    formats = dict(DEFAULT_HEADING_STYLES)
+    for style, (size, color) in (heading_styles or {}).items():
+        default = formats.get(style)
+        formats[style] = (size, color or (default[1] if default else None))
+    return formats
+
+
+_ALIGNMENTS = {
+    'left': WD_ALIGN_PARAGRAPH.LEFT,
+    'center': WD_ALIGN_PARAGRAPH.CENTER,
+    'right': WD_ALIGN_PARAGRAPH.RIGHT,
+    'justify': WD_ALIGN_PARAGRAPH.JUSTIFY,
+}
+
+
+def _add_runs(para, runs):
+    for run in runs:
+        r = para.add_run(run.text)
+        if run.font:
+            r.font.name = run.font
+        if run.bold:
+            r.bold = True
+        if run.italic:
+            r.italic = True
+        if run.color:
+            r.font.color.rgb = RGBColor.from_string(run.color)
+        if run.size:
+            r.font.size = Pt(run.size)
+
+
+class DocxBuilder:
+    """基于 python-docx 对象模型的构建器；images 为 image_embed.ImageStore，没有时不嵌入图片"""
+
+    def __init__(self, doc, images=None):
+        self.doc = doc
+        self.images = images
+
+    def heading(self, runs, level):
+        """添加标题；runs 为 Run 列表，标题里的行内格式与段落一样保留"""
+        _add_runs(self.doc.add_heading(level=level), runs)
+
+    def paragraph(self, runs=(), style=None, left_indent=None, first_line_indent=None,
+                  space_before=None, space_after=None, alignment=None, code=False):
+        """
+        添加段落；缩进和段距使用 docx.shared 的长度对象（Inches、Pt）
+
+        code 为真表示围栏代码块，DOCX 里与普通段落相同，HTML 等输出据此保留空白和换行。
+        """
+        para = self.doc.add_paragraph(style=style)
+        fmt = para.paragraph_format
+        if space_before is not None:
+            fmt.space_before = space_before
+        if space_after is not None:
+            fmt.space_after = space_after
+        if left_indent is not None:
+            fmt.left_indent = left_indent
+        if first_line_indent is not None:
+            fmt.first_line_indent = first_line_indent
+        if alignment is not None:
+            para.alignment = _ALIGNMENTS[alignment]
+        _add_runs(para, runs)
+
+    def table(self, rows, align=None, style='Table Grid'):
+        """
+        一次性添加整张表：按首行列数批量分配所有行，表格样式只设置一次，
+        单元格直接写入底层 XML，不经过 table.cell() 的逐格查找；每个单元格是一个 Run 列表
+        """
+        cols = len(rows[0])
+        table = self.doc.add_table(rows=len(rows), cols=cols)
+        table.style = style
+        jc = [_ALIGNMENTS.get(a) for a in align or ()][:cols]
+        for tr, cells in zip(table._tbl.tr_lst, rows):
+            # 短行补空单元格，对齐方式照样按列应用
+            for i, tc in enumerate(tr.tc_lst):
+                runs = cells[i] if i < len(cells) else ()
+                p = tc.p_lst[0]
+                if i < len(jc) and jc[i] is not None:
+                    p.get_or_add_pPr().jc_val = jc[i]
+                if runs:
+                    _add_runs(Paragraph(p, table), runs)
+
+    def image(self, path, alt=''):
+        """单独成段的图片，返回是否嵌入成功（图片部件由 python-docx 按内容去重）"""
+        image = self.images.load(path) if self.images is not None else None
+        if image is None:
+            return False
+        shape = self.doc.add_picture(BytesIO(image.data), width=Emu(image.cx), height=Emu(image.cy))
+        if alt:
+            shape._inline.docPr.set('descr', alt)
+        return True
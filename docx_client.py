@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+转换服务的轻量客户端
+
+只依赖标准库，启动只需几十毫秒：把转换任务通过 Unix 套接字交给 docx_server.py。
+服务没有运行时退回到在本进程内转换（这时才导入 python-docx 等模块）。
+
+用法：
+    python docx_client.py article.md                  # 输出 article.docx
+    python docx_client.py article.md -o out.docx -c word
+    cat article.md | python docx_client.py - -o - > article.docx
+    python docx_client.py a.md b.md c.md              # 同一个连接里依次转换
+"""
+import argparse
+import os
+import socket
+import sys
+
+from docx_protocol import default_socket_path, recv_message, send_message
+
+
+def connect(socket_path=None, timeout=None):
+    """连接转换服务，连不上时返回 None"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path or default_socket_path())
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def _local(header, data):
+    from docx_server import handle_request
+    return handle_request(header, data)
+
+
+def convert(md_file=None, docx_file=None, data=None, converter='final', sock=None, fallback=True,
+            compression='default'):
+    """
+    转换一个文档，返回 (响应头, DOCX 字节)
+
+    md_file 与 data（Markdown 的 UTF-8 字节）二选一；docx_file 为 None 时 DOCX 字节随返回值带回。
+    sock 为 connect() 得到的连接，为 None 且 fallback 为真时在本进程内转换。
+    compression 为 store / fast / default / max；响应头里 'server' 标明是否由转换服务完成。
+    """
+    header = {
+        'converter': converter,
+        'input': os.path.abspath(md_file) if md_file else None,
+        'output': os.path.abspath(docx_file) if docx_file else None,
+        'compression': compression,
+        'base_dir': os.getcwd(),
+    }
+    payload = b'' if md_file else data
+    if sock is not None:
+        send_message(sock, header, payload)
+        response, result = recv_message(sock)
+        response['server'] = True
+        return response, result
+    if not fallback:
+        raise ConnectionError('转换服务未运行')
+    response, result = _local(header, payload)
+    response['server'] = False
+    return response, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='通过常驻服务把Markdown转换为DOCX')
+    parser.add_argument('inputs', nargs='+', help='Markdown 文件，- 表示从标准输入读取')
+    parser.add_argument('-o', '--output', help='输出文件（只能配合单个输入），- 表示写到标准输出')
+    parser.add_argument('-c', '--converter', default='final', help='使用的转换器（默认 final）')
+    parser.add_argument('-z', '--compression', choices=['store', 'fast', 'default', 'max'],
+                        default='default', help='压缩方式（默认 default）')
+    parser.add_argument('-s', '--socket', help='Unix 套接字路径')
+    parser.add_argument('--no-fallback', action='store_true', help='服务未运行时直接报错，不在本进程内转换')
+    args = parser.parse_args(argv)
+    if args.output and len(args.inputs) > 1:
+        parser.error('多个输入时不能指定 -o')
+
+    sock = connect(args.socket)
+    if sock is None and args.no_fallback:
+        print("❌ 转换服务未运行", file=sys.stderr)
+        return 2
+
+    failed = 0
+    try:
+        for md_file in args.inputs:
+            data = None
+            if md_file == '-':
+                md_file, data = None, sys.stdin.buffer.read()
+            if args.output == '-':
+                docx_file = None
+            else:
+                docx_file = args.output or os.path.splitext(md_file or 'stdin')[0] + '.docx'
+
+            response, result = convert(md_file, docx_file, data, args.converter, sock,
+                                       compression=args.compression)
+            if not response['ok']:
+                failed += 1
+                print(f"❌ {md_file or '<stdin>'}: {response['error']}", file=sys.stderr)
+                continue
+            if docx_file is None:
+                sys.stdout.buffer.write(result)
+            else:
+                where = '服务' if response['server'] else '本地'
+                print(f"✅ {md_file or '<stdin>'} -> {docx_file}（{where} {response['seconds']:.3f}s）",
+                      file=sys.stderr)
+    finally:
+        if sock is not None:
+            sock.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
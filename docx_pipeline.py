@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Markdown 块流 → DOCX 的公共流程
+
+样式模板（style_template）→ 构建器（doc_builder / ooxml_writer）→ 章节缓存（section_cache）→ 保存。
+默认走直接写 OOXML 的快速通道；fast=False 时回退到 python-docx 对象模型。
+传入 instrument.Instrument 时记录各阶段耗时和计数。
+
+快速通道全程流式：源文件按行读取，块按章节（超长章节再切段）渲染后立即写进 zip，
+内存峰值取决于最大的单个块和章节切段大小，与文件大小无关。
+python-docx 通道需要在内存里保留整棵文档树，不适合超大输入。
+"""
+from doc_builder import DocxBuilder
+from image_embed import ImageStore
+from docx_save import SaveOptions, save_output, write_document, zip_settings
+from instrument import NULL_INSTRUMENT
+from ooxml_writer import XmlBuilder, read_template, write_package
+from section_cache import CACHE_DIR, iter_cached_xml, render_cached
+from style_template import get_template, new_document
+
+
+def _block_counter(block):
+    return 'blocks.' + block.kind
+
+
+def build_docx(blocks, docx_file, render_blocks, setup_styles, name,
+               cache_dir=CACHE_DIR, fast=True, instrument=None, save=None, images=None):
+    """
+    把块流写成 DOCX，返回 (复用章节数, 重新渲染章节数)
+
+    render_blocks(builder, blocks) 是转换器的渲染逻辑，setup_styles(doc) 用来构建样式模板，
+    name 为转换器名加版本号（同时作为模板名和缓存命名空间）。
+    阶段：template（加载样式模板）、parse（读文件和分词）、cache（章节哈希与缓存读写）、
+    render（渲染未命中的章节）、save（压缩写出）。
+    save 为 docx_save.SaveOptions，指定压缩方式、组装方式和压缩线程数；写出的字节数计入 bytes_written。
+    images 为 image_embed.ImageOptions，指定图片缩放的分辨率和 JPEG 质量。
+    """
+    instrument = instrument or NULL_INSTRUMENT
+    save = save or SaveOptions()
+    compression, compresslevel = zip_settings(save.compression)
+    with instrument:
+        blocks = instrument.iter_stage('parse', blocks, _block_counter)
+
+        if not fast:
+            with instrument.stage('template'):
+                doc = new_document(name, setup_styles, cache_dir)
+            store = ImageStore(doc._block_width, images, cache_dir)
+
+            def render_doc(d, section):
+                with instrument.stage('render'):
+                    render_blocks(instrument.wrap_builder(DocxBuilder(d, store)), section)
+
+            with instrument.stage('cache'):
+                hits, misses = render_cached(doc, blocks, render_doc, name, cache_dir)
+            with instrument.stage('save'):
+                result = save_output(
+                    lambda out: write_document(doc, out, compression, compresslevel, save.workers),
+                    docx_file, save.spool)
+        else:
+            with instrument.stage('template'):
+                template = read_template(get_template(name, setup_styles, cache_dir))
+            store = ImageStore(template.block_width, images, cache_dir)
+            builder = XmlBuilder(template, store)
+            counted = instrument.wrap_builder(builder)
+
+            def render(section):
+                with instrument.stage('render'):
+                    render_blocks(counted, section)
+                    return builder.take()
+
+            stats = {}
+            fragments = iter_cached_xml(blocks, render, name + '/xml', cache_dir, stats)
+            with instrument.stage('save'):
+                result = save_output(
+                    lambda out: write_package(template, instrument.iter_stage('cache', fragments), out,
+                                              compression, compresslevel, workers=save.workers,
+                                              images=store),
+                    docx_file, save.spool)
+            hits, misses = stats['hits'], stats['misses']
+
+        instrument.count('sections.cached', hits)
+        instrument.count('sections.rendered', misses)
+        instrument.count('bytes_written', result.bytes)
+        for key, n in store.stats.items():
+            if n:
+                instrument.count('images.' + key, n)
+    return hits, misses
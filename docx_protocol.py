@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+转换服务（docx_server.py）与客户端（docx_client.py）之间的消息格式
+
+每条消息为 4 字节大端长度 + UTF-8 JSON 头，JSON 头里 data_size 大于 0 时后面紧跟这么多字节的数据。
+    请求：{"converter": "final", "input": 路径或null, "output": 路径或null, "compression": "default",
+          "base_dir": 图片相对路径的基准目录, "data_size": n} [+ Markdown 字节]
+    响应：{"ok": true, "error": null, "output": 路径或null, "seconds": 0.01, "data_size": n} [+ DOCX 字节]
+input 为 null 时 Markdown 内容随请求发送；output 为 null 时 DOCX 内容随响应返回。
+
+这里只用标准库，客户端导入它不会拖慢启动。
+"""
+import json
+import os
+import struct
+
+_HEADER = struct.Struct('>I')
+
+
+def default_socket_path():
+    """环境变量 DOCX_CONVERT_SOCKET 优先，其次 $XDG_RUNTIME_DIR，最后 /tmp 下按用户区分"""
+    path = os.environ.get('DOCX_CONVERT_SOCKET')
+    if path:
+        return path
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'docx-convert.sock')
+    return f'/tmp/docx-convert-{os.getuid()}.sock'
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError('连接提前关闭')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def send_message(sock, header, data=b''):
+    header = dict(header, data_size=len(data))
+    payload = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+    if data:
+        sock.sendall(data)
+
+
+def recv_message(sock):
+    """读一条消息，返回 (JSON 头, 数据字节)"""
+    size, = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    header = json.loads(_recv_exact(sock, size).decode('utf-8'))
+    data = _recv_exact(sock, header.get('data_size') or 0)
+    return header, data
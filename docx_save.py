@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+DOCX 保存阶段：可选压缩级别、先在内存或临时文件里组装、原子替换目标文件
+
+压缩方式：
+    store    不压缩，最快，文件最大
+    fast     deflate 级别 1
+    default  deflate 默认级别（与 python-docx 的 doc.save 相同）
+    max      deflate 级别 9，最慢，文件最小
+
+组装方式（spool）：
+    memory   整个 zip 先写进内存，再一次性写入临时文件
+    file     直接写临时文件，内存占用不随输出大小增长
+两种方式最后都 os.replace 到目标路径，中途出错或进程被杀不会留下半截的 DOCX。
+
+压缩在线程池里并行进行，所有条目使用固定时间戳，相同内容总是得到相同的文件（见 parallel_zip.py）。
+"""
+import io
+import os
+import threading
+import time
+import zipfile
+from collections import namedtuple
+
+from docx.opc.pkgwriter import PackageWriter
+
+from parallel_zip import write_zip
+
+COMPRESSION = {
+    'store': (zipfile.ZIP_STORED, None),
+    'fast': (zipfile.ZIP_DEFLATED, 1),
+    'default': (zipfile.ZIP_DEFLATED, None),
+    'max': (zipfile.ZIP_DEFLATED, 9),
+}
+SPOOLS = ('memory', 'file')
+
+# workers: 压缩线程数，None 为 CPU 核数，1 为单线程顺序压缩
+SaveOptions = namedtuple('SaveOptions', ['compression', 'spool', 'workers'],
+                         defaults=('default', 'memory', None))
+
+# bytes: 写出的字节数；seconds: 保存阶段耗时（快速通道里包含边生成边写入的正文）
+SaveResult = namedtuple('SaveResult', ['bytes', 'seconds'])
+
+
+def zip_settings(compression):
+    """压缩方式名 -> (zipfile 压缩类型, 压缩级别)"""
+    try:
+        return COMPRESSION[compression]
+    except KeyError:
+        raise ValueError(f'未知的压缩方式: {compression}（可选 {", ".join(COMPRESSION)}）')
+
+
+class _EntryCollector:
+    """代替 python-docx 的 PhysPkgWriter，只收集 (部件名, 字节)"""
+
+    def __init__(self):
+        self.entries = []
+
+    def write(self, pack_uri, blob):
+        self.entries.append((pack_uri.membername, blob))
+
+
+class _CountingWriter:
+    """包装不可回写（没有 tell）的输出流，统计写入的字节数"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.count = 0
+
+    def write(self, data):
+        self.raw.write(data)
+        n = len(data)
+        self.count += n
+        return n
+
+    def flush(self):
+        flush = getattr(self.raw, 'flush', None)
+        if flush is not None:
+            flush()
+
+    def seekable(self):
+        return False
+
+
+def document_entries(doc):
+    """按 python-docx 保存时的顺序序列化文档的全部部件，返回 [(部件名, 字节)]"""
+    package = doc.part.package
+    parts = list(package.parts)
+    for part in parts:
+        part.before_marshal()
+    collector = _EntryCollector()
+    PackageWriter._write_content_types_stream(collector, parts)
+    PackageWriter._write_pkg_rels(collector, package.rels)
+    PackageWriter._write_parts(collector, parts)
+    return collector.entries
+
+
+def write_document(doc, out, compression=zipfile.ZIP_DEFLATED, compresslevel=None, workers=None):
+    """与 doc.save(out) 相同，但可以指定压缩方式和级别，各部件在线程池里并行压缩"""
+    write_zip(out, document_entries(doc), compression, compresslevel, workers)
+
+
+def save_output(write, docx_file, spool='memory'):
+    """
+    调用 write(文件对象) 生成 DOCX 并落盘，返回 SaveResult
+
+    docx_file 为路径时先写到同目录的临时文件，fsync 落盘后再原子替换，断电后也不会留下空文件或半个文件；
+    为文件对象时直接写入，可以是管道、套接字等不可回写的流（写出的字节数按写入量统计）。
+    """
+    if spool not in SPOOLS:
+        raise ValueError(f'未知的组装方式: {spool}（可选 {", ".join(SPOOLS)}）')
+    start = time.perf_counter()
+
+    if not isinstance(docx_file, (str, os.PathLike)):
+        try:
+            seekable = docx_file.seekable()
+        except AttributeError:
+            seekable = False
+        if seekable:
+            begin = docx_file.tell()
+            write(docx_file)
+            return SaveResult(docx_file.tell() - begin, time.perf_counter() - start)
+        counter = _CountingWriter(docx_file)
+        write(counter)
+        return SaveResult(counter.count, time.perf_counter() - start)
+
+    tmp_path = f'{os.fspath(docx_file)}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        if spool == 'memory':
+            buffer = io.BytesIO()
+            write(buffer)
+            with open(tmp_path, 'wb') as f:
+                f.write(buffer.getbuffer())
+                f.flush()
+                os.fsync(f.fileno())
+            size = buffer.tell()
+        else:
+            with open(tmp_path, 'wb') as f:
+                write(f)
+                size = f.tell()
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, docx_file)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return SaveResult(size, time.perf_counter() - start)
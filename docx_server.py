@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+常驻的 Markdown→DOCX 转换服务（Unix 套接字）
+
+启动时一次性导入 python-docx、lxml、Pygments 和各转换器，并构建好样式模板；
+之后 docx_client.py 把转换任务发过来，省掉每次启动解释器和导入模块的开销。
+
+通信协议见 docx_protocol.py。
+
+每个连接一个线程，各请求的转换并发执行，不加锁：
+缓存文件都先写到按进程和线程区分的临时文件再改名（section_cache.write_atomic），
+进程内的缓存是只增不改的字典（模板）或自带锁的 LRU（图片、代码高亮），同时写同一条目也只是重复劳动。
+
+用法：
+    python docx_server.py                 # 监听默认套接字
+    python docx_server.py -s /tmp/x.sock -c final word
+"""
+import argparse
+import importlib
+import io
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import time
+from functools import partial
+
+from batch_convert import CONVERTERS
+from docx_protocol import default_socket_path, recv_message, send_message
+from docx_pipeline import build_docx
+from docx_save import SaveOptions
+from image_embed import resolve_paths
+from ooxml_writer import read_template
+from parse_cache import cached_file_blocks, cached_text_blocks
+from section_cache import CACHE_DIR
+from style_template import get_template
+
+def _load(converter):
+    module_name, _ = CONVERTERS[converter]
+    return importlib.import_module(module_name)
+
+
+def preload(converters):
+    """导入转换器并构建、拆解样式模板"""
+    for converter in converters:
+        module = _load(converter)
+        read_template(get_template(module.CONVERTER_VERSION, module.setup_styles))
+
+
+def handle_request(header, data, cache_dir=CACHE_DIR):
+    """
+    执行一个转换请求，返回 (响应头, DOCX 字节)
+
+    客户端连不上服务时也直接调用这里，在自己的进程里完成转换。
+    """
+    response = {'ok': False, 'error': None, 'output': header.get('output')}
+    start = time.perf_counter()
+    try:
+        module = _load(header.get('converter') or 'final')
+        if header.get('input'):
+            blocks = cached_file_blocks(header['input'], cache_dir)
+            base_dir = os.path.dirname(header['input'])
+        else:
+            blocks = cached_text_blocks(data.decode('utf-8'), cache_dir)
+            base_dir = header.get('base_dir') or os.getcwd()
+        blocks = resolve_paths(blocks, base_dir)
+        out = header.get('output') or io.BytesIO()
+        save = SaveOptions(header.get('compression') or 'default')
+        build_docx(blocks, out, partial(module.render_blocks, cache_dir=cache_dir),
+                   module.setup_styles, module.CONVERTER_VERSION, cache_dir, save=save)
+        response['ok'] = True
+        result = b'' if header.get('output') else out.getvalue()
+    except Exception as e:
+        response['error'] = f'{type(e).__name__}: {e}'
+        result = b''
+    response['seconds'] = round(time.perf_counter() - start, 6)
+    return response, result
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                header, data = recv_message(self.request)
+            except (ConnectionError, struct.error):
+                return
+            response, result = handle_request(header, data, self.server.cache_dir)
+            send_message(self.request, response, result)
+
+
+class ConversionServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        super().__init__(socket_path, _Handler)
+
+
+def _remove_stale_socket(socket_path):
+    """套接字文件存在但连不上（上次没有正常退出）时删掉；已有服务在运行则报错"""
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f'已有转换服务在监听 {socket_path}')
+
+
+def _stop(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve(socket_path=None, converters=None, cache_dir=CACHE_DIR):
+    socket_path = socket_path or default_socket_path()
+    preload(converters or sorted(CONVERTERS))
+    _remove_stale_socket(socket_path)
+    server = ConversionServer(socket_path, cache_dir)
+    os.chmod(socket_path, 0o600)
+    # SIGTERM 与 Ctrl+C 一样正常退出，保证套接字文件被删除
+    signal.signal(signal.SIGTERM, _stop)
+    print(f"🚀 转换服务已启动: {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 转换服务已停止")
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='常驻的 Markdown→DOCX 转换服务')
+    parser.add_argument('-s', '--socket', help='Unix 套接字路径（默认 %s）' % default_socket_path())
+    parser.add_argument('-c', '--converters', nargs='+', choices=sorted(CONVERTERS),
+                        help='预先加载的转换器（默认全部）')
+    args = parser.parse_args(argv)
+    serve(args.socket, args.converters)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+输出独立 HTML 的构建器
+
+HtmlBuilder 与 doc_builder.DocxBuilder 方法相同，转换器的 render_blocks 不用改就能输出 HTML。
+样式全部内联在 <style> 里，图片以 data: URI 嵌入，生成的文件可以单独拷走、直接用浏览器打开。
+字体、标题字号和颜色与 DOCX 一致（转换配置的设置覆盖在 python-docx 默认样式上）。
+"""
+import base64
+import html
+
+from doc_builder import DEFAULT_FONT, DEFAULT_SIZE, heading_formats
+
+_EMUS_PER_PX = 9525
+
+_JUSTIFY = {'left': 'left', 'center': 'center', 'right': 'right', 'justify': 'justify'}
+
+
+def _font_family(font):
+    return f"'{font}', sans-serif"
+
+
+def _style_attr(styles):
+    return f' style="{"; ".join(styles)}"' if styles else ''
+
+
+def _runs_html(runs, pre=False):
+    parts = []
+    for run in runs:
+        text = html.escape(run.text, quote=False)
+        if not pre:
+            text = text.replace('\n', '<br>')
+        styles = []
+        if run.font and not pre:
+            styles.append(f'font-family: {_font_family(run.font)}')
+        if run.size:
+            styles.append(f'font-size: {run.size}pt')
+        if run.color:
+            styles.append(f'color: #{run.color}')
+        if styles:
+            text = f'<span{_style_attr(styles)}>{text}</span>'
+        if run.italic:
+            text = f'<em>{text}</em>'
+        if run.bold:
+            text = f'<strong>{text}</strong>'
+        parts.append(text)
+    return ''.join(parts)
+
+
+class HtmlBuilder:
+    """
+    拼出 HTML 正文，document() 返回完整页面
+
+    font / heading_styles 与 md_converter.Profile 的同名字段含义相同；
+    images 为 image_embed.ImageStore，没有时不嵌入图片。
+    """
+
+    def __init__(self, font=None, heading_styles=None, images=None):
+        self.font = font or DEFAULT_FONT
+        self.heading_styles = heading_formats(heading_styles)
+        self.images = images
+        self.title = None
+        self._chunks = []
+        self._in_list = False
+
+    def _close_list(self):
+        if self._in_list:
+            self._chunks.append('</ul>')
+            self._in_list = False
+
+    def heading(self, runs, level):
+        self._close_list()
+        if self.title is None:
+            self.title = ''.join(run.text for run in runs)
+        if level == 0:
+            self._chunks.append(f'<h1 class="title">{_runs_html(runs)}</h1>')
+        else:
+            self._chunks.append(f'<h{level}>{_runs_html(runs)}</h{level}>')
+
+    def paragraph(self, runs=(), style=None, left_indent=None, first_line_indent=None,
+                  space_before=None, space_after=None, alignment=None, code=False):
+        styles = ['margin: 0'] if style == 'No Spacing' else []
+        if left_indent is not None:
+            styles.append(f'margin-left: {left_indent.pt:g}pt')
+        if first_line_indent is not None:
+            styles.append(f'text-indent: {first_line_indent.pt:g}pt')
+        if space_before is not None:
+            styles.append(f'margin-top: {space_before.pt:g}pt')
+        if space_after is not None:
+            styles.append(f'margin-bottom: {space_after.pt:g}pt')
+        if alignment is not None:
+            styles.append(f'text-align: {_JUSTIFY[alignment]}')
+
+        if style == 'List Bullet':
+            if not self._in_list:
+                self._chunks.append('<ul>')
+                self._in_list = True
+            self._chunks.append(f'<li{_style_attr(styles)}>{_runs_html(runs)}</li>')
+            return
+        self._close_list()
+        # 代码块保留空白和换行；只有行内代码的普通段落仍是 <p>
+        if code:
+            font = next((run.font for run in runs if run.font), None)
+            if font:
+                styles.append(f'font-family: {_font_family(font)}')
+            self._chunks.append(f'<pre{_style_attr(styles)}>{_runs_html(runs, pre=True)}</pre>')
+        else:
+            self._chunks.append(f'<p{_style_attr(styles)}>{_runs_html(runs)}</p>')
+
+    def table(self, rows, align=None, style='Table Grid'):
+        self._close_list()
+        cols = len(rows[0])
+        aligns = [f' style="text-align: {_JUSTIFY[a]}"' if a else '' for a in (align or ())][:cols]
+        aligns += [''] * (cols - len(aligns))
+        chunks = ['<table>']
+        for cells in rows:
+            chunks.append('<tr>')
+            for i in range(cols):
+                runs = cells[i] if i < len(cells) else ()
+                chunks.append(f'<td{aligns[i]}>{_runs_html(runs)}</td>')
+            chunks.append('</tr>')
+        chunks.append('</table>')
+        self._chunks.append(''.join(chunks))
+
+    def image(self, path, alt=''):
+        image = self.images.load(path) if self.images is not None else None
+        if image is None:
+            return False
+        self._close_list()
+        data = base64.b64encode(image.data).decode('ascii')
+        self._chunks.append(
+            f'<p class="figure"><img src="data:{image.content_type};base64,{data}" '
+            f'width="{round(image.cx / _EMUS_PER_PX)}" alt="{html.escape(alt)}"></p>')
+        return True
+
+    def _css(self):
+        rules = [
+            f'body {{ font-family: {_font_family(self.font)}; font-size: {DEFAULT_SIZE}pt; '
+            'line-height: 1.5; max-width: 48em; margin: 2em auto; padding: 0 1em; }',
+            'pre { white-space: pre-wrap; background: #f6f8fa; padding: 0.5em; }',
+            'table { border-collapse: collapse; margin: 0.5em 0; }',
+            'td { border: 1px solid #000; padding: 0.2em 0.5em; vertical-align: top; }',
+            'img { max-width: 100%; height: auto; }',
+        ]
+        selectors = {'Title': 'h1.title'}
+        for style, (size, color) in self.heading_styles.items():
+            if style in selectors:
+                selector = selectors[style]
+            elif style.startswith('Heading '):
+                selector = 'h' + style.split()[1]
+            else:
+                continue
+            color_css = f' color: #{color};' if color else ''
+            rules.append(f'{selector} {{ font-size: {size}pt;{color_css} }}')
+        return '\n'.join(rules)
+
+    def document(self):
+        """完整的 HTML 页面"""
+        self._close_list()
+        title = html.escape(self.title or '', quote=False)
+        return (
+            '<!DOCTYPE html>\n<html lang="zh-CN">\n<head>\n<meta charset="utf-8">\n'
+            f'<title>{title}</title>\n<style>\n{self._css()}\n</style>\n</head>\n<body>\n'
+            + '\n'.join(self._chunks)
+            + '\n</body>\n</html>\n'
+        )
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+.gitignore 规则匹配
+
+按 gitignore 的语法把一组模式编译成一个正则：# 注释、! 取反、结尾 / 只匹配目录、
+含 / 的模式相对 .gitignore 所在目录锚定、* ? [...] 不跨目录、** 跨任意层目录。
+同一组里后写的模式优先——正则按倒序拼接，第一个匹配上的分支就是最后一条生效的模式。
+
+IgnoreRules 在遍历目录时使用：目录被排除就整棵跳过，子目录里的 .gitignore 在进入时才读取，
+更深目录里的规则优先，额外的排除模式（命令行传入）优先级最高。
+"""
+import os
+import re
+
+GITIGNORE = '.gitignore'
+
+# 不论规则如何都不进入
+ALWAYS_EXCLUDED = ('.git/',)
+
+
+def _translate(pattern):
+    """把一条（已去掉 ! 和结尾 / 的）模式翻译成正则，不含首尾锚点"""
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        ch = pattern[i]
+        if ch == '*':
+            if pattern.startswith('**', i) and (i == 0 or pattern[i - 1] == '/'):
+                end = i + 2
+                if end == n:
+                    out.append('.*')
+                    i = end
+                    continue
+                if pattern[end] == '/':
+                    out.append('(?:.*/)?')
+                    i = end + 1
+                    continue
+            out.append('[^/]*')
+        elif ch == '?':
+            out.append('[^/]')
+        elif ch == '[':
+            # 紧跟在 [ 或 [! 后面的 ] 是普通字符
+            end = pattern.find(']', i + 3 if pattern[i + 1:i + 2] in ('!', '^') else i + 2)
+            if end < 0:
+                out.append(re.escape(ch))
+            else:
+                body = pattern[i + 1:end]
+                if body[:1] in ('!', '^'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif ch == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(ch))
+        i += 1
+    regex = ''.join(out)
+    return regex if anchored else '(?:.*/)?' + regex
+
+
+def parse_patterns(lines):
+    """解析 gitignore 文本行，产出 (正则, 是否取反, 是否只匹配目录)"""
+    for line in lines:
+        line = line.rstrip('\n').rstrip('\r')
+        if not line or line.startswith('#'):
+            continue
+        # 结尾空格忽略，除非用反斜杠转义
+        stripped = line.rstrip(' ')
+        if stripped.endswith('\\') and len(stripped) < len(line):
+            stripped += ' '
+        line = stripped
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        elif line.startswith('\\!') or line.startswith('\\#'):
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if line:
+            yield _translate(line), negate, dir_only
+
+
+class PatternSet:
+    """
+    一组 gitignore 模式编译后的匹配器
+
+    match(path, is_dir) 中 path 为相对模式所在目录的 / 分隔路径；
+    返回 True（排除）、False（被 ! 模式重新包含）或 None（没有模式匹配）。
+    """
+
+    def __init__(self, lines):
+        patterns = list(parse_patterns(lines))
+        self._dirs = self._compile(patterns)
+        self._files = self._compile([p for p in patterns if not p[2]])
+
+    @staticmethod
+    def _compile(patterns):
+        if not patterns:
+            return None, ()
+        ordered = patterns[::-1]
+        regex = '|'.join(f'({p})' for p, negate, dir_only in ordered)
+        return re.compile(f'(?:{regex})\\Z', re.DOTALL), tuple(not negate for p, negate, dir_only in ordered)
+
+    def __bool__(self):
+        return self._dirs[0] is not None
+
+    def match(self, path, is_dir=False):
+        regex, verdicts = self._dirs if is_dir else self._files
+        if regex is None:
+            return None
+        m = regex.match(path)
+        if m is None:
+            return None
+        return verdicts[m.lastindex - 1]
+
+
+def _read_gitignore(path):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return PatternSet(f) or None
+    except OSError:
+        return None
+
+
+class IgnoreRules:
+    """
+    src_base 下的排除规则：各级 .gitignore 加上 extra 模式（gitignore 语法，相对 src_base）
+
+    gitignore 为假时不读取 .gitignore，只用 extra 和 ALWAYS_EXCLUDED。
+    """
+
+    def __init__(self, src_base, extra=(), gitignore=True):
+        self.src_base = src_base
+        self.gitignore = gitignore
+        self.extra = PatternSet(list(ALWAYS_EXCLUDED) + list(extra))
+        # {相对目录: PatternSet 或 None}，'' 为 src_base 本身
+        self._loaded = {}
+
+    def _rules_for(self, rel_dir):
+        if rel_dir not in self._loaded:
+            self._loaded[rel_dir] = _read_gitignore(os.path.join(self.src_base, rel_dir, GITIGNORE))
+        return self._loaded[rel_dir]
+
+    def excluded(self, rel, is_dir=False):
+        """
+        rel（/ 分隔、相对 src_base）本身是否被排除，不检查上级目录
+
+        遍历时上级目录已经检查过，只需要看这一项；单独检查一个路径用 excluded_path。
+        """
+        verdict = self.extra.match(rel, is_dir)
+        if verdict is not None:
+            return verdict
+        if not self.gitignore:
+            return False
+        parts = rel.split('/')
+        # 从最深的目录往上找，第一个有匹配的 .gitignore 说了算
+        for depth in range(len(parts) - 1, -1, -1):
+            rules = self._rules_for('/'.join(parts[:depth]))
+            if rules is None:
+                continue
+            verdict = rules.match('/'.join(parts[depth:]), is_dir)
+            if verdict is not None:
+                return verdict
+        return False
+
+    def excluded_path(self, rel, is_dir=False):
+        """rel 或它的任一上级目录被排除时返回 True"""
+        parts = rel.split('/')
+        for i in range(1, len(parts)):
+            if self.excluded('/'.join(parts[:i]), True):
+                return True
+        return self.excluded(rel, is_dir)
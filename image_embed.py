@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Markdown 图片嵌入：解析本地路径、缩放到版心宽度、重新压缩，按内容寻址缓存
+
+单独成行的 ![替代文字](路径) 在分词时成为 IMAGE 块，路径相对 Markdown 文件所在目录解析。
+宽于版心的图片按 ImageOptions.dpi 缩到版心宽度对应的像素数，不透明的图片按 quality 压成 JPEG，
+带透明通道的保持 PNG；显示宽度不超过版心，宽高比不变。
+
+处理结果按（源文件 SHA-256, 目标像素宽度, 质量）缓存：进程内存一份（按条目数和总字节数限量，
+超出时淘汰最久没用过的），磁盘 .docx_cache/images/ 一份，同一张截图在多篇文章、多次转换之间只处理一次。
+包里的图片部件名和关系 ID 由处理后内容的哈希决定，同一张图引用多少次都只存一份。
+
+没有安装 Pillow 时不缩放、不重新压缩，原样嵌入，只按版心宽度限制显示尺寸。
+"""
+import hashlib
+import math
+import os
+import sys
+from collections import namedtuple
+from io import BytesIO
+from urllib.parse import unquote, urlsplit
+
+from docx.image.constants import MIME_TYPE
+from docx.image.exceptions import UnrecognizedImageError
+from docx.image.image import Image as DocxImage
+
+from md_tokenizer import IMAGE
+from section_cache import CACHE_DIR, LruCache, write_atomic
+
+try:
+    from PIL import Image as PILImage
+    from PIL import ImageOps
+except ImportError:
+    PILImage = None
+
+# 处理方式变化时递增，旧缓存自动失效
+IMAGE_VERSION = 2
+
+EMUS_PER_INCH = 914400
+IMAGE_REL_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/image'
+
+# python-docx 能识别的图片类型：扩展名 -> MIME 类型
+IMAGE_CONTENT_TYPES = {
+    'png': MIME_TYPE.PNG,
+    'jpg': MIME_TYPE.JPEG,
+    'gif': MIME_TYPE.GIF,
+    'bmp': MIME_TYPE.BMP,
+    'tiff': MIME_TYPE.TIFF,
+}
+
+# dpi      缩放时版心宽度对应的分辨率（像素/英寸）
+# quality  JPEG 质量（1-95）
+ImageOptions = namedtuple('ImageOptions', ['dpi', 'quality'], defaults=(150, 85))
+
+# 处理好、可以嵌入的图片
+# digest   处理后内容的 SHA-256，决定部件名 partname 和关系 ID rid
+# cx / cy  显示尺寸（EMU）
+EmbeddedImage = namedtuple('EmbeddedImage', [
+    'digest', 'data', 'ext', 'content_type', 'cx', 'cy', 'partname', 'rid',
+])
+
+# 无损格式的图片颜色数超过这个值才按照片改存 JPEG
+PHOTO_COLORS = 1 << 16
+
+# 进程内缓存的上限：处理后的图片 / 源文件摘要
+MEMORY_ENTRIES = 256
+MEMORY_BYTES = 64 * 1024 * 1024
+DIGEST_ENTRIES = 4096
+DIGEST_BYTES = 1024 * 1024
+
+
+_memory = LruCache(MEMORY_ENTRIES, MEMORY_BYTES)
+_source_digests = LruCache(DIGEST_ENTRIES, DIGEST_BYTES)
+
+
+def resolve_paths(blocks, base_dir):
+    """把 IMAGE 块里的相对路径换成相对 base_dir 的绝对路径；网络地址原样保留"""
+    for block in blocks:
+        if block.kind == IMAGE:
+            path = local_path(block.info, base_dir)
+            if path is not None:
+                block = block._replace(info=path)
+        yield block
+
+
+def local_path(src, base_dir):
+    """图片地址 -> 本地绝对路径；http(s)、data 等非本地地址返回 None"""
+    parts = urlsplit(src)
+    if parts.scheme == 'file':
+        return os.path.abspath(unquote(parts.path))
+    # Windows 盘符（C:/...）会被当成单字母的 scheme
+    if parts.scheme and len(parts.scheme) > 1:
+        return None
+    return os.path.abspath(os.path.join(base_dir, unquote(src)))
+
+
+def _source_digest(path):
+    """源文件内容的 SHA-256，按（路径, 修改时间, 大小）记住，文件没变就不再读"""
+    st = os.stat(path)
+    stamp = (path, st.st_mtime_ns, st.st_size)
+    digest = _source_digests.get(stamp)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _source_digests.put(stamp, digest, len(path) + len(digest))
+    return digest
+
+
+def _is_photographic(im):
+    """颜色数超过 PHOTO_COLORS 的按照片处理；截图、图表的颜色少，有损压缩会让文字和线条发糊"""
+    return im.getcolors(PHOTO_COLORS) is None
+
+
+def recompress(data, max_px, quality):
+    """
+    缩放到不超过 max_px 像素宽并重新压缩；没有 Pillow 或 Pillow 解不开（损坏、像素数超限）时原样返回
+
+    JPEG 源和照片类的无损图改存 JPEG，其余（截图、图表、带透明的图）仍存 PNG，只缩放不做有损压缩。
+    """
+    if PILImage is None:
+        return data
+    try:
+        return _recompress(data, max_px, quality)
+    except (PILImage.DecompressionBombError, OSError):
+        return data
+
+
+def _recompress(data, max_px, quality):
+    resized = False
+    with PILImage.open(BytesIO(data)) as im:
+        source_format = im.format
+        im = ImageOps.exif_transpose(im)
+        if im.width > max_px:
+            im = im.resize((max_px, max(1, round(im.height * max_px / im.width))), PILImage.LANCZOS)
+            resized = True
+        elif source_format == 'JPEG':
+            # 本来就不大的 JPEG 不再做一次有损压缩
+            return data
+
+        out = BytesIO()
+        transparent = im.mode in ('RGBA', 'LA') or (im.mode == 'P' and 'transparency' in im.info)
+        if transparent or (source_format != 'JPEG' and not _is_photographic(im)):
+            im.save(out, 'PNG', optimize=True)
+        else:
+            if im.mode not in ('RGB', 'L'):
+                im = im.convert('RGB')
+            im.save(out, 'JPEG', quality=quality, optimize=True, progressive=True)
+    result = out.getvalue()
+    # 没有缩放、重新压缩也没变小时保留原图（限 python-docx 认识的格式）
+    if not resized and len(result) >= len(data) and source_format in ('PNG', 'GIF', 'BMP', 'TIFF'):
+        return data
+    return result
+
+
+def add_image_types(content_types, extensions):
+    """在 [Content_Types].xml 里补上 extensions 中还没登记的图片扩展名的 Default，没有要补的时原样返回"""
+    defaults = ''.join(
+        f'<Default Extension="{ext}" ContentType="{IMAGE_CONTENT_TYPES[ext]}"/>'
+        for ext in sorted(extensions)
+        if f'Extension="{ext}"'.encode('utf-8') not in content_types)
+    if not defaults:
+        return content_types
+    end = content_types.rindex(b'</Types>')
+    return content_types[:end] + defaults.encode('utf-8') + content_types[end:]
+
+
+class ImageStore:
+    """
+    一次转换用到的图片
+
+    load(path) 处理并返回 EmbeddedImage（图片不存在或格式不认识时返回 None），
+    add(path) 同时登记到 images 里，写包时由 parts() / add_relationships() 写出部件和关系。
+    max_width 为版心宽度（EMU）；cache_dir 为 None 时只缓存在内存里。
+    """
+
+    def __init__(self, max_width, options=None, cache_dir=CACHE_DIR):
+        self.max_width = max_width
+        self.options = options or ImageOptions()
+        self.cache_dir = cache_dir
+        self.max_px = math.ceil(max_width / EMUS_PER_INCH * self.options.dpi)
+        self.images = {}
+        self.stats = {'cached': 0, 'processed': 0, 'missing': 0}
+        self._loaded = {}
+
+    def _cache_key(self, source_digest):
+        mode = 'pil' if PILImage is not None else 'raw'
+        key = f'{IMAGE_VERSION}:{source_digest}:{self.max_px}:{self.options.quality}:{mode}'
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, 'images', key[:2], key)
+
+    def _processed(self, path):
+        """处理后的图片字节，先查内存、再查磁盘，都没有才缩放压缩"""
+        key = self._cache_key(_source_digest(path))
+        data = _memory.get(key)
+        if data is None and self.cache_dir is not None:
+            try:
+                with open(self._cache_path(key), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                pass
+        if data is not None:
+            self.stats['cached'] += 1
+        else:
+            with open(path, 'rb') as f:
+                data = recompress(f.read(), self.max_px, self.options.quality)
+            if self.cache_dir is not None:
+                write_atomic(self._cache_path(key), data)
+            self.stats['processed'] += 1
+        _memory.put(key, data, len(data))
+        return data
+
+    def load(self, path):
+        if path in self._loaded:
+            return self._loaded[path]
+        image = None
+        try:
+            data = self._processed(path)
+            info = DocxImage.from_blob(data)
+        except FileNotFoundError:
+            print(f"⚠️ 找不到图片: {path}", file=sys.stderr)
+            self.stats['missing'] += 1
+        except (OSError, UnrecognizedImageError) as e:
+            print(f"⚠️ 无法处理图片 {path}: {type(e).__name__}: {e}", file=sys.stderr)
+            self.stats['missing'] += 1
+        else:
+            # 原始尺寸按图片自带的 DPI 计算，宽于版心时等比缩到版心宽度
+            cx, cy = info.width, info.height
+            if cx > self.max_width:
+                cx, cy = self.max_width, round(cy * self.max_width / cx)
+            digest = hashlib.sha256(data).hexdigest()
+            image = EmbeddedImage(digest, data, info.ext, info.content_type, int(cx), int(cy),
+                                  f'word/media/image-{digest[:16]}.{info.ext}', f'rIdImg{digest[:16]}')
+        self._loaded[path] = image
+        return image
+
+    def add(self, path):
+        image = self.load(path)
+        if image is not None:
+            self.images.setdefault(image.digest, image)
+        return image
+
+    def extensions(self):
+        """已登记图片用到的扩展名"""
+        return {image.ext for image in self.images.values()}
+
+    def parts(self):
+        """[(部件名, 字节)]，每张不同的图片一份"""
+        return [(image.partname, image.data) for image in self.images.values()]
+
+    def add_relationships(self, rels):
+        """在 document.xml.rels 里加上各图片的关系"""
+        if not self.images:
+            return rels
+        added = ''.join(
+            f'<Relationship Id="{image.rid}" Type="{IMAGE_REL_TYPE}" '
+            f'Target="media/{os.path.basename(image.partname)}"/>'
+            for image in self.images.values())
+        end = rels.rindex(b'</Relationships>')
+        return rels[:end] + added.encode('utf-8') + rels[end:]
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+转换过程的分阶段计时、计数与内存追踪
+
+build_docx 在各阶段（模板、解析、章节缓存、渲染、保存）打点；
+流水线是边解析边渲染边写 zip 的，阶段互相嵌套，这里记的是各阶段的独占时间：
+进入内层阶段时暂停外层计时，所有阶段时间加起来等于总耗时。
+
+不传 instrument 时使用 NULL_INSTRUMENT，所有钩子都是空操作。
+
+用法：
+    stats = Instrument(trace_memory=True)
+    markdown_to_docx('a.md', 'a.docx', instrument=stats)
+    stats.write_json('a.profile.json')
+"""
+import contextlib
+import json
+import time
+import tracemalloc
+
+_MB = 1024 * 1024
+
+
+class Instrument:
+    """记录阶段耗时、计数器，以及可选的 tracemalloc 峰值内存"""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.timings = {}
+        self.calls = {}
+        self.peaks = {}
+        self.counters = {}
+        self.total = 0.0
+        self._stack = []
+        self._mark = None
+        self._start = None
+        self._owns_tracing = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracing = True
+            tracemalloc.reset_peak()
+        self._start = self._mark = time.perf_counter()
+
+    def stop(self):
+        self._switch()
+        self.total += time.perf_counter() - self._start
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    def _switch(self):
+        """把上次打点以来的时间和内存峰值记到当前阶段上"""
+        now = time.perf_counter()
+        if self._stack:
+            name = self._stack[-1]
+            self.timings[name] = self.timings.get(name, 0.0) + now - self._mark
+            if self.trace_memory and tracemalloc.is_tracing():
+                peak = tracemalloc.get_traced_memory()[1]
+                if peak > self.peaks.get(name, 0):
+                    self.peaks[name] = peak
+                tracemalloc.reset_peak()
+        self._mark = now
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """计时一个阶段；嵌套时外层阶段暂停"""
+        self._switch()
+        self._stack.append(name)
+        self.calls[name] = self.calls.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            self._switch()
+            self._stack.pop()
+
+    def iter_stage(self, name, iterable, counter=None):
+        """逐项取值时计入 name 阶段；counter(item) 返回计数器名时顺带计数"""
+        it = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            if counter is not None:
+                self.count(counter(item))
+            yield item
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def wrap_builder(self, builder):
+        return CountingBuilder(builder, self)
+
+    def report(self):
+        """整理成可序列化为 JSON 的字典"""
+        staged = sum(self.timings.values())
+        stages = {}
+        for name, seconds in sorted(self.timings.items(), key=lambda item: -item[1]):
+            stages[name] = {'seconds': round(seconds, 6), 'calls': self.calls.get(name, 0)}
+            if name in self.peaks:
+                stages[name]['peak_memory_mb'] = round(self.peaks[name] / _MB, 3)
+        report = {
+            'total_seconds': round(self.total, 6),
+            'other_seconds': round(max(self.total - staged, 0.0), 6),
+            'stages': stages,
+            'counters': dict(sorted(self.counters.items())),
+        }
+        if self.peaks:
+            report['peak_memory_mb'] = round(max(self.peaks.values()) / _MB, 3)
+        return report
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+
+class _NullInstrument:
+    """不做任何记录的占位实现"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    def stage(self, name):
+        return contextlib.nullcontext()
+
+    def iter_stage(self, name, iterable, counter=None):
+        return iterable
+
+    def count(self, name, n=1):
+        pass
+
+    def wrap_builder(self, builder):
+        return builder
+
+
+NULL_INSTRUMENT = _NullInstrument()
+
+
+class CountingBuilder:
+    """包在构建器外层，统计段落、Run、表格、图片数量，其余属性原样转发"""
+
+    def __init__(self, builder, instrument):
+        self._builder = builder
+        self._instrument = instrument
+
+    def __getattr__(self, name):
+        return getattr(self._builder, name)
+
+    def heading(self, runs, level):
+        self._instrument.count('headings')
+        self._instrument.count('paragraphs')
+        self._instrument.count('runs', len(runs))
+        self._builder.heading(runs, level)
+
+    def paragraph(self, runs=(), *args, **kwargs):
+        self._instrument.count('paragraphs')
+        self._instrument.count('runs', len(runs))
+        self._builder.paragraph(runs, *args, **kwargs)
+
+    def table(self, rows, align=None, style='Table Grid'):
+        self._instrument.count('tables')
+        self._instrument.count('table_rows', len(rows))
+        self._builder.table(rows, align, style)
+
+    def image(self, path, alt=''):
+        embedded = self._builder.image(path, alt)
+        if embedded:
+            self._instrument.count('paragraphs')
+            self._instrument.count('images')
+        return embedded
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+按配置驱动的 Markdown→DOCX 转换引擎
+
+各转换脚本之间只差页边距、中文字体、标题字号颜色、代码块样式等设置，
+渲染流程完全相同。这里把差异收进 Profile，渲染逻辑只写一份：
+转换脚本只需声明自己的 Profile，再调用 convert()。
+"""
+import os
+from collections import namedtuple
+
+from docx.oxml.ns import qn
+from docx.shared import Inches, Pt, RGBColor
+
+from code_highlight import highlight_runs
+from doc_builder import Run
+from docx_pipeline import build_docx
+from image_embed import resolve_paths
+from md_inline import inline_runs
+from md_tokenizer import (
+    group_tables, HEADING, PARAGRAPH, LIST_ITEM, CODE, TABLE, QUOTE, IMAGE,
+)
+from parse_cache import cached_file_blocks
+from section_cache import CACHE_DIR
+from text_cleanup import clean_line
+
+# 代码块样式；长度单位：缩进为英寸，段距为磅
+# highlight 为真时按语言语法着色，color 为认不出语言时的整段颜色；否则整段使用 color
+# strip 去掉代码首尾空白，skip_empty 跳过空代码块
+CodeStyle = namedtuple('CodeStyle', [
+    'font', 'size', 'style', 'left_indent', 'space_before', 'space_after',
+    'highlight', 'color', 'strip', 'skip_empty',
+], defaults=('Consolas', None, None, None, None, None, False, None, False, False))
+
+# 转换配置
+# name             转换器名加版本号，渲染结果有变化时递增（模板名和章节缓存命名空间）
+# margins          四边页边距（英寸），None 为 python-docx 默认
+# font             正文和 font_styles 中各样式的字体（同时设置东亚字体），None 不修改
+# heading_styles   {样式名: (字号, 'RRGGBB' 或 None)}，列出的样式同时设为粗体
+# heading_shift    Markdown 标题级别的偏移（-1 表示 # 作为文档标题）
+# max_heading      最大标题级别
+# clean_html       是否清理行内 HTML 标签和实体
+# list_indent      列表项左缩进（英寸）
+# quote_indent     引用左缩进（英寸）
+# quote_first_line 引用首行缩进（英寸）
+Profile = namedtuple('Profile', [
+    'name', 'margins', 'font', 'font_styles', 'heading_styles', 'heading_shift', 'max_heading',
+    'clean_html', 'code', 'list_indent', 'quote_indent', 'quote_first_line',
+], defaults=(None, None, (), None, 0, 3, True, CodeStyle(), None, None, None))
+
+
+def _inches(value):
+    return Inches(value) if value is not None else None
+
+
+def _pt(value):
+    return Pt(value) if value is not None else None
+
+
+def setup_styles(profile, doc):
+    """按配置设置页边距、字体和标题样式（只在构建模板时执行一次）"""
+    if profile.margins is not None:
+        section = doc.sections[0]
+        section.left_margin = Inches(profile.margins)
+        section.right_margin = Inches(profile.margins)
+        section.top_margin = Inches(profile.margins)
+        section.bottom_margin = Inches(profile.margins)
+
+    for style_name, (size, color) in (profile.heading_styles or {}).items():
+        font = doc.styles[style_name].font
+        font.bold = True
+        font.size = Pt(size)
+        if color is not None:
+            font.color.rgb = RGBColor.from_string(color)
+
+    if profile.font:
+        for style_name in profile.font_styles:
+            style = doc.styles[style_name]
+            style.font.name = profile.font
+            style._element.rPr.rFonts.set(qn('w:eastAsia'), profile.font)
+
+
+def code_paragraph(profile, builder, block, cache_dir=CACHE_DIR):
+    """按代码块样式写出一个代码块；高亮结果缓存在 cache_dir 下，None 时不使用磁盘缓存"""
+    code_style = profile.code
+    code = block.text.strip() if code_style.strip else block.text
+    if code_style.skip_empty and not code:
+        return
+    if code_style.highlight:
+        runs = highlight_runs(code, block.info or 'text', code_style.font, code_style.size,
+                              fallback_color=code_style.color, cache_dir=cache_dir)
+    else:
+        runs = [Run(code, font=code_style.font, size=code_style.size, color=code_style.color)]
+    builder.paragraph(runs, style=code_style.style, left_indent=_inches(code_style.left_indent),
+                      space_before=_pt(code_style.space_before), space_after=_pt(code_style.space_after),
+                      code=True)
+
+
+def _inline(profile, text):
+    """行内格式解析；clean_html 时只清理代码段以外的文字，行内代码里的 HTML 原样保留"""
+    return inline_runs(text, clean=clean_line if profile.clean_html else None)
+
+
+def render_blocks(profile, builder, blocks, cache_dir=CACHE_DIR):
+    """把一组Markdown块写入文档；cache_dir 为代码高亮的缓存目录，None 时不使用磁盘缓存"""
+    for block in group_tables(blocks):
+        # 连续的表格行已收拢成一整张表
+        if block.kind == TABLE:
+            rows = [[_inline(profile, text) for text in row] for row in block.info]
+            builder.table(rows, block.align)
+            continue
+
+        # 代码块原样输出
+        if block.kind == CODE:
+            code_paragraph(profile, builder, block, cache_dir)
+            continue
+
+        # 图片嵌入失败（找不到、网络地址）时退回替代文字
+        if block.kind == IMAGE:
+            if not builder.image(block.info, block.text) and block.text:
+                builder.paragraph([Run(block.text, italic=True)])
+            continue
+
+        if block.kind == HEADING:
+            builder.heading(_inline(profile, block.text),
+                            min(block.level + profile.heading_shift, profile.max_heading))
+        elif block.kind == LIST_ITEM:
+            builder.paragraph(_inline(profile, block.text), style='List Bullet',
+                              left_indent=_inches(profile.list_indent))
+        elif block.kind == QUOTE:
+            builder.paragraph(_inline(profile, block.text), left_indent=_inches(profile.quote_indent),
+                              first_line_indent=_inches(profile.quote_first_line))
+        elif block.kind == PARAGRAPH:
+            # 粗体、斜体、行内代码、链接一次解析
+            builder.paragraph(_inline(profile, block.text))
+
+
+def convert(profile, md_file, docx_file, cache_dir=CACHE_DIR, fast=True, instrument=None, save=None,
+            images=None):
+    """
+    按配置把Markdown文件转换为DOCX，返回 (复用章节数, 重新渲染章节数)
+
+    分词结果和未改动的章节直接复用缓存；fast=False 时使用python-docx对象模型，
+    instrument 为 instrument.Instrument 时记录各阶段耗时和计数，
+    save 为 docx_save.SaveOptions 时按其指定的压缩方式和组装方式保存，
+    images 为 image_embed.ImageOptions 时按其缩放和压缩图片；图片路径相对 Markdown 文件所在目录。
+    """
+    stats = {}
+    blocks = resolve_paths(cached_file_blocks(md_file, cache_dir, stats=stats),
+                           os.path.dirname(os.path.abspath(md_file)))
+    result = build_docx(blocks, docx_file,
+                        lambda builder, blocks: render_blocks(profile, builder, blocks, cache_dir),
+                        lambda doc: setup_styles(profile, doc),
+                        profile.name, cache_dir, fast, instrument, save, images)
+    if instrument is not None and stats['hits']:
+        instrument.count('parse.cached', stats['hits'])
+    return result
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Markdown 行内格式解析（粗体、斜体、行内代码、链接）
+
+各转换脚本共用的单遍解析器，取代原先各自的 re.sub / re.split 链：
+一次扫描切出文本、代码段、链接括号和 * / _ 分隔符，
+再按 CommonMark 的分隔符栈算法配对强调，整体为线性时间。
+输出的 Run 列表中相邻同格式的片段已合并，段落里的 Run 数尽可能少。
+
+链接只保留链接文字（DOCX 超链接需要额外的关系部件），网址丢弃。
+"""
+import re
+
+from doc_builder import Run
+
+# 行内代码的反引号串 | 强调分隔符串 | 链接括号 | 反斜杠转义
+_TOKEN_RE = re.compile(r'(`+)|(\*+|_+)|(!?\[|\])|\\([!-/:-@\[-`{-~])')
+_BACKTICKS_RE = re.compile(r'`+')
+
+
+class _Delim:
+    """分隔符栈中的一项，prev/next 组成双向链表，删除为 O(1)"""
+    __slots__ = ('token', 'char', 'count', 'length', 'can_open', 'can_close', 'prev', 'next')
+
+    def __init__(self, token, char, count, can_open, can_close):
+        self.token = token
+        self.char = char
+        self.count = count
+        self.length = count
+        self.can_open = can_open
+        self.can_close = can_close
+        self.prev = None
+        self.next = None
+
+
+def _flanking(text, start, end, char):
+    """判断分隔符串能否开启 / 关闭强调；_ 在单词内部（snake_case）不算分隔符"""
+    before = text[start - 1] if start > 0 else ' '
+    after = text[end] if end < len(text) else ' '
+    can_open = not after.isspace()
+    can_close = not before.isspace()
+    if char == '_':
+        can_open = can_open and not before.isalnum()
+        can_close = can_close and not after.isalnum()
+    return can_open, can_close
+
+
+def _code_closers(text):
+    """各长度反引号串的起始位置，供代码段按序查找闭合串（指针只前进，整体线性）"""
+    closers = {}
+    for m in _BACKTICKS_RE.finditer(text):
+        closers.setdefault(len(m.group()), []).append(m.start())
+    return closers
+
+
+def _paren_pairs(text):
+    """一遍扫描求出每个 '(' 匹配的 ')' 之后的位置，括号可嵌套，不跨行，跳过转义"""
+    pairs = {}
+    stack = []
+    i = 0
+    while i < len(text):
+        c = text[i]
+        i += 1
+        if c == '\\':
+            i += 1
+        elif c == '(':
+            stack.append(i - 1)
+        elif c == ')':
+            if stack:
+                pairs[stack.pop()] = i
+        elif c == '\n':
+            stack = []
+    return pairs
+
+
+def _process_emphasis(bottom, top):
+    """
+    在分隔符链表 bottom 之后（不含）配对强调，top 为链表尾部；返回新的链表尾部
+
+    配对结果记在 token 上：closes 为在该分隔符前结束的格式，opens 为在其后开始的格式。
+    openers_bottom 记录每类闭合符已查找过的下界，保证整体线性。
+    """
+    openers_bottom = {}
+    if bottom is not None:
+        current = bottom.next
+    else:
+        # 没有下界时从链表头开始
+        current = top
+        while current is not None and current.prev is not None:
+            current = current.prev
+    while current is not None:
+        if not current.can_close:
+            current = current.next
+            continue
+        key = (current.char, current.can_open, current.length % 3)
+        limit = openers_bottom.get(key, bottom)
+        opener = current.prev
+        while opener is not None and opener is not bottom and opener is not limit:
+            if opener.char == current.char and opener.can_open:
+                # 规则 3：两端都可开可闭时长度和为 3 的倍数不配对（除非各自都是 3 的倍数）
+                if not ((opener.can_close or current.can_open)
+                        and (opener.length + current.length) % 3 == 0
+                        and (opener.length % 3 or current.length % 3)):
+                    break
+            opener = opener.prev
+        else:
+            opener = None
+
+        if opener is None:
+            openers_bottom[key] = current.prev
+            nxt = current.next
+            if not current.can_open:
+                top = _unlink(current, top)
+            current = nxt
+            continue
+
+        use = 2 if opener.count >= 2 and current.count >= 2 else 1
+        fmt = 'bold' if use == 2 else 'italic'
+        opener.count -= use
+        current.count -= use
+        opener.token[3].append(fmt)
+        current.token[2].append(fmt)
+        opener.token[1] = opener.char * opener.count
+        current.token[1] = current.char * current.count
+        # 中间未配对的分隔符不再参与
+        opener.next = current
+        current.prev = opener
+        if opener.count == 0:
+            top = _unlink(opener, top)
+        if current.count == 0:
+            nxt = current.next
+            top = _unlink(current, top)
+            current = nxt
+
+    # bottom 以上的分隔符处理完毕，全部出栈
+    if bottom is not None:
+        bottom.next = None
+        return bottom
+    return None
+
+
+def _unlink(delim, top):
+    if delim.prev is not None:
+        delim.prev.next = delim.next
+    if delim.next is not None:
+        delim.next.prev = delim.prev
+    if delim is top:
+        top = delim.prev
+    return top
+
+
+def _tokenize(text):
+    """
+    单遍切分并配对，返回 token 列表：[种类, 文本, closes, opens]
+
+    种类为 'text'、'code' 或 'delim'（配对后剩余的分隔符按字面文本输出）；
+    closes / opens 中的格式为 'bold'、'italic'、'link'。
+    """
+    tokens = []
+    top = None           # 分隔符链表尾部
+    brackets = []        # [(token, 分隔符链表尾部, 是否可用, 是否图片)]
+    closers = None
+    cursor = {}          # 各长度反引号串已查找到的下标
+    parens = None
+    pos = 0
+    while True:
+        m = _TOKEN_RE.search(text, pos)
+        if m is None:
+            break
+        start, end = m.span()
+        if start > pos:
+            tokens.append(['text', text[pos:start], [], []])
+        pos = end
+        ticks, delim, bracket, escaped = m.groups()
+
+        if escaped is not None:
+            tokens.append(['text', escaped, [], []])
+        elif ticks is not None:
+            if closers is None:
+                closers = _code_closers(text)
+            # 找同长度的下一串反引号作为闭合，找不到则按字面文本处理
+            starts = closers.get(len(ticks), ())
+            i = cursor.get(len(ticks), 0)
+            while i < len(starts) and starts[i] < end:
+                i += 1
+            cursor[len(ticks)] = i
+            if i < len(starts):
+                close = starts[i]
+                code = text[end:close].replace('\n', ' ')
+                if code.strip() and code[0] == ' ' and code[-1] == ' ':
+                    code = code[1:-1]
+                tokens.append(['code', code, [], []])
+                pos = close + len(ticks)
+            else:
+                tokens.append(['text', ticks, [], []])
+        elif delim is not None:
+            can_open, can_close = _flanking(text, start, end, delim[0])
+            token = ['delim', delim, [], []]
+            tokens.append(token)
+            if can_open or can_close:
+                d = _Delim(token, delim[0], len(delim), can_open, can_close)
+                d.prev = top
+                if top is not None:
+                    top.next = d
+                top = d
+        elif bracket != ']':
+            token = ['text', bracket, [], []]
+            tokens.append(token)
+            brackets.append([token, top, True, bracket == '!['])
+        else:
+            link_end = -1
+            if brackets and pos < len(text) and text[pos] == '(':
+                if parens is None:
+                    parens = _paren_pairs(text)
+                link_end = parens.get(pos, -1)
+            if link_end < 0 or not brackets[-1][2]:
+                if brackets:
+                    brackets.pop()
+                tokens.append(['text', ']', [], []])
+                continue
+            opener, bottom, _, image = brackets.pop()
+            # 链接文字内部的强调先配对，不能跨出链接
+            top = _process_emphasis(bottom, top)
+            opener[1] = ''
+            pos = link_end
+            if image:
+                # 段落中间的图片只保留替代文字（单独成行的图片在分词时已成为 IMAGE 块）
+                continue
+            opener[3].append('link')
+            tokens.append(['text', '', ['link'], []])
+            # 链接里不能再嵌套链接（图片里可以有链接）
+            for item in brackets:
+                if not item[3]:
+                    item[2] = False
+
+    if pos < len(text):
+        tokens.append(['text', text[pos:], [], []])
+    _process_emphasis(None, top)
+    return tokens
+
+
+def inline_runs(text, bold=False, italic=False, code_font='Consolas', link_color=None, clean=None):
+    """
+    把一段带行内标记的文本转换为 Run 列表，相邻同格式的 Run 已合并
+
+    bold / italic 为整段的基础格式；行内代码使用 code_font，链接文字可用 link_color 着色。
+    clean 为文本处理函数（如 text_cleanup.clean_line）时只作用于代码段以外的 Run，
+    行内代码里的 <div>、&amp; 等原样保留。
+    """
+    if not text:
+        return []
+    if not any(c in text for c in '*_`[\\'):
+        if clean is not None:
+            text = clean(text)
+        return [Run(text, bold, italic)] if text else []
+
+    runs = []
+
+    def emit(value, fmt):
+        if clean is not None and fmt[2] is None:
+            value = clean(value)
+        if value:
+            runs.append(Run(value, *fmt[:3], None, fmt[3]))
+
+    pieces = []
+    depth = {'bold': int(bool(bold)), 'italic': int(bool(italic)), 'link': 0}
+    last_fmt = None
+    for kind, value, closes, opens in _tokenize(text):
+        for fmt in closes:
+            depth[fmt] -= 1
+        if value:
+            fmt = (depth['bold'] > 0, depth['italic'] > 0,
+                   code_font if kind == 'code' else None,
+                   link_color if depth['link'] > 0 else None)
+            if fmt != last_fmt:
+                if pieces:
+                    emit(''.join(pieces), last_fmt)
+                pieces = []
+                last_fmt = fmt
+            pieces.append(value)
+        for fmt in opens:
+            depth[fmt] += 1
+    if pieces:
+        emit(''.join(pieces), last_fmt)
+    return runs
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Markdown 流式块级分词器
+
+逐行扫描 Markdown 源，直接产出带类型的块事件（标题、段落、列表项、代码块、
+表格行、引用、分隔线、单独成行的图片），各转换脚本拿到事件后直接写入 DOCX，
+不再走 Markdown → HTML → 逐行去标签 的往返。
+
+只保留当前块的行缓冲，整个输入只扫描一遍。
+"""
+import re
+from collections import namedtuple
+
+HEADING = 'heading'
+PARAGRAPH = 'paragraph'
+LIST_ITEM = 'list_item'
+CODE = 'code'
+TABLE_ROW = 'table_row'
+TABLE = 'table'
+QUOTE = 'quote'
+RULE = 'rule'
+IMAGE = 'image'
+
+# 分词规则或块结构变化时加一，parse_cache 里的旧缓存随之失效
+PARSER_VERSION = 1
+
+# kind   块类型
+# text   块文本（段落、列表项、引用的多行用 '\n' 连接；代码块为原始代码；图片为替代文字）
+# level  标题级别 / 列表缩进层级 / 引用嵌套层级；表格行、表格中 1 表示带表头
+# info   代码块语言 / 有序列表序号（无序列表为 None）/ 表格行单元格元组 / 表格的行元组 / 图片地址
+# align  表头行与表格的列对齐方式元组，元素为 'left'、'center'、'right' 或 None
+Block = namedtuple('Block', ['kind', 'text', 'level', 'info', 'align'],
+                   defaults=('', 0, None, None))
+
+_HEADING_RE = re.compile(r'^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$')
+_FENCE_RE = re.compile(r'^( {0,3})(`{3,}|~{3,})[ \t]*([^`\s]*)')
+_RULE_RE = re.compile(r'^ {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$')
+_LIST_RE = re.compile(r'^([ \t]*)([-*+]|\d{1,9}[.)])[ \t]+(.*)$')
+_QUOTE_RE = re.compile(r'^ {0,3}>[ ]?(.*)$')
+_TABLE_DELIM_RE = re.compile(r'^[ \t]*\|?[ \t]*:?-+:?[ \t]*(?:\|[ \t]*:?-+:?[ \t]*)*\|?[ \t]*$')
+_CELL_SPLIT_RE = re.compile(r'(?<!\\)\|')
+# 单独占一行的 ![替代文字](地址 "标题")，标题忽略
+_IMAGE_RE = re.compile(r'^ {0,3}!\[([^\]]*)\]\([ \t]*(?:<([^<>]*)>|([^\s<>()]+))'
+                       r'(?:[ \t]+(?:"[^"]*"|\'[^\']*\'))?[ \t]*\)[ \t]*$')
+
+
+def split_table_cells(line):
+    """把表格行拆成单元格元组，去掉首尾竖线并还原转义的 \\|"""
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|') and not line.endswith('\\|'):
+        line = line[:-1]
+    return tuple(c.strip().replace('\\|', '|') for c in _CELL_SPLIT_RE.split(line))
+
+
+def parse_alignments(line):
+    """解析表格对齐行，如 |:--|:-:|--:| -> ('left', 'center', 'right')"""
+    alignments = []
+    for cell in split_table_cells(line):
+        left, right = cell.startswith(':'), cell.endswith(':')
+        if left and right:
+            alignments.append('center')
+        elif right:
+            alignments.append('right')
+        elif left:
+            alignments.append('left')
+        else:
+            alignments.append(None)
+    return tuple(alignments)
+
+
+def _list_level(indent):
+    """列表缩进层级：制表符按 4 个空格计，每 2 个空格一级"""
+    return len(indent.replace('\t', '    ')) // 2
+
+
+def iter_blocks(lines):
+    """从任意行迭代器（文件对象、列表等）中流式产出 Block"""
+    pending_kind = None
+    pending_lines = []
+    pending_level = 0
+    pending_info = None
+
+    fence = None
+    fence_lang = None
+    code_lines = []
+
+    table_head = None
+    in_table = False
+    in_comment = False
+
+    for raw in lines:
+        line = raw.rstrip('\r\n')
+
+        # 围栏代码块内部：原样收集，直到遇到同类且不短于开头的围栏
+        if fence is not None:
+            stripped = line.strip()
+            if stripped.startswith(fence) and not stripped.lstrip(fence[0]).strip():
+                yield Block(CODE, '\n'.join(code_lines), 0, fence_lang)
+                fence = None
+                code_lines = []
+            else:
+                code_lines.append(line)
+            continue
+
+        # HTML 注释整体跳过
+        if in_comment:
+            if '-->' in line:
+                in_comment = False
+            continue
+
+        stripped = line.strip()
+
+        # 表格：第一行先暂存，看下一行是否是对齐行再决定是不是表头
+        if table_head is not None:
+            head = table_head
+            table_head = None
+            if _TABLE_DELIM_RE.match(line) and '-' in stripped:
+                in_table = True
+                yield Block(TABLE_ROW, '', 1, head, parse_alignments(stripped))
+                continue
+            yield Block(TABLE_ROW, '', 0, head)
+            in_table = True
+        if in_table:
+            if stripped.startswith('|'):
+                if not (_TABLE_DELIM_RE.match(line) and '-' in stripped):
+                    yield Block(TABLE_ROW, '', 0, split_table_cells(stripped))
+                continue
+            in_table = False
+
+        if not stripped:
+            if pending_kind is not None:
+                yield Block(pending_kind, '\n'.join(pending_lines), pending_level, pending_info)
+                pending_kind = None
+            continue
+
+        if stripped.startswith('<!--'):
+            if '-->' not in stripped[4:]:
+                in_comment = True
+            continue
+
+        m = _FENCE_RE.match(line)
+        if m:
+            if pending_kind is not None:
+                yield Block(pending_kind, '\n'.join(pending_lines), pending_level, pending_info)
+                pending_kind = None
+            fence = m.group(2)
+            fence_lang = m.group(3) or None
+            continue
+
+        m = _HEADING_RE.match(line)
+        if m:
+            if pending_kind is not None:
+                yield Block(pending_kind, '\n'.join(pending_lines), pending_level, pending_info)
+                pending_kind = None
+            yield Block(HEADING, (m.group(2) or '').strip(), len(m.group(1)))
+            continue
+
+        if _RULE_RE.match(line):
+            if pending_kind is not None:
+                yield Block(pending_kind, '\n'.join(pending_lines), pending_level, pending_info)
+                pending_kind = None
+            yield Block(RULE)
+            continue
+
+        if stripped.startswith('|'):
+            if pending_kind is not None:
+                yield Block(pending_kind, '\n'.join(pending_lines), pending_level, pending_info)
+                pending_kind = None
+            table_head = split_table_cells(stripped)
+            continue
+
+        m = _QUOTE_RE.match(line)
+        if m:
+            level = 1
+            text = m.group(1)
+            m = _QUOTE_RE.match(text)
+            while m:
+                level += 1
+                text = m.group(1)
+                m = _QUOTE_RE.match(text)
+            if pending_kind == QUOTE and pending_level == level:
+                pending_lines.append(text)
+                continue
+            if pending_kind is not None:
+                yield Block(pending_kind, '\n'.join(pending_lines), pending_level, pending_info)
+            pending_kind, pending_lines, pending_level, pending_info = QUOTE, [text], level, None
+            continue
+
+        m = _LIST_RE.match(line)
+        if m:
+            if pending_kind is not None:
+                yield Block(pending_kind, '\n'.join(pending_lines), pending_level, pending_info)
+            marker = m.group(2)
+            number = marker[:-1] if marker[-1] in '.)' else None
+            pending_kind, pending_lines = LIST_ITEM, [m.group(3).strip()]
+            pending_level, pending_info = _list_level(m.group(1)), number
+            continue
+
+        m = _IMAGE_RE.match(line)
+        if m:
+            if pending_kind is not None:
+                yield Block(pending_kind, '\n'.join(pending_lines), pending_level, pending_info)
+                pending_kind = None
+            yield Block(IMAGE, m.group(1).strip(), 0, m.group(2) or m.group(3))
+            continue
+
+        # 普通文本行：续接当前段落 / 列表项 / 引用（惰性续行），否则开启新段落
+        if pending_kind is not None:
+            pending_lines.append(stripped)
+        else:
+            pending_kind, pending_lines, pending_level, pending_info = PARAGRAPH, [stripped], 0, None
+
+    if table_head is not None:
+        yield Block(TABLE_ROW, '', 0, table_head)
+    if fence is not None:
+        yield Block(CODE, '\n'.join(code_lines), 0, fence_lang)
+    if pending_kind is not None:
+        yield Block(pending_kind, '\n'.join(pending_lines), pending_level, pending_info)
+
+
+def group_tables(blocks):
+    """把连续的表格行收拢成一个 TABLE 块（对齐行已在分词时去掉），其余块原样透传"""
+    rows = []
+    header = 0
+    align = None
+    for block in blocks:
+        if block.kind == TABLE_ROW:
+            if not rows:
+                header, align = block.level, block.align
+            elif block.level:
+                # 新的表头行意味着另一张表开始
+                yield Block(TABLE, '', header, tuple(rows), align)
+                rows = []
+                header, align = block.level, block.align
+            rows.append(block.info)
+            continue
+        if rows:
+            yield Block(TABLE, '', header, tuple(rows), align)
+            rows = []
+        yield block
+    if rows:
+        yield Block(TABLE, '', header, tuple(rows), align)
+
+
+def iter_file_blocks(md_file):
+    """打开 Markdown 文件并逐块产出，文件按行流式读取"""
+    with open(md_file, 'r', encoding='utf-8') as f:
+        yield from iter_blocks(f)
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+直接写 OOXML 的快速通道
+
+XmlBuilder 与 doc_builder.DocxBuilder 方法相同，但不创建 python-docx 对象，
+直接拼出与 python-docx 序列化结果一致的 document.xml 片段。
+write_package 以样式模板为底，原样复制除 document.xml 以外的所有部件，
+document.xml 则边生成边分块压缩写入 zip（见 parallel_zip.py），内存占用不随元素树增长。
+
+图片部件和关系按内容寻址（见 image_embed.py），写包时随 document.xml 之后补上，
+[Content_Types].xml 延后到最后生成、只登记实际用到的图片扩展名（见 parallel_zip.write_zip）；
+需要新增其他包部件或关系（超链接等）的特性仍走 python-docx。
+"""
+import re
+import zipfile
+from collections import namedtuple
+from functools import lru_cache
+from io import BytesIO
+
+from docx.styles import BabelFish
+from lxml import etree
+
+from image_embed import add_image_types
+from parallel_zip import write_zip
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+DOCUMENT_PART = 'word/document.xml'
+DOCUMENT_RELS_PART = 'word/_rels/document.xml.rels'
+CONTENT_TYPES_PART = '[Content_Types].xml'
+STYLES_PART = 'word/styles.xml'
+
+_EMUS_PER_TWIP = 635
+
+# python-docx 不接受的 XML 非法字符，快速通道直接丢弃
+_INVALID_XML_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+_SPECIAL_RE = re.compile(r'([\t\r\n])')
+
+_JC_VALUES = {'left': 'left', 'center': 'center', 'right': 'right', 'justify': 'both'}
+
+# parts: [(部件名, 字节)]，document.xml 的位置上字节为 None；head/tail: document.xml 中正文内容之前/之后的字节
+PackageTemplate = namedtuple('PackageTemplate', ['parts', 'head', 'tail', 'style_ids', 'block_width'])
+
+
+def escape(text):
+    """按 lxml 的方式转义文本节点"""
+    if _INVALID_XML_RE.search(text):
+        text = _INVALID_XML_RE.sub('', text)
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _t_xml(text):
+    if text != text.strip():
+        return f'<w:t xml:space="preserve">{escape(text)}</w:t>'
+    return f'<w:t>{escape(text)}</w:t>'
+
+
+def run_xml(run):
+    """Run -> <w:r>，制表符和换行与 python-docx 一样拆成 <w:tab/> / <w:br/>"""
+    props = []
+    if run.font:
+        font = escape(run.font).replace('"', '&quot;')
+        props.append(f'<w:rFonts w:ascii="{font}" w:hAnsi="{font}"/>')
+    if run.bold:
+        props.append('<w:b/>')
+    if run.italic:
+        props.append('<w:i/>')
+    if run.color:
+        props.append(f'<w:color w:val="{run.color.upper()}"/>')
+    if run.size:
+        props.append(f'<w:sz w:val="{int(run.size * 2)}"/>')
+    rpr = f'<w:rPr>{"".join(props)}</w:rPr>' if props else ''
+
+    text = run.text
+    if not text:
+        return f'<w:r>{rpr}</w:r>' if rpr else '<w:r/>'
+    if '\t' not in text and '\n' not in text and '\r' not in text:
+        return f'<w:r>{rpr}{_t_xml(text)}</w:r>'
+    content = []
+    for piece in _SPECIAL_RE.split(text):
+        if piece == '\t':
+            content.append('<w:tab/>')
+        elif piece in ('\n', '\r'):
+            content.append('<w:br/>')
+        elif piece:
+            content.append(_t_xml(piece))
+    return f'<w:r>{rpr}{"".join(content)}</w:r>'
+
+
+def paragraph_xml(runs_xml, style_id=None, left_indent=None, first_line_indent=None,
+                  space_before=None, space_after=None, alignment=None):
+    """拼出 <w:p>，pPr 子元素按 schema 顺序排列；长度参数为 docx.shared 长度对象"""
+    props = []
+    if style_id:
+        props.append(f'<w:pStyle w:val="{style_id}"/>')
+    if space_before is not None or space_after is not None:
+        attrs = ''
+        if space_before is not None:
+            attrs += f' w:before="{space_before.twips}"'
+        if space_after is not None:
+            attrs += f' w:after="{space_after.twips}"'
+        props.append(f'<w:spacing{attrs}/>')
+    if left_indent is not None or first_line_indent is not None:
+        attrs = ''
+        if left_indent is not None:
+            attrs += f' w:left="{left_indent.twips}"'
+        if first_line_indent is not None:
+            if first_line_indent < 0:
+                attrs += f' w:hanging="{-first_line_indent.twips}"'
+            else:
+                attrs += f' w:firstLine="{first_line_indent.twips}"'
+        props.append(f'<w:ind{attrs}/>')
+    if alignment is not None:
+        props.append(f'<w:jc w:val="{_JC_VALUES[alignment]}"/>')
+    ppr = f'<w:pPr>{"".join(props)}</w:pPr>' if props else ''
+    if not ppr and not runs_xml:
+        return '<w:p/>'
+    return f'<w:p>{ppr}{runs_xml}</w:p>'
+
+
+def picture_xml(image, shape_id, alt=''):
+    """嵌入式图片 <wp:inline>，与 python-docx 的 CT_Inline.new_pic_inline 一致"""
+    descr = f' descr="{escape(alt).replace(chr(34), "&quot;")}"' if alt else ''
+    extent = f'cx="{image.cx}" cy="{image.cy}"'
+    return (
+        '<wp:inline xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+        ' xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+        f'<wp:extent {extent}/><wp:docPr id="{shape_id}" name="Picture {shape_id}"{descr}/>'
+        '<wp:cNvGraphicFramePr><a:graphicFrameLocks noChangeAspect="1"/></wp:cNvGraphicFramePr>'
+        '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+        f'<pic:pic><pic:nvPicPr><pic:cNvPr id="0" name="image.{image.ext}"/><pic:cNvPicPr/></pic:nvPicPr>'
+        f'<pic:blipFill><a:blip r:embed="{image.rid}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+        f'<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext {extent}/></a:xfrm><a:prstGeom prst="rect"/></pic:spPr>'
+        '</pic:pic></a:graphicData></a:graphic></wp:inline>'
+    )
+
+
+@lru_cache(maxsize=8)
+def read_template(template_bytes):
+    """拆解模板包：其余部件、document.xml 头尾、样式名到样式 ID 的映射、版心宽度"""
+    with zipfile.ZipFile(BytesIO(template_bytes)) as zf:
+        parts = [(info.filename, zf.read(info)) for info in zf.infolist()]
+    part_map = dict(parts)
+
+    document = part_map[DOCUMENT_PART]
+    body_open = document.index(b'<w:body>') + len(b'<w:body>')
+    sect_start = document.rfind(b'<w:sectPr')
+    if sect_start < body_open:
+        sect_start = document.rindex(b'</w:body>')
+    head, tail = document[:sect_start], document[sect_start:]
+
+    styles = etree.fromstring(part_map[STYLES_PART])
+    style_ids = {}
+    for style in styles.iterfind(f'{{{W_NS}}}style'):
+        name = style.find(f'{{{W_NS}}}name')
+        if name is not None:
+            style_ids[name.get(f'{{{W_NS}}}val')] = style.get(f'{{{W_NS}}}styleId')
+
+    # 与 python-docx 的 Document._block_width 一致：页宽减左右边距，缺省按 8.5/1/1 英寸
+    root = etree.fromstring(document)
+    sect = root.find(f'{{{W_NS}}}body/{{{W_NS}}}sectPr')
+    page_width, left, right = 12240, 1440, 1440
+    if sect is not None:
+        pg_sz = sect.find(f'{{{W_NS}}}pgSz')
+        pg_mar = sect.find(f'{{{W_NS}}}pgMar')
+        if pg_sz is not None and pg_sz.get(f'{{{W_NS}}}w'):
+            page_width = int(pg_sz.get(f'{{{W_NS}}}w'))
+        if pg_mar is not None:
+            left = int(pg_mar.get(f'{{{W_NS}}}left') or left)
+            right = int(pg_mar.get(f'{{{W_NS}}}right') or right)
+    block_width = (page_width - left - right) * _EMUS_PER_TWIP
+
+    parts = [(name, None if name == DOCUMENT_PART else data) for name, data in parts]
+    return PackageTemplate(parts, head, tail, style_ids, block_width)
+
+
+class XmlBuilder:
+    """直接生成 document.xml 片段的构建器，接口与 DocxBuilder 相同"""
+
+    def __init__(self, template, images=None):
+        self.template = template
+        self.images = images
+        self._chunks = []
+        self._shape_id = 0
+
+    def take(self):
+        """取出目前累积的 XML 并清空"""
+        xml = ''.join(self._chunks)
+        self._chunks = []
+        return xml
+
+    def _style_id(self, name):
+        # 与 python-docx 一样先把界面名（Heading 1）转成内部名（heading 1），找不到时报 KeyError
+        try:
+            return self.template.style_ids[BabelFish.ui2internal(name)]
+        except KeyError:
+            raise KeyError(f"no style with name '{name}'")
+
+    def heading(self, runs, level):
+        style = self._style_id('Title' if level == 0 else f'Heading {level}')
+        self._chunks.append(paragraph_xml(''.join(run_xml(run) for run in runs), style))
+
+    def paragraph(self, runs=(), style=None, left_indent=None, first_line_indent=None,
+                  space_before=None, space_after=None, alignment=None, code=False):
+        style_id = self._style_id(style) if style else None
+        self._chunks.append(paragraph_xml(
+            ''.join(run_xml(run) for run in runs), style_id, left_indent,
+            first_line_indent, space_before, space_after, alignment))
+
+    def table(self, rows, align=None, style='Table Grid'):
+        cols = len(rows[0])
+        col_twips = round(self.template.block_width // cols / _EMUS_PER_TWIP)
+        tc_pr = f'<w:tcPr><w:tcW w:type="dxa" w:w="{col_twips}"/></w:tcPr>'
+        ppr = [f'<w:pPr><w:jc w:val="{_JC_VALUES[a]}"/></w:pPr>' if a else ''
+               for a in (align or ())][:cols]
+        ppr += [''] * (cols - len(ppr))
+        chunks = [
+            '<w:tbl><w:tblPr>'
+            f'<w:tblStyle w:val="{self._style_id(style)}"/>'
+            '<w:tblW w:type="auto" w:w="0"/>'
+            '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0"'
+            ' w:noHBand="0" w:noVBand="1" w:val="04A0"/>'
+            '</w:tblPr><w:tblGrid>',
+            f'<w:gridCol w:w="{col_twips}"/>' * cols,
+            '</w:tblGrid>',
+        ]
+        for cells in rows:
+            chunks.append('<w:tr>')
+            for i in range(cols):
+                runs = ''.join(run_xml(run) for run in cells[i]) if i < len(cells) else ''
+                if ppr[i] or runs:
+                    chunks.append(f'<w:tc>{tc_pr}<w:p>{ppr[i]}{runs}</w:p></w:tc>')
+                else:
+                    chunks.append(f'<w:tc>{tc_pr}<w:p/></w:tc>')
+            chunks.append('</w:tr>')
+        chunks.append('</w:tbl>')
+        self._chunks.append(''.join(chunks))
+
+    def image(self, path, alt=''):
+        image = self.images.add(path) if self.images is not None else None
+        if image is None:
+            return False
+        self._shape_id += 1
+        self._chunks.append(f'<w:p><w:r><w:drawing>{picture_xml(image, self._shape_id, alt)}</w:drawing></w:r></w:p>')
+        return True
+
+
+def _document_stream(template, fragments, buffer_size):
+    """document.xml 的字节流：头部、正文片段（攒够 buffer_size 再产出）、尾部"""
+    yield template.head
+    pending = []
+    size = 0
+    for fragment in fragments:
+        if isinstance(fragment, str):
+            fragment = fragment.encode('utf-8')
+        pending.append(fragment)
+        size += len(fragment)
+        if size >= buffer_size:
+            yield b''.join(pending)
+            pending = []
+            size = 0
+    pending.append(template.tail)
+    yield b''.join(pending)
+
+
+def _package_entries(template, fragments, buffer_size, images):
+    """按模板顺序产出 (部件名, 数据)；关系部件在 document.xml 写完之后才生成，图片部件排在最后"""
+    for name, data in template.parts:
+        if data is None:
+            yield name, _document_stream(template, fragments, buffer_size)
+        elif images is not None and name == CONTENT_TYPES_PART:
+            # 内容类型排在正文之前，要等正文渲染完才知道用到哪些图片：延后生成，只登记实际用到的扩展名
+            yield name, lambda data=data: add_image_types(data, images.extensions())
+        elif images is not None and name == DOCUMENT_RELS_PART:
+            # python-docx 总把部件的关系紧跟在部件之后，走到这里时正文已经渲染完
+            yield name, images.add_relationships(data)
+        else:
+            yield name, data
+    if images is not None:
+        yield from images.parts()
+
+
+def write_package(template, fragments, out, compression=zipfile.ZIP_DEFLATED, compresslevel=None,
+                  buffer_size=1 << 16, workers=None, images=None):
+    """
+    以模板为底写出 DOCX：其余部件原样复制，document.xml 由 fragments 流式写入
+
+    fragments 是正文 XML 片段（str 或 UTF-8 bytes）的可迭代对象；out 为路径或可写文件对象。
+    workers 为压缩线程数（默认 CPU 核数），各部件和 document.xml 的各块并行压缩。
+    images 为渲染时登记图片的 image_embed.ImageStore，图片部件和关系随包写出。
+    """
+    write_zip(out, _package_entries(template, fragments, buffer_size, images),
+              compression, compresslevel, workers)
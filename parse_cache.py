@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Markdown 分词结果的磁盘缓存
+
+同一篇文章反复转换（换一套转换配置、换输出格式、服务端重复请求）时，分词结果完全相同。
+这里把块流序列化成紧凑的二进制文件，按（分词器版本、源文件内容）的 SHA-256 存放；
+命中时直接从缓存读出块，完全跳过分词。
+
+文件格式：魔数 + 格式版本 + marshal 版本，后面是一段 zlib 流，
+流里每批（至多 BATCH_BLOCKS 个块）是「4 字节长度 + marshal 序列化的块元组的元组」。
+写入是逐批流式的；读出时先把整个条目解码校验完再产出（条目大小有上限），
+截断或损坏的条目在产出任何块之前就能发现，删掉后重新分词，不会在转换途中抛错。
+缓存目录总大小有上限，超出时按最近使用时间（命中时刷新文件的 mtime）淘汰最久没用过的条目。
+图片路径保存的是源文件里的原始写法，读出后再由 image_embed.resolve_paths 按所在目录解析。
+"""
+import hashlib
+import io
+import marshal
+import os
+import struct
+import zlib
+
+from md_tokenizer import PARSER_VERSION, Block, iter_blocks
+from section_cache import CACHE_DIR, evict_if_needed, evict_oldest, temp_path
+
+# 缓存目录总大小上限（字节）
+PARSE_CACHE_BYTES = 64 * 1024 * 1024
+
+_MAGIC = b'MDBK'
+_FORMAT_VERSION = 1
+_MARSHAL_VERSION = 4
+_HEADER = _MAGIC + bytes((_FORMAT_VERSION, _MARSHAL_VERSION))
+_LENGTH = struct.Struct('<I')
+_READ_SIZE = 1024 * 1024
+
+# 每条记录打包的块数：逐块 marshal 的调用开销比分词本身还大
+BATCH_BLOCKS = 512
+
+_new_block = tuple.__new__
+
+
+def source_key(chunks, mode='file'):
+    """
+    缓存键：分词器版本与源内容（按块传入的字节串）的 SHA-256
+
+    mode 区分读法：文件按通用换行读取，内存字符串保留原样换行，同样的字节分出的块可能不同。
+    """
+    digest = hashlib.sha256(f'md-blocks:{PARSER_VERSION}:{mode}:'.encode('utf-8'))
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _entry_path(cache_dir, key):
+    return os.path.join(cache_dir, 'parse', key[:2], key + '.blk')
+
+
+def _iter_stored(f):
+    """从已打开的缓存文件逐块读出，文件头不对时抛 ValueError"""
+    if f.read(len(_HEADER)) != _HEADER:
+        raise ValueError('缓存格式不符')
+    d = zlib.decompressobj()
+    buf = b''
+    while True:
+        chunk = f.read(_READ_SIZE)
+        buf += d.decompress(chunk) if chunk else d.flush()
+        pos = 0
+        while len(buf) - pos >= _LENGTH.size:
+            (n,) = _LENGTH.unpack_from(buf, pos)
+            end = pos + _LENGTH.size + n
+            if end > len(buf):
+                break
+            for block in marshal.loads(buf[pos + _LENGTH.size:end]):
+                yield _new_block(Block, block)
+            pos = end
+        buf = buf[pos:]
+        if not chunk:
+            break
+    if buf or not d.eof:
+        raise ValueError('缓存文件不完整')
+
+
+def _store_blocks(blocks, path, max_bytes):
+    """边产出 blocks 边写入缓存；全部产出完才落盘，单个条目超过上限时不保存"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = temp_path(path)
+    try:
+        with open(tmp_path, 'wb') as out:
+            out.write(_HEADER)
+            c = zlib.compressobj()
+
+            def flush(batch):
+                data = marshal.dumps(tuple(batch), _MARSHAL_VERSION)
+                out.write(c.compress(_LENGTH.pack(len(data)) + data))
+
+            batch = []
+            for block in blocks:
+                batch.append(tuple(block))
+                if len(batch) == BATCH_BLOCKS:
+                    flush(batch)
+                    batch = []
+                yield block
+            if batch:
+                flush(batch)
+            out.write(c.flush())
+        size = os.path.getsize(tmp_path)
+        if size <= max_bytes:
+            os.replace(tmp_path, path)
+            evict_if_needed(os.path.dirname(os.path.dirname(path)), '.blk', max_bytes, size, keep=path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def evict(root, max_bytes=PARSE_CACHE_BYTES, keep=None):
+    """缓存条目总大小超过 max_bytes 时按 mtime 从旧到新删除，返回删除的条目数"""
+    return evict_oldest(root, '.blk', max_bytes, keep)
+
+
+def _cached(key, parse, cache_dir, max_bytes, stats):
+    path = _entry_path(cache_dir, key)
+    try:
+        f = open(path, 'rb')
+    except OSError:
+        f = None
+    if f is not None:
+        with f:
+            try:
+                blocks = list(_iter_stored(f))
+            except (ValueError, EOFError, TypeError, zlib.error):
+                blocks = None
+        if blocks is not None:
+            stats['hits'] += 1
+            # 刷新 mtime，淘汰时按最近使用排序
+            os.utime(path)
+            yield from blocks
+            return
+        # 条目损坏：删掉后按未命中处理
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    stats['misses'] += 1
+    yield from _store_blocks(parse(), path, max_bytes)
+
+
+def _new_stats(stats):
+    if stats is None:
+        stats = {}
+    stats.setdefault('hits', 0)
+    stats.setdefault('misses', 0)
+    return stats
+
+
+def cached_file_blocks(md_file, cache_dir=CACHE_DIR, max_bytes=PARSE_CACHE_BYTES, stats=None):
+    """
+    与 md_tokenizer.iter_file_blocks 相同，逐块产出 Markdown 文件的块；命中缓存时不再分词
+
+    cache_dir 为 None 时不使用缓存。stats 若是字典，会累加 'hits' / 'misses' 计数。
+    """
+    stats = _new_stats(stats)
+    if cache_dir is None:
+        stats['misses'] += 1
+        with open(md_file, 'r', encoding='utf-8') as f:
+            yield from iter_blocks(f)
+        return
+    # 先按字节读一遍求哈希，未命中时再按行流式分词
+    with open(md_file, 'rb') as f:
+        key = source_key(iter(lambda: f.read(_READ_SIZE), b''))
+
+    def parse():
+        with open(md_file, 'r', encoding='utf-8') as f:
+            yield from iter_blocks(f)
+
+    yield from _cached(key, parse, cache_dir, max_bytes, stats)
+
+
+def cached_text_blocks(text, cache_dir=CACHE_DIR, max_bytes=PARSE_CACHE_BYTES, stats=None):
+    """同 cached_file_blocks，源是内存里的字符串（换行符原样保留）"""
+    stats = _new_stats(stats)
+
+    def parse():
+        return iter_blocks(io.StringIO(text, newline=''))
+
+    if cache_dir is None:
+        stats['misses'] += 1
+        return parse()
+    return _cached(source_key((text.encode('utf-8'),), 'text'), parse, cache_dir, max_bytes, stats)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+一次解析，同时输出 DOCX、独立 HTML 和 RTF
+
+Markdown 只读取、分词一次，得到的块列表就是各格式共用的文档模型；
+各格式的构建器（XmlBuilder / HtmlBuilder / RtfBuilder）都走转换器同一份 render_blocks，
+版式由转换配置（Profile）决定，彼此互不依赖，在线程池（或 --processes 进程池）里同时渲染。
+
+线程池开销最小：DOCX 的压缩和各格式的写文件不占 GIL，能与其他渲染重叠；
+纯 Python 的渲染部分受 GIL 限制，大文档可以用 --processes 换取真正的多核并行。
+
+用法：
+    python publish.py article.md                       # 生成 article.docx / .html / .rtf
+    python publish.py article.md -t html rtf -c word -o dist/
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from batch_convert import CONVERTERS
+from docx_pipeline import build_docx
+from docx_save import COMPRESSION, SaveOptions, save_output
+from html_writer import HtmlBuilder
+from image_embed import ImageStore, resolve_paths
+from md_converter import render_blocks, setup_styles
+from ooxml_writer import read_template
+from parse_cache import cached_file_blocks
+from rtf_writer import RtfBuilder
+from section_cache import CACHE_DIR
+from style_template import get_template
+
+TARGETS = ('docx', 'html', 'rtf')
+
+
+def parse_document(md_file, cache_dir=CACHE_DIR):
+    """读取并分词一次（命中 parse_cache 时不分词），返回各格式共用的块元组（图片路径已换成绝对路径）"""
+    base_dir = os.path.dirname(os.path.abspath(md_file))
+    return tuple(resolve_paths(cached_file_blocks(md_file, cache_dir), base_dir))
+
+
+def render_docx(profile, blocks, path, cache_dir=CACHE_DIR, save=None, images=None):
+    """写出 DOCX，返回写出的字节数"""
+    build_docx(iter(blocks), path, partial(render_blocks, profile, cache_dir=cache_dir),
+               partial(setup_styles, profile), profile.name, cache_dir, save=save, images=images)
+    return os.path.getsize(path)
+
+
+def _write_text(builder, profile, blocks, path, encoding, cache_dir):
+    render_blocks(profile, builder, blocks, cache_dir)
+    data = builder.document().encode(encoding)
+    return save_output(lambda out: out.write(data), path).bytes
+
+
+def render_html(profile, blocks, path, cache_dir=CACHE_DIR, save=None, images=None):
+    """写出独立 HTML，图片宽度上限与 DOCX 的版心相同"""
+    template = read_template(get_template(profile.name, partial(setup_styles, profile), cache_dir))
+    store = ImageStore(template.block_width, images, cache_dir)
+    builder = HtmlBuilder(profile.font, profile.heading_styles, store)
+    return _write_text(builder, profile, blocks, path, 'utf-8', cache_dir)
+
+
+def render_rtf(profile, blocks, path, cache_dir=CACHE_DIR, save=None, images=None):
+    """写出 RTF（纯 ASCII）"""
+    builder = RtfBuilder(profile.font, profile.heading_styles, profile.margins)
+    builder.images = ImageStore(builder.block_width, images, cache_dir)
+    return _write_text(builder, profile, blocks, path, 'ascii', cache_dir)
+
+
+RENDERERS = {'docx': render_docx, 'html': render_html, 'rtf': render_rtf}
+
+
+def _timed(render, *args):
+    start = time.perf_counter()
+    size = render(*args)
+    return size, time.perf_counter() - start
+
+
+def publish(profile, md_file, outputs, cache_dir=CACHE_DIR, workers=None, processes=False,
+            save=None, images=None):
+    """
+    按 outputs {格式: 输出路径} 输出多种格式，返回 (解析耗时, {格式: (字节数, 渲染耗时)})
+
+    processes 为真时用进程池（块元组整体传给子进程），否则用线程池；workers 默认每个格式一个。
+    """
+    unknown = set(outputs) - set(RENDERERS)
+    if unknown:
+        raise ValueError(f'未知的输出格式: {", ".join(sorted(unknown))}（可选 {", ".join(TARGETS)}）')
+    start = time.perf_counter()
+    blocks = parse_document(md_file, cache_dir)
+    parse_seconds = time.perf_counter() - start
+
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor(max_workers=workers or len(outputs) or 1) as pool:
+        futures = {target: pool.submit(_timed, RENDERERS[target], profile, blocks, path,
+                                       cache_dir, save, images)
+                   for target, path in outputs.items()}
+        return parse_seconds, {target: future.result() for target, future in futures.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='一次解析Markdown，同时输出DOCX、HTML、RTF')
+    parser.add_argument('input', help='Markdown 文件')
+    parser.add_argument('-t', '--targets', nargs='+', choices=TARGETS, default=list(TARGETS),
+                        help='输出格式（默认全部）')
+    parser.add_argument('-c', '--converter', choices=sorted(CONVERTERS), default='final',
+                        help='使用的转换配置（默认 final）')
+    parser.add_argument('-o', '--out-dir', help='输出目录（默认与输入文件同目录）')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='并行数（默认每个格式一个）')
+    parser.add_argument('--processes', action='store_true', help='用进程池代替线程池')
+    parser.add_argument('-z', '--compression', choices=list(COMPRESSION), default='default',
+                        help='DOCX 压缩方式（默认 default）')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        parser.error(f'文件不存在: {args.input}')
+    module = importlib.import_module(CONVERTERS[args.converter][0])
+    stem = os.path.splitext(os.path.basename(args.input))[0]
+    out_dir = args.out_dir or os.path.dirname(args.input)
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    outputs = {target: os.path.join(out_dir, f'{stem}.{target}') for target in args.targets}
+
+    start = time.perf_counter()
+    parse_seconds, results = publish(module.PROFILE, args.input, outputs, workers=args.workers,
+                                     processes=args.processes, save=SaveOptions(args.compression))
+    elapsed = time.perf_counter() - start
+
+    for target, (size, seconds) in results.items():
+        print(f"✅ {outputs[target]} ({size / 1024:.1f} KB, {seconds:.2f}s)")
+    print(f"\n解析 {parse_seconds:.2f}s，{len(results)} 种格式并行渲染，总耗时 {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+输出 RTF 的构建器
+
+RtfBuilder 与 doc_builder.DocxBuilder 方法相同，转换器的 render_blocks 不用改就能输出 RTF，
+取代 create_rtf.js 里逐行拼字符串的做法：标题、列表、代码块、表格、行内格式和图片都保留。
+非 ASCII 字符一律写成 \\uN? 转义，文件本身是纯 ASCII，Word、WPS、写字板都能打开。
+字体表和颜色表在渲染过程中按用到的字体、颜色收集，最后拼到文件头里。
+"""
+import binascii
+import re
+
+from doc_builder import DEFAULT_FONT, DEFAULT_SIZE, heading_formats
+
+_TWIPS_PER_INCH = 1440
+_EMUS_PER_TWIP = 635
+_EMUS_PER_PX = 9525
+
+# python-docx 默认模板：Letter 纸，左右边距 1.25 英寸，上下 1 英寸
+_PAGE_WIDTH = 12240
+_PAGE_HEIGHT = 15840
+_DEFAULT_MARGINS = (1.25, 1.0)
+
+_QUAD = {'left': '\\ql', 'center': '\\qc', 'right': '\\qr', 'justify': '\\qj'}
+_BLIPS = {'png': '\\pngblip', 'jpg': '\\jpegblip'}
+
+_ESCAPE_RE = re.compile(r'[\\{}\t\r\n]|[^\x20-\x7e]')
+_SPECIAL = {'\\': '\\\\', '{': '\\{', '}': '\\}', '\t': '\\tab ', '\r': '\\line ', '\n': '\\line '}
+
+
+def _escape_char(m):
+    ch = m.group()
+    special = _SPECIAL.get(ch)
+    if special is not None:
+        return special
+    code = ord(ch)
+    if code < 0x20:
+        return ''
+    # \uN 的 N 是有符号 16 位整数，BMP 以外的字符写成 UTF-16 代理对
+    units = ch.encode('utf-16-le')
+    out = []
+    for i in range(0, len(units), 2):
+        unit = int.from_bytes(units[i:i + 2], 'little', signed=True)
+        out.append(f'\\u{unit}?')
+    return ''.join(out)
+
+
+def rtf_escape(text):
+    """RTF 文本转义：控制字符 \\ { } 加反斜杠，制表符和换行写成控制字，非 ASCII 写成 \\uN?"""
+    return _ESCAPE_RE.sub(_escape_char, text)
+
+
+class RtfBuilder:
+    """
+    拼出 RTF 正文，document() 返回完整文件内容
+
+    font / heading_styles / margins 与 md_converter.Profile 的同名字段含义相同；
+    images 为 image_embed.ImageStore，没有时不嵌入图片（RTF 只支持 PNG 和 JPEG）。
+    """
+
+    def __init__(self, font=None, heading_styles=None, margins=None, images=None):
+        self.heading_styles = heading_formats(heading_styles)
+        self.images = images
+        if margins is None:
+            self.margin_x, self.margin_y = (round(m * _TWIPS_PER_INCH) for m in _DEFAULT_MARGINS)
+        else:
+            self.margin_x = self.margin_y = round(margins * _TWIPS_PER_INCH)
+        # 版心宽度（EMU），与 ooxml_writer.PackageTemplate.block_width 同单位
+        self.block_width = (_PAGE_WIDTH - 2 * self.margin_x) * _EMUS_PER_TWIP
+        self._fonts = [font or DEFAULT_FONT]
+        self._colors = []
+        self._chunks = []
+
+    def _font(self, name):
+        if name not in self._fonts:
+            self._fonts.append(name)
+        return f'\\f{self._fonts.index(name)}'
+
+    def _color(self, rgb):
+        rgb = rgb.upper()
+        if rgb not in self._colors:
+            self._colors.append(rgb)
+        # 颜色表第 0 项是自动颜色
+        return f'\\cf{self._colors.index(rgb) + 1}'
+
+    def _runs(self, runs):
+        parts = []
+        for run in runs:
+            props = ''
+            if run.bold:
+                props += '\\b'
+            if run.italic:
+                props += '\\i'
+            if run.font:
+                props += self._font(run.font)
+            if run.size:
+                props += f'\\fs{int(run.size * 2)}'
+            if run.color:
+                props += self._color(run.color)
+            text = rtf_escape(run.text)
+            parts.append(f'{{{props} {text}}}' if props else text)
+        return ''.join(parts)
+
+    def heading(self, runs, level):
+        size, color = self.heading_styles.get('Title' if level == 0 else f'Heading {level}',
+                                              (DEFAULT_SIZE, None))
+        props = f'\\pard\\plain\\keepn\\sb240\\sa60\\b\\f0\\fs{int(size * 2)}'
+        if color:
+            props += self._color(color)
+        self._chunks.append(f'{props} {self._runs(runs)}\\par\n')
+
+    def paragraph(self, runs=(), style=None, left_indent=None, first_line_indent=None,
+                  space_before=None, space_after=None, alignment=None, code=False):
+        props = f'\\pard\\plain\\f0\\fs{DEFAULT_SIZE * 2}'
+        left = left_indent.twips if left_indent is not None else 0
+        bullet = ''
+        if style == 'List Bullet':
+            # 悬挂缩进放项目符号
+            props += f'\\fi-360\\li{left + 360}'
+            bullet = '\\u8226?\\tab '
+        else:
+            if left:
+                props += f'\\li{left}'
+            if first_line_indent is not None:
+                props += f'\\fi{first_line_indent.twips}'
+        if space_before is not None:
+            props += f'\\sb{space_before.twips}'
+        if space_after is not None:
+            props += f'\\sa{space_after.twips}'
+        elif style != 'No Spacing':
+            props += '\\sa120'
+        if alignment is not None:
+            props += _QUAD[alignment]
+        self._chunks.append(f'{props} {bullet}{self._runs(runs)}\\par\n')
+
+    def table(self, rows, align=None, style='Table Grid'):
+        cols = len(rows[0])
+        width = self.block_width // _EMUS_PER_TWIP // cols
+        border = ''.join(f'\\clbrdr{side}\\brdrs\\brdrw10' for side in 'tlbr')
+        row_def = '\\trowd\\trgaph108' + ''.join(
+            f'{border}\\cellx{width * (i + 1)}' for i in range(cols))
+        quads = [_QUAD[a] if a else '' for a in (align or ())][:cols]
+        quads += [''] * (cols - len(quads))
+        chunks = []
+        for cells in rows:
+            chunks.append(row_def)
+            for i in range(cols):
+                runs = cells[i] if i < len(cells) else ()
+                chunks.append(f'\\pard\\plain\\intbl\\f0\\fs{DEFAULT_SIZE * 2}{quads[i]} {self._runs(runs)}\\cell')
+            chunks.append('\\row\n')
+        chunks.append('\\pard\n')
+        self._chunks.append(''.join(chunks))
+
+    def image(self, path, alt=''):
+        image = self.images.load(path) if self.images is not None else None
+        if image is None or image.ext not in _BLIPS:
+            return False
+        data = binascii.hexlify(image.data).decode('ascii')
+        lines = '\n'.join(data[i:i + 128] for i in range(0, len(data), 128))
+        self._chunks.append(
+            f'\\pard\\plain\\sa120{{\\pict{_BLIPS[image.ext]}'
+            f'\\picw{round(image.cx / _EMUS_PER_PX)}\\pich{round(image.cy / _EMUS_PER_PX)}'
+            f'\\picwgoal{round(image.cx / _EMUS_PER_TWIP)}\\pichgoal{round(image.cy / _EMUS_PER_TWIP)}\n'
+            f'{lines}}}\\par\n')
+        return True
+
+    def document(self):
+        """完整的 RTF 文件内容（纯 ASCII）"""
+        fonts = ''.join(f'{{\\f{i}\\fnil {rtf_escape(name)};}}' for i, name in enumerate(self._fonts))
+        colors = ';' + ''.join(
+            f'\\red{int(rgb[0:2], 16)}\\green{int(rgb[2:4], 16)}\\blue{int(rgb[4:6], 16)};'
+            for rgb in self._colors)
+        header = (
+            f'{{\\rtf1\\ansi\\deff0\\uc1{{\\fonttbl{fonts}}}{{\\colortbl{colors}}}\n'
+            f'\\paperw{_PAGE_WIDTH}\\paperh{_PAGE_HEIGHT}'
+            f'\\margl{self.margin_x}\\margr{self.margin_x}\\margt{self.margin_y}\\margb{self.margin_y}\n'
+        )
+        return header + ''.join(self._chunks) + '}\n'
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""
+按章节增量重建 DOCX 正文
+
+把块事件在标题处切成章节，每个章节按（转换器名、转换器版本、章节内容）求哈希。
+渲染好的章节 OOXML 片段缓存在磁盘上；再次转换时内容没变的章节直接把片段拼进正文，
+只有改动过的章节才交给转换器重新渲染。
+含图片的章节不缓存：片段里引用的图片关系只在渲染时登记，每次都重新渲染（图片本身另有缓存）。
+片段文件末尾附有内容的 SHA-256，截断或损坏的片段读出时就能发现，删掉后按未命中重新渲染，
+直接写 OOXML 时也不会把半截 XML 拼进 document.xml。
+片段目录总大小有上限，按最近使用时间（命中时刷新 mtime）淘汰最久没用过的片段；
+目录大小按写入量累加估计，估计值超过上限时才扫描目录（见 evict_if_needed）。
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from docx.oxml.parser import parse_xml
+from lxml import etree
+
+from md_tokenizer import HEADING, IMAGE, TABLE_ROW
+
+CACHE_DIR = '.docx_cache'
+
+# 章节片段目录总大小上限（字节）
+SECTION_CACHE_BYTES = 256 * 1024 * 1024
+
+# 没有标题的超长正文按约这么多字符切成多段，渲染时内存占用取决于单段大小而不是整篇文档
+SECTION_CHARS = 256 * 1024
+
+# 估计值超过上限时淘汰到上限的这个比例，留出余量，之后的若干次写入都不必再扫描
+EVICT_RATIO = 0.9
+
+# 各缓存目录总大小的估计值 {(目录, 条目后缀): 字节数}
+_estimates = {}
+_estimates_lock = threading.Lock()
+
+# _seal 附加的摘要长度：<!-- + 64 位十六进制 + -->
+_SEAL_SIZE = 4 + 64 + 3
+
+_W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+_SECT_PR = '{%s}sectPr' % _W_NS
+
+
+def _block_chars(block):
+    if block.kind == TABLE_ROW:
+        return sum(len(cell) for cell in block.info)
+    return len(block.text)
+
+
+def iter_sections(blocks, max_chars=SECTION_CHARS):
+    """
+    在每个标题处切分块流，逐个产出章节（块列表）
+
+    章节累积超过 max_chars 个字符后在下一个块之前切开，但不会把一张表格拆到两段里。
+    """
+    section = []
+    size = 0
+    for block in blocks:
+        if section and (block.kind == HEADING or (
+                size >= max_chars
+                and not (block.kind == TABLE_ROW and not block.level
+                         and section[-1].kind == TABLE_ROW))):
+            yield section
+            section = []
+            size = 0
+        section.append(block)
+        size += _block_chars(block)
+    if section:
+        yield section
+
+
+def _cacheable(section):
+    return all(block.kind != IMAGE for block in section)
+
+
+def section_key(section, namespace):
+    """章节缓存键：转换器名+版本 与 章节内容的 SHA-256"""
+    digest = hashlib.sha256(namespace.encode('utf-8'))
+    for block in section:
+        digest.update(repr(tuple(block)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _content_end(body):
+    """正文中可插入内容的位置（sectPr 之前）"""
+    n = len(body)
+    if n and body[n - 1].tag == _SECT_PR:
+        return n - 1
+    return n
+
+
+def _fragment_path(cache_dir, key):
+    return os.path.join(cache_dir, 'sections', key[:2], key + '.xml')
+
+
+def _seal(data):
+    """片段末尾附上内容的 SHA-256（XML 注释）"""
+    return data + b'<!--' + hashlib.sha256(data).hexdigest().encode('ascii') + b'-->'
+
+
+def _discard(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _read_fragment(path):
+    """读出片段并校验摘要，返回去掉摘要的 XML 字节；不存在时返回 None，损坏的片段删掉后也返回 None"""
+    try:
+        with open(path, 'rb') as f:
+            stored = f.read()
+    except OSError:
+        return None
+    data = stored[:-_SEAL_SIZE]
+    if len(stored) < _SEAL_SIZE or _seal(data) != stored:
+        _discard(path)
+        return None
+    return data
+
+
+def _load_fragment(path):
+    data = _read_fragment(path)
+    if data is None:
+        return None
+    try:
+        # 用 python-docx 的解析器，拼回去的元素仍是 CT_P/CT_Tbl 等 oxml 类
+        return parse_xml(b'<fragment>' + data + b'</fragment>')
+    except etree.XMLSyntaxError:
+        _discard(path)
+        return None
+
+
+def _store_fragment(path, data):
+    """保存片段，返回写入的字节数"""
+    stored = _seal(data)
+    write_atomic(path, stored)
+    return len(stored)
+
+
+class LruCache:
+    """
+    条目数和总字节数都有上限的 LRU 字典，超出时淘汰最久没用过的条目；可以在多个线程里同时使用
+
+    供各模块的进程内缓存（处理后的图片、代码高亮结果）共用。
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value, size):
+        """存入 value，size 为它计入上限的字节数；单个条目超过字节上限时不缓存"""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._items[key] = (value, size)
+            self.size += size
+            while len(self._items) > self.max_entries or self.size > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self.size -= evicted
+
+
+def temp_path(path):
+    """path 的临时文件名：按进程和线程区分，并发写同一条目时互不干扰"""
+    return f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+
+def write_atomic(path, data):
+    """
+    先写临时文件再改名，读者只会看到完整的旧内容或新内容
+
+    各缓存（模板、高亮、图片、分节）共用；所在目录不存在时自动创建。
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = temp_path(path)
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def evict_oldest(root, suffix, max_bytes, keep=None):
+    """
+    root/xx/ 下以 suffix 结尾的缓存条目总大小超过 max_bytes 时按 mtime 从旧到新删除，返回删除的条目数
+
+    keep 为不删除的条目路径（刚写入的那一个）。扫描得到的剩余总大小记为 evict_if_needed 的估计值。
+    """
+    entries = []
+    total = 0
+    try:
+        subs = list(os.scandir(root))
+    except OSError:
+        return 0
+    for sub in subs:
+        if not sub.is_dir():
+            continue
+        for entry in os.scandir(sub.path):
+            if not entry.name.endswith(suffix):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, entry.path))
+            total += st.st_size
+    removed = 0
+    for mtime, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    with _estimates_lock:
+        _estimates[(os.path.abspath(root), suffix)] = total
+    return removed
+
+
+def evict_if_needed(root, suffix, max_bytes, written, keep=None):
+    """
+    记下刚写入的 written 字节，估计的目录总大小超过 max_bytes 时才调用 evict_oldest，返回删除的条目数
+
+    估计值来自上一次扫描（本进程第一次写入时扫描一次），之后只累加本进程的写入；
+    其他进程的写入要到下一次扫描才计入，目录可能暂时略超上限，但不必每次写入都遍历整个目录。
+    超过上限时淘汰到 max_bytes × EVICT_RATIO。
+    """
+    key = (os.path.abspath(root), suffix)
+    with _estimates_lock:
+        estimate = _estimates.get(key)
+        if estimate is not None:
+            estimate = _estimates[key] = estimate + written
+    if estimate is None:
+        return evict_oldest(root, suffix, max_bytes, keep)
+    if estimate <= max_bytes:
+        return 0
+    return evict_oldest(root, suffix, int(max_bytes * EVICT_RATIO), keep)
+
+
+def _touch(path):
+    # 刷新 mtime，淘汰时按最近使用排序
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def render_cached(doc, blocks, render, namespace, cache_dir=CACHE_DIR, max_bytes=SECTION_CACHE_BYTES):
+    """
+    把 blocks 渲染进 doc 正文，返回 (命中章节数, 重新渲染章节数)
+
+    render(doc, section) 负责把一个章节写进文档；namespace 用来区分转换器及其版本，
+    样式或渲染逻辑变化时换一个版本号即可让旧缓存失效。cache_dir 为 None 时不使用缓存；
+    有新片段写入时，渲染完按 evict_if_needed 把片段目录保持在 max_bytes 以内。
+    """
+    if cache_dir is None:
+        misses = 0
+        for section in iter_sections(blocks):
+            render(doc, section)
+            misses += 1
+        return 0, misses
+
+    body = doc.element.body
+    hits = misses = written = 0
+    for section in iter_sections(blocks):
+        if not _cacheable(section):
+            render(doc, section)
+            misses += 1
+            continue
+        path = _fragment_path(cache_dir, section_key(section, namespace))
+        fragment = _load_fragment(path)
+        if fragment is not None:
+            _touch(path)
+            end = _content_end(body)
+            for el in list(fragment):
+                if end < len(body):
+                    body[end].addprevious(el)
+                else:
+                    body.append(el)
+                end += 1
+            hits += 1
+            continue
+
+        start = _content_end(body)
+        render(doc, section)
+        written += _store_fragment(
+            path, b''.join(etree.tostring(el, encoding='utf-8') for el in body[start:_content_end(body)]))
+        misses += 1
+    if written:
+        evict_if_needed(os.path.join(cache_dir, 'sections'), '.xml', max_bytes, written)
+    return hits, misses
+
+
+def iter_cached_xml(blocks, render, namespace, cache_dir=CACHE_DIR, stats=None,
+                    max_bytes=SECTION_CACHE_BYTES):
+    """
+    直接写 OOXML 时使用：逐章节产出正文 XML 字节
+
+    render(section) 返回章节的 XML 字符串。片段原样拼进 document.xml，不再解析。
+    stats 若是字典，会累加 'hits' / 'misses' 计数。全部产出后同 render_cached 淘汰旧片段。
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault('hits', 0)
+    stats.setdefault('misses', 0)
+    written = 0
+    for section in iter_sections(blocks):
+        if cache_dir is None or not _cacheable(section):
+            stats['misses'] += 1
+            yield render(section).encode('utf-8')
+            continue
+        path = _fragment_path(cache_dir, section_key(section, namespace))
+        data = _read_fragment(path)
+        if data is not None:
+            _touch(path)
+            stats['hits'] += 1
+        else:
+            data = render(section).encode('utf-8')
+            written += _store_fragment(path, data)
+            stats['misses'] += 1
+        yield data
+    if written:
+        evict_if_needed(os.path.join(cache_dir, 'sections'), '.xml', max_bytes, written)
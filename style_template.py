@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+预构建的样式模板缓存
+
+各转换器把页边距、中文字体、标题字号颜色等设置写成一个 setup(doc) 函数，
+这里只在第一次用到时执行一次，把结果保存成 DOCX 字节：进程内放在内存里，
+同时落盘到 .docx_cache/templates/，之后每次转换直接从字节加载，样式已经全部就位。
+"""
+import io
+import os
+
+import docx
+from docx import Document
+
+from section_cache import CACHE_DIR, write_atomic
+
+# 模板缓存的全局版本，修改本模块的生成方式时递增
+TEMPLATE_VERSION = 1
+
+_templates = {}
+
+
+def _template_path(cache_dir, name):
+    safe_name = name.replace('/', '-').replace('\\', '-')
+    filename = f'{safe_name}-v{TEMPLATE_VERSION}-docx{docx.__version__}.docx'
+    return os.path.join(cache_dir, 'templates', filename)
+
+
+def build_template(setup):
+    """新建文档、执行 setup 并序列化成 DOCX 字节"""
+    doc = Document()
+    setup(doc)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def get_template(name, setup, cache_dir=CACHE_DIR):
+    """
+    取出名为 name 的模板字节：先查内存，再查磁盘，都没有才调用 setup 构建
+
+    name 应包含转换器的版本号，setup 有改动时换个名字即可让旧模板失效。
+    cache_dir 为 None 时只缓存在内存里。
+    """
+    data = _templates.get(name)
+    if data is not None:
+        return data
+
+    path = _template_path(cache_dir, name) if cache_dir else None
+    if path and os.path.exists(path):
+        with open(path, 'rb') as f:
+            data = f.read()
+    else:
+        data = build_template(setup)
+        if path:
+            write_atomic(path, data)
+
+    _templates[name] = data
+    return data
+
+
+def new_document(name, setup, cache_dir=CACHE_DIR):
+    """基于缓存模板创建新文档"""
+    return Document(io.BytesIO(get_template(name, setup, cache_dir)))
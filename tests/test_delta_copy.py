@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""delta_copy：各种改动下 temp / inplace 两种写法都能还原出源文件"""
+import os
+import random
+
+import pytest
+
+from delta_copy import delta_copy
+
+_rng = random.Random(0)
+BASE = _rng.randbytes(300 * 1024)
+
+
+def _edit(data, kind):
+    mid = len(data) // 2
+    if kind == 'same':
+        return data
+    if kind == 'insert':
+        return data[:mid] + b'inserted' * 100 + data[mid:]
+    if kind == 'delete':
+        return data[:mid] + data[mid + 5000:]
+    if kind == 'modify':
+        return data[:mid] + b'X' * 10 + data[mid + 10:]
+    if kind == 'prepend':
+        return b'header\n' + data
+    if kind == 'shrink':
+        return data[:len(data) // 3]
+    if kind == 'grow':
+        return data + random.Random(1).randbytes(100 * 1024)
+    if kind == 'moved':
+        # 前后两半对调：inplace 时后半段的基准块已被覆盖，只能部分复用
+        return data[mid:] + data[:mid]
+    if kind == 'rewrite':
+        return random.Random(2).randbytes(len(data))
+    if kind == 'empty':
+        return b''
+    raise ValueError(kind)
+
+
+KINDS = ['same', 'insert', 'delete', 'modify', 'prepend', 'shrink', 'grow', 'moved', 'rewrite', 'empty']
+
+
+@pytest.mark.parametrize('inplace', [False, True], ids=['temp', 'inplace'])
+@pytest.mark.parametrize('kind', KINDS)
+def test_round_trip(tmp_path, kind, inplace):
+    src, dst = tmp_path / 'src', tmp_path / 'dst'
+    new = _edit(BASE, kind)
+    src.write_bytes(new)
+    dst.write_bytes(BASE)
+    result = delta_copy(str(src), str(dst), inplace)
+    assert dst.read_bytes() == new
+    assert result.literal + result.matched == len(new)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['dst', 'src']
+
+
+@pytest.mark.parametrize('kind', ['same', 'insert', 'delete', 'modify', 'prepend'])
+def test_small_edits_reuse_most_blocks(tmp_path, kind):
+    src, dst = tmp_path / 'src', tmp_path / 'dst'
+    new = _edit(BASE, kind)
+    src.write_bytes(new)
+    dst.write_bytes(BASE)
+    result = delta_copy(str(src), str(dst))
+    assert result.literal < 16 * 1024
+
+
+def test_inplace_writes_only_changed_blocks(tmp_path):
+    src, dst = tmp_path / 'src', tmp_path / 'dst'
+    src.write_bytes(_edit(BASE, 'modify'))
+    dst.write_bytes(BASE)
+    result = delta_copy(str(src), str(dst), inplace=True)
+    assert result.written < 16 * 1024
+
+
+def test_rewrite_matches_nothing(tmp_path):
+    src, dst = tmp_path / 'src', tmp_path / 'dst'
+    new = _edit(BASE, 'rewrite')
+    src.write_bytes(new)
+    dst.write_bytes(BASE)
+    result = delta_copy(str(src), str(dst))
+    assert result.matched == 0
+    assert dst.read_bytes() == new
+
+
+def test_copies_mode_and_mtime(tmp_path):
+    src, dst = tmp_path / 'src', tmp_path / 'dst'
+    src.write_bytes(_edit(BASE, 'insert'))
+    dst.write_bytes(BASE)
+    os.chmod(src, 0o640)
+    os.utime(src, ns=(1_000_000_000_000_000_000, 1_000_000_000_000_000_000))
+    for inplace in (False, True):
+        delta_copy(str(src), str(dst), inplace)
+        st = os.stat(dst)
+        assert st.st_mode & 0o777 == 0o640
+        assert st.st_mtime_ns == 1_000_000_000_000_000_000
+
+
+def test_hard_linked_target_is_not_modified_in_place(tmp_path):
+    src, dst, other = tmp_path / 'src', tmp_path / 'dst', tmp_path / 'other'
+    src.write_bytes(_edit(BASE, 'modify'))
+    dst.write_bytes(BASE)
+    os.link(dst, other)
+    delta_copy(str(src), str(dst), inplace=True)
+    assert dst.read_bytes() == src.read_bytes()
+    # 另一个链接仍指向旧内容
+    assert other.read_bytes() == BASE
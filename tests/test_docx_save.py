@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""docx_save.save_output：路径、可回写与不可回写的文件对象"""
+import io
+import zipfile
+
+from docx_save import save_output
+from parallel_zip import write_zip
+
+ENTRIES = [('word/document.xml', b'<w:document/>' * 1000), ('docProps/core.xml', b'<core/>')]
+
+
+class _Pipe(io.RawIOBase):
+    """只能顺序写入的流，模拟管道和套接字"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.data += b
+        return len(b)
+
+
+def _write(out):
+    write_zip(out, ENTRIES)
+
+
+def _names(data):
+    with zipfile.ZipFile(io.BytesIO(bytes(data))) as zf:
+        assert zf.testzip() is None
+        return zf.namelist()
+
+
+def test_path_is_replaced_atomically(tmp_path):
+    path = tmp_path / 'out.docx'
+    result = save_output(_write, str(path))
+    assert result.bytes == path.stat().st_size
+    assert _names(path.read_bytes()) == [name for name, _ in ENTRIES]
+    assert [p.name for p in tmp_path.iterdir()] == ['out.docx']
+
+
+def test_seekable_stream_counts_from_current_position():
+    out = io.BytesIO()
+    out.write(b'prefix')
+    result = save_output(_write, out)
+    assert result.bytes == len(out.getvalue()) - len(b'prefix')
+
+
+def test_non_seekable_stream_counts_written_bytes():
+    pipe = _Pipe()
+    assert not pipe.seekable()
+    result = save_output(_write, pipe)
+    assert result.bytes == len(pipe.data)
+    assert _names(pipe.data) == [name for name, _ in ENTRIES]
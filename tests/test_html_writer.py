@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""html_writer：代码块与只含行内代码的段落"""
+import io
+
+import convert_final
+from html_writer import HtmlBuilder
+from md_converter import render_blocks
+from md_tokenizer import iter_blocks
+
+
+def _body(markdown):
+    builder = HtmlBuilder()
+    render_blocks(convert_final.PROFILE, builder, iter_blocks(io.StringIO(markdown)), cache_dir=None)
+    return builder.document().split('<body>', 1)[1]
+
+
+def test_inline_code_only_paragraph_is_not_pre():
+    body = _body('`make test`\n')
+    assert '<pre' not in body
+    assert '<p><span style="font-family: \'Consolas\', sans-serif">make test</span></p>' in body
+
+
+def test_fenced_code_keeps_whitespace():
+    body = _body('```\nif  x:\n    y\n```\n')
+    assert '<pre' in body
+    assert 'if  x:\n    y' in body
+    assert '<br>' not in body
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""ignore_rules：与 git check-ignore 的判定一致"""
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from ignore_rules import IgnoreRules, PatternSet
+
+GITIGNORES = {
+    '.gitignore': [
+        '# 注释',
+        '*.log',
+        '!important.log',
+        'build/',
+        '!build/keep.txt',
+        '/docs/api',
+        'src/**/gen',
+        '**/cache/**',
+        'doc/*.txt',
+        '*.py[co]',
+        'file[!0-9].dat',
+        '\\#hash',
+        '\\!bang',
+        'tmp/',
+        'trailing\\ ',
+        'spaces   ',
+    ],
+    'logs/.gitignore': ['!keep.log', '*.tmp', '/local'],
+    'logs/deep/.gitignore': ['*.tmp', '!wanted.tmp'],
+}
+
+FILES = [
+    'a.log', 'important.log', 'sub/important.log', 'sub/b.log',
+    'build/out.o', 'build/keep.txt', 'sub/build/x.o',
+    'docs/api/index.html', 'sub/docs/api/index.html',
+    'src/gen/g.py', 'src/a/b/gen/g.py', 'gen/g.py',
+    'cache/x', 'a/cache/b/c', 'cachefile',
+    'doc/a.txt', 'doc/sub/b.txt',
+    'm.pyc', 'm.pyo', 'm.py',
+    'fileA.dat', 'file1.dat',
+    '#hash', '!bang', 'hash',
+    'tmp', 'x/tmp/y',
+    'trailing ', 'trailing', 'spaces',
+    'logs/keep.log', 'logs/b.log', 'logs/c.tmp', 'logs/local', 'logs/x/local',
+    'logs/deep/c.tmp', 'logs/deep/wanted.tmp',
+]
+
+# git 2.39 check-ignore --no-index 的结果
+IGNORED = {
+    'a.log', 'sub/b.log',
+    'build/out.o', 'build/keep.txt', 'sub/build/x.o',
+    'docs/api/index.html',
+    'src/gen/g.py', 'src/a/b/gen/g.py',
+    'cache/x', 'a/cache/b/c',
+    'doc/a.txt',
+    'm.pyc', 'm.pyo',
+    'fileA.dat',
+    '#hash', '!bang',
+    'x/tmp/y',
+    'trailing ', 'spaces',
+    'logs/b.log', 'logs/c.tmp', 'logs/local',
+    'logs/deep/c.tmp',
+}
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for rel, lines in GITIGNORES.items():
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(''.join(line + '\n' for line in lines), encoding='utf-8')
+    for rel in FILES:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'')
+    return tmp_path
+
+
+def _excluded(root):
+    rules = IgnoreRules(str(root))
+    return {rel for rel in FILES if rules.excluded_path(rel)}
+
+
+def test_matches_expected(tree):
+    assert _excluded(tree) == IGNORED
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='需要 git')
+def test_matches_git_check_ignore(tree):
+    subprocess.run(['git', 'init', '-q', str(tree)], check=True)
+    env = dict(os.environ, GIT_CONFIG_NOSYSTEM='1', HOME=str(tree))
+    proc = subprocess.run(['git', '-c', 'core.excludesFile=', 'check-ignore', '--no-index', '--stdin'],
+                          cwd=tree, input='\n'.join(FILES) + '\n', capture_output=True, text=True, env=env)
+    assert proc.returncode in (0, 1), proc.stderr
+    assert _excluded(tree) == set(proc.stdout.splitlines())
+
+
+def test_dir_only_pattern_skips_files(tree):
+    rules = IgnoreRules(str(tree))
+    assert rules.excluded('tmp', is_dir=True)
+    assert not rules.excluded('tmp', is_dir=False)
+
+
+def test_extra_patterns_take_priority(tree):
+    rules = IgnoreRules(str(tree), extra=['!a.log', '*.md'])
+    assert not rules.excluded('a.log')
+    assert rules.excluded('README.md')
+    assert rules.excluded('.git', is_dir=True)
+
+
+def test_gitignore_disabled(tree):
+    rules = IgnoreRules(str(tree), gitignore=False)
+    assert not rules.excluded_path('a.log')
+    assert rules.excluded_path('.git/config')
+
+
+@pytest.mark.parametrize('pattern, path, is_dir, verdict', [
+    ('a/**/b', 'a/b', False, True),
+    ('a/**/b', 'a/x/y/b', False, True),
+    ('a/**', 'a/x/y', False, True),
+    ('a/**', 'a', True, None),
+    ('**/b', 'x/y/b', False, True),
+    ('*', 'x/y', False, True),
+    ('a*b', 'a/b', False, None),
+    ('?', 'ab', False, None),
+    ('[]]', ']', False, True),
+    ('[!]a]', 'b', False, True),
+])
+def test_pattern_syntax(pattern, path, is_dir, verdict):
+    assert PatternSet([pattern]).match(path, is_dir) is verdict
+
+
+def test_later_pattern_wins():
+    patterns = PatternSet(['*.txt', '!keep.txt', 'keep.txt'])
+    assert patterns.match('keep.txt') is True
+    assert PatternSet(['*.txt', '!keep.txt']).match('keep.txt') is False
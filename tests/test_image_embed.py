@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""image_embed.recompress：保留截图为 PNG、照片改存 JPEG、解不开时原样返回"""
+import io
+import random
+
+import pytest
+
+from image_embed import recompress
+
+PILImage = pytest.importorskip('PIL.Image')
+ImageDraw = pytest.importorskip('PIL.ImageDraw')
+
+
+def _png(im):
+    buf = io.BytesIO()
+    im.save(buf, 'PNG')
+    return buf.getvalue()
+
+
+def _format(data):
+    with PILImage.open(io.BytesIO(data)) as im:
+        return im.format, im.size
+
+
+def _screenshot(width=3000, height=800):
+    im = PILImage.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(im)
+    draw.text((10, 10), '截图 screenshot ' * 40, fill='black')
+    draw.rectangle((100, 100, 900, 500), fill=(30, 120, 200))
+    return im
+
+
+def _photo(width=2000, height=1200):
+    rng = random.Random(0)
+    return PILImage.frombytes('RGB', (width, height), rng.randbytes(width * height * 3))
+
+
+def test_screenshot_stays_png():
+    assert _format(recompress(_png(_screenshot()), 1200, 85)) == ('PNG', (1200, 320))
+
+
+def test_photographic_png_becomes_jpeg():
+    assert _format(recompress(_png(_photo()), 1000, 85)) == ('JPEG', (1000, 600))
+
+
+def test_damaged_image_is_returned_unchanged():
+    data = _png(_screenshot())[:500]
+    assert recompress(data, 1200, 85) == data
+
+
+def test_decompression_bomb_is_returned_unchanged(monkeypatch):
+    data = _png(_screenshot())
+    # 像素数超过上限两倍时 Pillow 抛 DecompressionBombError
+    monkeypatch.setattr(PILImage, 'MAX_IMAGE_PIXELS', 1000)
+    assert recompress(data, 1200, 85) == data
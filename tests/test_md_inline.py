@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""md_inline.inline_runs：强调、行内代码、链接与转义（与 CommonMark 一致）"""
+import pytest
+
+from doc_builder import Run
+from md_inline import inline_runs
+
+
+def _runs(text, **kwargs):
+    return [tuple(run) for run in inline_runs(text, **kwargs)]
+
+
+def test_plain_text_is_one_run():
+    assert inline_runs('普通文字') == [Run('普通文字', False, False)]
+    assert inline_runs('') == []
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('**粗体**', [('粗体', True, False)]),
+    ('*斜体*', [('斜体', False, True)]),
+    ('_斜体_', [('斜体', False, True)]),
+    ('***都有***', [('都有', True, True)]),
+    ('a **b *c* d** e', [('a ', False, False), ('b ', True, False), ('c', True, True),
+                         (' d', True, False), (' e', False, False)]),
+    # 单词内部的下划线不是强调
+    ('snake_case_name', [('snake_case_name', False, False)]),
+    # 左侧紧跟空白的 * 不能闭合
+    ('*a *', [('*a *', False, False)]),
+    # 没有配对的分隔符按字面输出
+    ('**未闭合', [('**未闭合', False, False)]),
+    ('**a*', [('*', False, False), ('a', False, True)]),
+])
+def test_emphasis(text, expected):
+    assert [run[:3] for run in _runs(text)] == expected
+
+
+def test_base_format_applies_to_every_run():
+    assert [run[:3] for run in _runs('a *b*', bold=True)] == [('a ', True, False), ('b', True, True)]
+
+
+@pytest.mark.parametrize('text, code', [
+    ('`code`', 'code'),
+    ('`` a`b ``', 'a`b'),
+    ('` `` `', '``'),
+    ('`  `', '  '),
+    ('`a\nb`', 'a b'),
+    # 代码里的强调、链接和转义不解析
+    ('`**x** [y](z) \\*`', '**x** [y](z) \\*'),
+])
+def test_code_span(text, code):
+    assert _runs(text, code_font='Mono') == [(code, False, False, 'Mono', None, None)]
+
+
+def test_unmatched_backticks_are_literal():
+    assert _runs('``a`') == [('``a`', False, False, None, None, None)]
+
+
+def test_code_span_binds_tighter_than_emphasis():
+    assert [run[:4] for run in _runs('*a `*` b*')] == [
+        ('a ', False, True, None), ('*', False, True, 'Consolas'), (' b', False, True, None)]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('[文字](http://example.com)', [('文字', 'FF0000')]),
+    ('见 [a *b*](u) 处', [('见 ', None), ('a ', 'FF0000'), ('b', 'FF0000'), (' 处', None)]),
+    # 括号成对时 URL 里可以有括号
+    ('[x](http://e.com/a_(b)) y', [('x', 'FF0000'), (' y', None)]),
+    # 不是链接的方括号原样保留
+    ('[不是链接] 与 [x] (y)', [('[不是链接] 与 [x] (y)', None)]),
+    # 段落中间的图片只保留替代文字
+    ('前 ![图](a.png) 后', [('前 图 后', None)]),
+])
+def test_links(text, expected):
+    assert [(run[0], run[5]) for run in _runs(text, link_color='FF0000')] == expected
+
+
+def test_nested_links_are_not_allowed():
+    assert [(run[0], run[5]) for run in _runs('[a [b](u) c](v)', link_color='00F')] == [
+        ('[a ', None), ('b', '00F'), (' c](v)', None)]
+
+
+def test_escapes():
+    assert _runs('\\*不是强调\\* \\` \\[x\\]') == [('*不是强调* ` [x]', False, False, None, None, None)]
+    # 反斜杠后面不是 ASCII 标点时保留
+    assert _runs('C:\\路径') == [('C:\\路径', False, False, None, None, None)]
+
+
+def test_clean_skips_code_spans():
+    runs = _runs('<b>x</b> `<div>`', clean=lambda text: text.replace('<b>', '').replace('</b>', ''))
+    assert [run[0] for run in runs] == ['x ', '<div>']
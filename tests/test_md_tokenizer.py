@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""md_tokenizer：块的切分、表格与围栏代码"""
+import io
+
+import pytest
+
+from md_tokenizer import (CODE, HEADING, IMAGE, LIST_ITEM, PARAGRAPH, QUOTE, RULE, TABLE, TABLE_ROW, Block,
+                          group_tables, iter_blocks, parse_alignments, split_table_cells)
+
+
+def _blocks(markdown):
+    return list(iter_blocks(io.StringIO(markdown)))
+
+
+def _tables(markdown):
+    return list(group_tables(iter_blocks(io.StringIO(markdown))))
+
+
+@pytest.mark.parametrize('markdown, expected', [
+    ('# 一级\n', Block(HEADING, '一级', 1)),
+    ('## 收尾井号 ##\n', Block(HEADING, '收尾井号', 2)),
+    ('###### 六级\n', Block(HEADING, '六级', 6)),
+    ('####### 七级\n', Block(PARAGRAPH, '####### 七级')),
+    ('#没有空格\n', Block(PARAGRAPH, '#没有空格')),
+])
+def test_headings(markdown, expected):
+    assert _blocks(markdown) == [expected]
+
+
+def test_paragraph_lines_are_joined():
+    assert _blocks('第一行\n第二行\n\n另一段\n') == [
+        Block(PARAGRAPH, '第一行\n第二行'), Block(PARAGRAPH, '另一段')]
+
+
+def test_lists_quotes_and_rules():
+    assert _blocks('- 项\n  - 子项\n* 星号\n10) 十\n\n> 引用\n> 续行\n\n***\n') == [
+        Block(LIST_ITEM, '项', 0),
+        Block(LIST_ITEM, '子项', 1),
+        Block(LIST_ITEM, '星号', 0),
+        Block(LIST_ITEM, '十', 0, '10'),
+        Block(QUOTE, '引用\n续行', 1),
+        Block(RULE),
+    ]
+
+
+@pytest.mark.parametrize('markdown, expected', [
+    ('```go\nx  := 1\n\n```\n', Block(CODE, 'x  := 1\n', 0, 'go')),
+    # 围栏里的 # 和 - 不再分词
+    ('```\n# 不是标题\n- 不是列表\n```\n', Block(CODE, '# 不是标题\n- 不是列表')),
+    # ~~~ 围栏不能被 ``` 关闭
+    ('~~~python\n```\n~~~\n', Block(CODE, '```', 0, 'python')),
+    # 没有闭合的围栏延续到文件末尾
+    ('```\n未闭合\n', Block(CODE, '未闭合')),
+])
+def test_fenced_code(markdown, expected):
+    assert _blocks(markdown) == [expected]
+
+
+def test_standalone_image():
+    assert _blocks('![替代文字](<shots/a b.png> "标题")\n') == [Block(IMAGE, '替代文字', 0, 'shots/a b.png')]
+
+
+@pytest.mark.parametrize('line, cells', [
+    ('| a | b |', ('a', 'b')),
+    ('a | b', ('a', 'b')),
+    ('| a \\| b | c |', ('a | b', 'c')),
+    ('| 末尾转义 \\|', ('末尾转义 |',)),
+    ('|  |', ('',)),
+])
+def test_split_table_cells(line, cells):
+    assert split_table_cells(line) == cells
+
+
+def test_parse_alignments():
+    assert parse_alignments('|:--|:-:|--:|---|') == ('left', 'center', 'right', None)
+
+
+def test_table_rows_and_alignment():
+    assert _blocks('| a | b \\| c | d |\n|:--|:-:|--:|\n| 1 | 2 |\n') == [
+        Block(TABLE_ROW, '', 1, ('a', 'b | c', 'd'), ('left', 'center', 'right')),
+        Block(TABLE_ROW, '', 0, ('1', '2')),
+    ]
+
+
+def test_group_tables_splits_on_new_header():
+    tables = _tables('段落\n| a |\n|---|\n| 1 |\n\n| b |\n|---|\n| 2 |\n')
+    assert tables == [
+        Block(PARAGRAPH, '段落'),
+        Block(TABLE, '', 1, (('a',), ('1',)), (None,)),
+        Block(TABLE, '', 1, (('b',), ('2',)), (None,)),
+    ]
+
+
+def test_table_without_delimiter_has_no_header():
+    assert _tables('| a | b |\n| 1 | 2 |\n') == [Block(TABLE, '', 0, (('a', 'b'), ('1', '2')))]
+
+
+def test_streaming_matches_whole_text():
+    markdown = ''.join(f'## 第 {i} 节\n\n正文 {i}\n\n| x | {i} |\n|---|---|\n\n```\ncode {i}\n```\n'
+                       for i in range(50))
+    lines = io.StringIO(markdown).readlines()
+    assert list(iter_blocks(iter(lines))) == _blocks(markdown)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""parallel_zip 延后生成的条目，以及快速通道只登记用到的图片内容类型"""
+import io
+import zipfile
+
+import pytest
+from docx import Document
+
+from image_embed import ImageStore, add_image_types
+from ooxml_writer import CONTENT_TYPES_PART, read_template, write_package
+from parallel_zip import write_zip
+
+
+@pytest.mark.parametrize('compression', [zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED])
+def test_deferred_entry_keeps_its_position(compression):
+    seen = []
+
+    def stream():
+        for i in range(3):
+            seen.append(i)
+            yield b'x' * 1000
+
+    entries = [
+        ('first', lambda: b'seen %d' % len(seen)),
+        ('stream', stream()),
+        ('bytes', b'data'),
+    ]
+    out = io.BytesIO()
+    write_zip(out, entries, compression, chunk_size=1024)
+    with zipfile.ZipFile(out) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ['first', 'stream', 'bytes']
+        # 调用时流已经读完
+        assert zf.read('first') == b'seen 3'
+        assert zf.read('bytes') == b'data'
+
+
+def _template_bytes():
+    buf = io.BytesIO()
+    Document().save(buf)
+    return buf.getvalue()
+
+
+def test_image_free_package_keeps_template_content_types(tmp_path):
+    template = read_template(_template_bytes())
+    out = str(tmp_path / 'out.docx')
+    write_package(template, [], out, images=ImageStore(template.block_width, cache_dir=None))
+    with zipfile.ZipFile(out) as zf:
+        assert zf.testzip() is None
+        assert zf.read(CONTENT_TYPES_PART) == dict(template.parts)[CONTENT_TYPES_PART]
+
+
+def test_add_image_types_registers_only_used_extensions():
+    content_types = dict(read_template(_template_bytes()).parts)[CONTENT_TYPES_PART]
+    assert add_image_types(content_types, set()) == content_types
+    added = add_image_types(content_types, {'png'})
+    assert added.count(b'Extension="png"') == 1
+    assert b'Extension="gif"' not in added
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""parse_cache：命中、失效与损坏条目的回退"""
+import glob
+import os
+
+import pytest
+
+import convert_final
+from md_tokenizer import iter_file_blocks
+from parse_cache import BATCH_BLOCKS, cached_file_blocks, cached_text_blocks
+
+SAMPLE = ''.join(
+    f'## 第 {i} 节\n\n正文 **粗体** 与 `code` 第 {i} 段。\n\n- 列表 {i}\n\n```go\nfunc f{i}() {{}}\n```\n\n'
+    for i in range(BATCH_BLOCKS)
+)
+
+
+@pytest.fixture
+def md_file(tmp_path):
+    path = tmp_path / 'doc.md'
+    path.write_text(SAMPLE, encoding='utf-8')
+    return str(path)
+
+
+def _entries(cache_dir):
+    return glob.glob(os.path.join(cache_dir, 'parse', '*', '*.blk'))
+
+
+def test_hit_returns_same_blocks(md_file, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    expected = list(iter_file_blocks(md_file))
+    stats = {}
+    assert list(cached_file_blocks(md_file, cache_dir, stats=stats)) == expected
+    assert list(cached_file_blocks(md_file, cache_dir, stats=stats)) == expected
+    assert stats == {'hits': 1, 'misses': 1}
+
+
+def test_changed_source_misses(md_file, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    list(cached_file_blocks(md_file, cache_dir))
+    with open(md_file, 'a', encoding='utf-8') as f:
+        f.write('新增一段\n')
+    stats = {}
+    assert list(cached_file_blocks(md_file, cache_dir, stats=stats)) == list(iter_file_blocks(md_file))
+    assert stats == {'hits': 0, 'misses': 1}
+
+
+def test_text_and_file_keys_differ(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    list(cached_text_blocks('a\r\nb\r\n', cache_dir))
+    assert len(_entries(cache_dir)) == 1
+    stats = {}
+    list(cached_text_blocks('a\r\nb\r\n', cache_dir, stats=stats))
+    assert stats['hits'] == 1
+
+
+@pytest.mark.parametrize('damage', ['truncate', 'corrupt', 'header'])
+def test_damaged_entry_falls_back_to_parsing(md_file, tmp_path, damage):
+    cache_dir = str(tmp_path / 'cache')
+    expected = list(iter_file_blocks(md_file))
+    list(cached_file_blocks(md_file, cache_dir))
+    (entry,) = _entries(cache_dir)
+    with open(entry, 'rb') as f:
+        data = f.read()
+    if damage == 'truncate':
+        data = data[:len(data) * 2 // 3]
+    elif damage == 'corrupt':
+        middle = len(data) * 2 // 3
+        data = data[:middle] + bytes(b ^ 0xFF for b in data[middle:middle + 64]) + data[middle + 64:]
+    else:
+        data = b'XXXX' + data[4:]
+    with open(entry, 'wb') as f:
+        f.write(data)
+
+    stats = {}
+    assert list(cached_file_blocks(md_file, cache_dir, stats=stats)) == expected
+    assert stats == {'hits': 0, 'misses': 1}
+    # 重新写入的条目可以正常命中
+    stats = {}
+    assert list(cached_file_blocks(md_file, cache_dir, stats=stats)) == expected
+    assert stats == {'hits': 1, 'misses': 0}
+
+
+def test_conversion_survives_truncated_entry(md_file, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    out = str(tmp_path / 'doc.docx')
+    convert_final.markdown_to_docx(md_file, out, cache_dir=cache_dir)
+    (entry,) = _entries(cache_dir)
+    with open(entry, 'r+b') as f:
+        f.truncate(os.path.getsize(entry) // 2)
+    os.remove(out)
+    convert_final.markdown_to_docx(md_file, out, cache_dir=cache_dir)
+    assert os.path.getsize(out) > 0
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""section_cache：章节切分、命中与失效、损坏片段的回退、目录大小上限"""
+import contextlib
+import glob
+import io
+import os
+
+import pytest
+from docx import Document
+
+import convert_final
+from md_tokenizer import HEADING, PARAGRAPH, TABLE_ROW, Block, iter_blocks
+from section_cache import evict_if_needed, iter_cached_xml, iter_sections, write_atomic
+
+SAMPLE = ''.join(f'## 第 {i} 节\n\n正文 **粗体** 第 {i} 段。\n\n| a | {i} |\n|---|---|\n\n' for i in range(20))
+
+
+def _blocks(markdown):
+    return list(iter_blocks(io.StringIO(markdown)))
+
+
+def _render(section):
+    return ''.join(f'<w:p>{block.text}</w:p>' for block in section)
+
+
+def _xml(markdown, cache_dir, namespace='test/1', stats=None):
+    return b''.join(iter_cached_xml(_blocks(markdown), _render, namespace, cache_dir, stats))
+
+
+def _fragments(cache_dir):
+    return sorted(glob.glob(os.path.join(cache_dir, 'sections', '*', '*.xml')))
+
+
+def test_sections_split_at_headings():
+    blocks = [Block(PARAGRAPH, '前言'), Block(HEADING, 'a', 1), Block(PARAGRAPH, 'x'), Block(HEADING, 'b', 2)]
+    assert list(iter_sections(blocks)) == [blocks[:1], blocks[1:3], blocks[3:]]
+
+
+def test_long_sections_are_split_but_tables_are_not():
+    rows = [Block(TABLE_ROW, '', 1, ('表头',))] + [Block(TABLE_ROW, '', 0, ('x' * 10,))] * 5
+    blocks = [Block(PARAGRAPH, 'y' * 10)] * 3 + rows + [Block(PARAGRAPH, 'z')]
+    sections = list(iter_sections(blocks, max_chars=15))
+    assert sum(sections, []) == blocks
+    assert len(sections) > 2
+    # 超长后只在表格之外切开，整张表留在同一段里
+    assert [section for section in sections if rows[0] in section] == [[blocks[2]] + rows]
+
+
+def test_second_run_hits_every_section(tmp_path):
+    cache_dir = str(tmp_path)
+    first, second = {}, {}
+    assert _xml(SAMPLE, cache_dir, stats=first) == _xml(SAMPLE, cache_dir, stats=second)
+    assert first == {'hits': 0, 'misses': 20}
+    assert second == {'hits': 20, 'misses': 0}
+
+
+def test_only_changed_section_is_rendered_again(tmp_path):
+    cache_dir = str(tmp_path)
+    _xml(SAMPLE, cache_dir)
+    stats = {}
+    changed = SAMPLE.replace('第 7 段', '第七段')
+    assert _xml(changed, cache_dir, stats=stats) == _xml(changed, None)
+    assert stats == {'hits': 19, 'misses': 1}
+
+
+def test_namespace_change_invalidates_everything(tmp_path):
+    cache_dir = str(tmp_path)
+    _xml(SAMPLE, cache_dir, 'test/1')
+    stats = {}
+    _xml(SAMPLE, cache_dir, 'test/2', stats)
+    assert stats == {'hits': 0, 'misses': 20}
+
+
+def test_image_sections_are_not_cached(tmp_path):
+    cache_dir = str(tmp_path)
+    stats = {}
+    _xml('# 图\n\n![a](a.png)\n\n# 文\n\n正文\n', cache_dir, stats=stats)
+    _xml('# 图\n\n![a](a.png)\n\n# 文\n\n正文\n', cache_dir, stats=stats)
+    assert stats == {'hits': 1, 'misses': 3}
+    assert len(_fragments(cache_dir)) == 1
+
+
+@pytest.mark.parametrize('damage', [
+    lambda data: data[:len(data) // 2],
+    lambda data: data[:-1],
+    lambda data: data.replace(b'<w:p>', b'<w:q>', 1),
+    lambda data: b'',
+], ids=['truncated', 'last-byte', 'altered', 'empty'])
+def test_damaged_fragment_is_rendered_again(tmp_path, damage):
+    cache_dir = str(tmp_path)
+    expected = _xml(SAMPLE, cache_dir)
+    path = _fragments(cache_dir)[0]
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(damage(data))
+    stats = {}
+    assert _xml(SAMPLE, cache_dir, stats=stats) == expected
+    assert stats == {'hits': 19, 'misses': 1}
+    # 损坏的片段已被重新写好
+    with open(path, 'rb') as f:
+        assert f.read() == data
+
+
+@pytest.mark.parametrize('fast', [True, False], ids=['ooxml', 'python-docx'])
+def test_conversion_survives_damaged_fragments(tmp_path, fast):
+    md_file = tmp_path / 'doc.md'
+    md_file.write_text(SAMPLE, encoding='utf-8')
+    cache_dir = str(tmp_path / 'cache')
+    out = str(tmp_path / 'out.docx')
+    with contextlib.redirect_stdout(io.StringIO()):
+        convert_final.markdown_to_docx(str(md_file), out, cache_dir=cache_dir, fast=fast)
+        expected = [p.text for p in Document(out).paragraphs]
+        for path in _fragments(cache_dir):
+            with open(path, 'r+b') as f:
+                f.truncate(os.path.getsize(path) // 2)
+        convert_final.markdown_to_docx(str(md_file), out, cache_dir=cache_dir, fast=fast)
+    assert [p.text for p in Document(out).paragraphs] == expected
+
+
+def test_directory_is_kept_under_limit(tmp_path):
+    root = str(tmp_path / 'sections')
+    for i in range(30):
+        path = os.path.join(root, 'ab', f'{i:02}.xml')
+        write_atomic(path, b'x' * 100)
+        evict_if_needed(root, '.xml', 1000, 100, keep=path)
+    names = sorted(os.listdir(os.path.join(root, 'ab')))
+    assert len(names) <= 10
+    # 最新写入的条目保留，最旧的先被淘汰
+    assert names[-1] == '29.xml'
+    assert '00.xml' not in names
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+单次扫描的 HTML 标签清理与实体解码
+
+Markdown 原文里夹带的行内 HTML（<br>、<strong>、<span> 等）和实体（&gt;、&#39;、&nbsp; 等）
+用一条预编译的交替正则一次扫完：标签直接去掉（<br> 变成换行），实体交给 html.unescape。
+只删除常见的 HTML 标签名，代码里的 Vec<T>、List<String> 之类不会被误删。
+
+直接运行本文件会跑一个微基准，对比旧的逐个 str.replace 写法：
+    python text_cleanup.py
+"""
+import html
+import re
+import time
+
+_TAG_NAMES = frozenset((
+    'a b i u s p br hr em strong del ins mark small big sup sub code kbd '
+    'span div font center ul ol li dl dt dd h1 h2 h3 h4 h5 h6 blockquote pre '
+    'table thead tbody tr th td img'
+).split())
+
+# 标签名先宽松匹配，再在回调里查表决定是否删除，比把所有标签名写进交替分支快一倍
+_CLEAN_RE = re.compile(
+    r'<(?:/?([A-Za-z][A-Za-z0-9]*)[^<>]*|!--.*?--)>'
+    r'|&(?:#[0-9]{1,7}|#[xX][0-9a-fA-F]{1,6}|[A-Za-z][A-Za-z0-9]{1,31});'
+)
+
+# 同一个标签/实体的替换结果只算一次
+_cache = {}
+
+
+def _replace(match):
+    text = match.group(0)
+    result = _cache.get(text)
+    if result is None:
+        if text[0] == '&':
+            result = html.unescape(text)
+        else:
+            name = match.group(1)
+            if name is None:
+                result = ''
+            else:
+                name = name.lower()
+                if name not in _TAG_NAMES:
+                    result = text
+                elif name == 'br':
+                    result = '\n'
+                else:
+                    result = ''
+        if len(_cache) < 4096:
+            _cache[text] = result
+    return result
+
+
+def clean_line(line):
+    """去掉行内 HTML 标签并解码实体，整行只扫描一次"""
+    if '<' not in line and '&' not in line:
+        return line
+    return _CLEAN_RE.sub(_replace, line)
+
+
+def _legacy_clean(line):
+    """旧写法：逐个标签 str.replace，再逐个实体 str.replace（仅供基准对比）"""
+    for tag in ['<h1>', '</h1>', '<h2>', '</h2>', '<h3>', '</h3>',
+                '<p>', '</p>', '<strong>', '</strong>', '<em>', '</em>',
+                '<br>', '<ul>', '</ul>', '<li>', '</li>']:
+        line = line.replace(tag, '')
+    entities = {'&gt;': '>', '&lt;': '<', '&amp;': '&', '&quot;': '"'}
+    for entity, char in entities.items():
+        line = line.replace(entity, char)
+    return line
+
+
+def benchmark(lines=2000, repeat=5):
+    """在长中文行上对比 clean_line 与旧写法，返回 (旧耗时, 新耗时) 秒"""
+    prose = '在AI编程助手的战场上，我们正在见证一个微妙却关键的转折点。'
+    samples = [
+        prose * 20,
+        '<p><strong>核心更新点</strong>：' + prose * 15 + ' A &gt; B &amp; C</p>',
+        '<li>' + prose * 10 + '<em>跨语言</em>代码转换&quot;能力&quot;</li>',
+    ]
+    data = [samples[i % len(samples)] for i in range(lines)]
+
+    def best_of(func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for line in data:
+                func(line)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    return best_of(_legacy_clean), best_of(clean_line)
+
+
+if __name__ == '__main__':
+    legacy, compiled = benchmark()
+    print(f"旧写法（逐个 replace）: {legacy * 1000:.2f} ms")
+    print(f"单次扫描 clean_line : {compiled * 1000:.2f} ms")
+    print(f"加速比: {legacy / compiled:.2f}x")
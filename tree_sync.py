@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+按清单增量同步目录
+
+目标目录里保存一份清单（MANIFEST_NAME），记录上次同步时每个文件的
+相对路径、源文件大小、mtime_ns、内容 SHA-256，以及复制后目标文件的 mtime_ns。
+再次同步时先比较 stat：源和目标都与清单一致的文件直接跳过，不读内容；
+stat 变了才算哈希，内容没变的只同步时间戳，真正变化的文件才复制（先写临时文件再改名），
+复制由 fast_copy.FastCopier 按文件系统选用 reflink / copy_file_range / sendfile / 硬链接。
+目录用 os.scandir 遍历，目标目录预先建好，各文件交给有上限的线程池并发处理。
+遍历时按 ignore_rules.IgnoreRules 排除：被排除的目录整棵跳过，里面的文件不会被 stat。
+被排除的路径不算“源里已删除”，目标里已有的副本保持不动。
+传入 delta_copy.DeltaOptions 时，目标里已有旧版本的大文件用 rsync 式增量复制，只写变化的块。
+清单里有、源里已经没有的文件视为已删除：目标文件没被改动过就删掉，改动过的保留并报告。
+清单之外的目标文件（不是同步写进去的）一概不碰。
+"""
+import hashlib
+import json
+import os
+import shutil
+import posixpath
+import stat
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from delta_copy import delta_copy
+from fast_copy import FastCopier
+
+MANIFEST_NAME = '.sync_manifest.json'
+MANIFEST_VERSION = 1
+
+_HASH_CHUNK = 1024 * 1024
+
+# 复制主要在等系统调用（网络盘、overlay 上尤其慢），线程数可以比 CPU 核数多
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# size / mtime_ns / digest 为源文件的；dst_mtime_ns 为复制后目标文件的 mtime（目标文件系统的时间精度可能更粗）
+Entry = namedtuple('Entry', ['size', 'mtime_ns', 'digest', 'dst_mtime_ns'])
+
+# 各项为相对路径列表：copied 复制了内容，touched 只同步了时间戳，unchanged 未变化，
+# deleted 已从目标删除，kept 源已删除但目标被改动过所以保留，
+# excluded 被排除规则跳过的文件和目录（目录不展开）；methods 为 {复制方式: 文件数}；
+# bytes 为复制的文件总大小，saved 为其中增量复制时从目标旧版本复用、不必从源传输的字节数；
+# failed 为同步出错的 [(相对路径, 错误说明)]，这些文件的清单条目保持原样，下次同步重新检查
+SyncResult = namedtuple('SyncResult', ['copied', 'touched', 'unchanged', 'deleted', 'kept', 'excluded',
+                                       'bytes', 'methods', 'saved', 'failed'])
+
+
+def file_digest(path):
+    """文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(dst_base):
+    """读取目标目录里的清单，返回 {相对路径: Entry}；没有或版本不符时返回空字典"""
+    try:
+        with open(os.path.join(dst_base, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get('version') != MANIFEST_VERSION:
+        return {}
+    return {path: Entry(*fields) for path, fields in data.get('files', {}).items()}
+
+
+def save_manifest(dst_base, manifest):
+    path = os.path.join(dst_base, MANIFEST_NAME)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    data = {'version': MANIFEST_VERSION,
+            'files': {rel: list(entry) for rel, entry in sorted(manifest.items())}}
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def _walk(src_base, rel_dir, rules, excluded):
+    """递归列出目录下的文件，产出 (相对路径, stat)；相对路径统一用 / 分隔"""
+    with os.scandir(os.path.join(src_base, rel_dir)) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    for entry in entries:
+        rel = f'{rel_dir}/{entry.name}'
+        # is_dir 用目录项自带的类型，不需要 stat；被排除的目录不进入
+        is_dir = entry.is_dir(follow_symlinks=False)
+        if rules is not None and rules.excluded(rel, is_dir):
+            excluded.append(rel + '/' if is_dir else rel)
+            continue
+        if is_dir:
+            yield from _walk(src_base, rel, rules, excluded)
+        elif entry.is_file():
+            yield rel, entry.stat()
+
+
+def iter_sources(src_base, files=(), dirs=(), rules=None, excluded=None):
+    """
+    列出要同步的源文件，产出 (相对路径, stat)
+
+    files 中不存在的文件、dirs 中不存在的目录产出 (相对路径, None)，由调用方报告。
+    rules 为 ignore_rules.IgnoreRules 时跳过被排除的路径，excluded 若是列表会记下跳过的路径。
+    """
+    if excluded is None:
+        excluded = []
+    for rel in files:
+        if rules is not None and rules.excluded_path(rel):
+            excluded.append(rel)
+            continue
+        try:
+            st = os.stat(os.path.join(src_base, rel))
+        except FileNotFoundError:
+            yield rel, None
+            continue
+        yield rel, st
+    for rel in dirs:
+        if rules is not None and rules.excluded_path(rel, True):
+            excluded.append(rel + '/')
+            continue
+        if not os.path.isdir(os.path.join(src_base, rel)):
+            yield rel + '/', None
+            continue
+        yield from _walk(src_base, rel, rules, excluded)
+
+
+def _dst_matches(entry, dst_st):
+    return (entry is not None and dst_st is not None
+            and dst_st.st_size == entry.size and dst_st.st_mtime_ns == entry.dst_mtime_ns)
+
+
+def _copy_file(src, dst, copier):
+    """复制内容和时间戳，返回复制方式：先写同目录的临时文件再改名，中途失败不会留下半个文件"""
+    tmp_path = f'{dst}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        method = copier.copy(src, tmp_path)
+        os.replace(tmp_path, dst)
+        return method
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _make_dirs(dst_base, rel_dirs):
+    """预先建好目标目录（浅的在前），复制时各线程不用再检查、创建上级目录"""
+    os.makedirs(dst_base, exist_ok=True)
+    for rel in sorted(rel_dirs, key=lambda d: (d.count('/'), d)):
+        if rel:
+            os.makedirs(os.path.join(dst_base, rel), exist_ok=True)
+
+
+def _sync_file(src_base, dst_base, rel, st, entry, dry_run, copier, delta):
+    """
+    同步单个文件，返回 (操作, 新的清单条目, 复制方式, 增量复制复用的字节数)
+
+    操作为 'unchanged'、'touched' 或 'copied'；只读写 rel 自己的文件，可以在线程池里并发执行。
+    """
+    src = os.path.join(src_base, rel)
+    dst = os.path.join(dst_base, rel)
+    try:
+        dst_st = os.stat(dst)
+    except FileNotFoundError:
+        dst_st = None
+
+    # 源和目标的 stat 都与清单一致：不读内容直接跳过
+    if (entry is not None and st.st_size == entry.size and st.st_mtime_ns == entry.mtime_ns
+            and _dst_matches(entry, dst_st)):
+        return 'unchanged', entry, None, 0
+
+    digest = file_digest(src)
+    # 目标内容已经一致（只是时间戳变了，或是清单建立之前就复制过的文件）：只同步时间戳
+    same = dst_st is not None and dst_st.st_size == st.st_size and (
+        entry.digest == digest if _dst_matches(entry, dst_st) else file_digest(dst) == digest)
+    saved = 0
+    if same:
+        action, method = 'touched', None
+        if not dry_run:
+            shutil.copystat(src, dst)
+    elif dry_run:
+        action, method = 'copied', 'dry-run'
+    elif (delta is not None and st.st_size >= delta.min_size and dst_st is not None
+          and stat.S_ISREG(dst_st.st_mode) and copier.chain[0] != 'hardlink'):
+        # 目标里有旧版本：以它为基准增量复制（硬链接镜像直接重新链接更省）
+        action, method = 'copied', 'delta'
+        saved = delta_copy(src, dst, delta.inplace).matched
+    else:
+        action, method = 'copied', _copy_file(src, dst, copier)
+    dst_mtime_ns = st.st_mtime_ns if dry_run else os.stat(dst).st_mtime_ns
+    return action, Entry(st.st_size, st.st_mtime_ns, digest, dst_mtime_ns), method, saved
+
+
+def _attempt(func, *args):
+    """执行 func，出错时返回 ('failed', 错误说明, None, 0)，单个文件失败不影响其余文件"""
+    try:
+        return func(*args)
+    except Exception as e:
+        return 'failed', f'{type(e).__name__}: {e}', None, 0
+
+
+def _finished_manifest(old, outcomes):
+    """已完成文件的新条目，叠加在旧清单上（没轮到或失败的文件沿用旧条目）"""
+    manifest = dict(old)
+    for rel, (action, entry, method, saved) in outcomes.items():
+        if action != 'failed':
+            manifest[rel] = entry
+    return manifest
+
+
+def _remove_empty_dirs(path, dst_base):
+    """删除文件后顺带删掉变空的上级目录，到 dst_base 为止"""
+    parent = os.path.dirname(path)
+    while os.path.normpath(parent) != os.path.normpath(dst_base):
+        try:
+            os.rmdir(parent)
+        except OSError:
+            return
+        parent = os.path.dirname(parent)
+
+
+def sync_tree(src_base, dst_base, files=(), dirs=(), delete=True, dry_run=False, log=None,
+              copier=None, workers=None, rules=None, delta=None):
+    """
+    把 src_base 下的 files 和 dirs（相对路径）增量同步到 dst_base，返回 SyncResult
+
+    delete 为假时源里已删除的文件只报告、不删除；dry_run 为真时只报告要做的操作，不改动目标目录。
+    log(message) 接收每个文件的操作说明，默认不输出。
+    copier 为 fast_copy.FastCopier，默认自动选择复制方式。
+    各文件的比较、哈希和复制在 workers 个线程里并发执行（默认 DEFAULT_WORKERS，1 表示不用线程池）；
+    单个文件出错记进 SyncResult.failed，其余文件照常同步。中途被打断时已完成的文件仍写进清单。
+    rules 为 ignore_rules.IgnoreRules，指定要排除的路径；为 None 时不排除。
+    delta 为 delta_copy.DeltaOptions 时，不小于 delta.min_size 且目标里已有旧版本的文件做增量复制。
+    """
+    log = log or (lambda message: None)
+    copier = copier or FastCopier()
+    old = load_manifest(dst_base)
+    manifest = {}
+    result = SyncResult([], [], [], [], [], [], 0, copier.stats, 0, [])
+    copied_bytes = saved_bytes = 0
+
+    sources = []
+    for rel, st in iter_sources(src_base, files, dirs, rules, result.excluded):
+        if st is None:
+            log(f'⚠️ 不存在: {rel}')
+        else:
+            sources.append((rel, st))
+    if not dry_run:
+        _make_dirs(dst_base, {posixpath.dirname(rel) for rel, st in sources})
+
+    def work(item):
+        rel, st = item
+        return _sync_file(src_base, dst_base, rel, st, old.get(rel), dry_run, copier, delta)
+
+    # {相对路径: _sync_file 的返回值}，按完成顺序收集，日志和清单仍按源文件顺序处理
+    outcomes = {}
+    workers = workers or DEFAULT_WORKERS
+    try:
+        if workers == 1 or len(sources) < 2:
+            for item in sources:
+                outcomes[item[0]] = _attempt(work, item)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(work, item): item[0] for item in sources}
+                try:
+                    for future in as_completed(futures):
+                        outcomes[futures[future]] = _attempt(future.result)
+                except BaseException:
+                    pool.shutdown(cancel_futures=True)
+                    raise
+    except BaseException:
+        # 被打断（Ctrl+C 等）：不做删除，只把已完成的文件记进清单
+        if not dry_run and outcomes:
+            save_manifest(dst_base, _finished_manifest(old, outcomes))
+        raise
+
+    for rel, st in sources:
+        action, entry, method, saved = outcomes[rel]
+        if action == 'failed':
+            if rel in old:
+                manifest[rel] = old[rel]
+            result.failed.append((rel, entry))
+            log(f'❌ 同步失败: {rel}: {entry}')
+            continue
+        manifest[rel] = entry
+        getattr(result, action).append(rel)
+        if action == 'copied':
+            copied_bytes += st.st_size
+            if method == 'delta':
+                saved_bytes += saved
+                result.methods['delta'] = result.methods.get('delta', 0) + 1
+                log(f'✅ 已复制: {rel} (delta，复用 {saved / 1024:.1f} / {st.st_size / 1024:.1f} KB)')
+            else:
+                log(f'✅ 已复制: {rel} ({method})')
+
+    for rel in sorted(set(old) - set(manifest)):
+        if rules is not None and rules.excluded_path(rel):
+            # 被排除而不是被删除：目标里的副本不动，清单照旧记着
+            manifest[rel] = old[rel]
+            continue
+        dst = os.path.join(dst_base, rel)
+        try:
+            dst_st = os.stat(dst)
+        except FileNotFoundError:
+            continue
+        if delete and _dst_matches(old[rel], dst_st):
+            if not dry_run:
+                os.remove(dst)
+                _remove_empty_dirs(dst, dst_base)
+            result.deleted.append(rel)
+            log(f'🗑️ 已删除: {rel}')
+        else:
+            # 不删除的文件留在清单里，下次同步还会报告
+            manifest[rel] = old[rel]
+            result.kept.append(rel)
+            log(f'⚠️ 源文件已删除，目标保留: {rel}')
+
+    if not dry_run and manifest != old:
+        os.makedirs(dst_base, exist_ok=True)
+        save_manifest(dst_base, manifest)
+    return result._replace(bytes=copied_bytes, saved=saved_bytes)
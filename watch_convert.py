@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+监视目录，Markdown 保存后自动重新生成对应的 DOCX
+
+转换器、样式模板、高亮和章节缓存都常驻在同一个进程里，保存一次只重新转换改动的那个文件，
+且只有改动过的章节会重新渲染。Linux 上用 inotify 监听，其他平台或 inotify 不可用时退回到轮询。
+编辑器保存时常常连续触发多个事件（写临时文件、改名、改属性），在 --debounce 时间内没有新事件后才开始转换。
+指定 -o 时在输出目录下保持与监视目录相同的子目录结构，不同目录里的同名文件不会互相覆盖。
+
+用法：
+    python watch_convert.py articles/ -c final
+    python watch_convert.py . -o docx --initial     # 启动时先把过期或缺失的 DOCX 都生成一遍
+"""
+import argparse
+import contextlib
+import ctypes
+import ctypes.util
+import importlib
+import io
+import os
+import select
+import struct
+import sys
+import time
+
+from batch_convert import CONVERTERS, output_path
+from ooxml_writer import read_template
+from style_template import get_template
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT = struct.Struct('iIII')
+
+# 不进入的目录：隐藏目录（含 .docx_cache、.git）和依赖目录
+_SKIP_DIRS = {'node_modules', '__pycache__'}
+
+
+def _skip_dir(name):
+    return name.startswith('.') or name in _SKIP_DIRS
+
+
+def _is_markdown(path):
+    return path.endswith('.md') and not os.path.basename(path).startswith('.')
+
+
+def iter_markdown(root):
+    """递归列出 root 下的 Markdown 文件"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not _skip_dir(d)]
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if _is_markdown(path):
+                yield path
+
+
+class PollingWatcher:
+    """按固定间隔扫描目录，比较修改时间和大小"""
+
+    def __init__(self, root, interval=0.5):
+        self.root = root
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for path in iter_markdown(self.root):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def wait(self, timeout):
+        """最多等待 timeout 秒，返回有变化的 Markdown 路径集合"""
+        time.sleep(min(timeout, self.interval) if timeout is not None else self.interval)
+        snapshot = self._scan()
+        changed = {path for path, stat in snapshot.items() if self._snapshot.get(path) != stat}
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """基于 Linux inotify 的递归目录监听，新建的子目录自动加入"""
+
+    def __init__(self, root):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._libc = libc
+        self.root = root
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+        self._dirs = {}
+        for dirpath, dirnames, _ in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not _skip_dir(d)]
+            self._add(dirpath)
+
+    def _add(self, path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch 失败: {path}')
+        self._dirs[wd] = path
+
+    def wait(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # 事件队列溢出，只能把所有文件都当作可能改过（转换前还会比较修改时间）
+                changed.update(iter_markdown(self.root))
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not _skip_dir(name):
+                    with contextlib.suppress(OSError):
+                        self._add(path)
+                        changed.update(iter_markdown(path))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and _is_markdown(path):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def make_watcher(root, poll=False, interval=0.5):
+    """优先使用 inotify，不可用时退回轮询"""
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root, interval)
+
+
+class WatchEngine:
+    """常驻的转换器：预先导入转换器、加载样式模板，记住每个文件上次转换时的状态"""
+
+    def __init__(self, converter='final', out_dir=None, root='.'):
+        module_name, func_name = CONVERTERS[converter]
+        module = importlib.import_module(module_name)
+        self.func = getattr(module, func_name)
+        self.out_dir = out_dir
+        self.root = os.path.abspath(root)
+        self._converted = {}
+        # 模板提前构建并拆解好，第一次保存时不用再等
+        read_template(get_template(module.CONVERTER_VERSION, module.setup_styles))
+
+    def output_for(self, md_file):
+        """输出路径；指定 out_dir 时按源文件相对 root 的目录放到 out_dir 下对应的子目录"""
+        if not self.out_dir:
+            return output_path(md_file)
+        rel_dir = os.path.relpath(os.path.dirname(os.path.abspath(md_file)), self.root)
+        return output_path(md_file, os.path.normpath(os.path.join(self.out_dir, rel_dir)))
+
+    def is_stale(self, md_file):
+        """输出不存在或比源文件旧"""
+        try:
+            return os.path.getmtime(self.output_for(md_file)) < os.path.getmtime(md_file)
+        except OSError:
+            return True
+
+    def convert(self, md_file):
+        """源文件自上次转换后有变化才转换；返回耗时秒数，未转换时返回 None"""
+        try:
+            st = os.stat(md_file)
+        except OSError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        if self._converted.get(md_file) == stamp:
+            return None
+
+        docx_file = self.output_for(md_file)
+        if self.out_dir:
+            os.makedirs(os.path.dirname(docx_file), exist_ok=True)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.func(md_file, docx_file)
+        self._converted[md_file] = stamp
+        return time.perf_counter() - start
+
+
+def convert_and_report(engine, md_file):
+    """转换一个文件并打印结果；出错只报告，不中断后续文件"""
+    try:
+        seconds = engine.convert(md_file)
+    except Exception as e:
+        print(f"❌ {time.strftime('%H:%M:%S')} {md_file}: {type(e).__name__}: {e}")
+        return
+    if seconds is not None:
+        print(f"✅ {time.strftime('%H:%M:%S')} {md_file} -> {engine.output_for(md_file)} "
+              f"({seconds * 1000:.0f}ms)")
+
+
+def watch(engine, watcher, debounce=0.15, max_delay=1.0):
+    """事件循环：收集一批变化，安静 debounce 秒（或累计等待超过 max_delay 秒）后统一转换"""
+    while True:
+        pending = watcher.wait(None)
+        if not pending:
+            continue
+        first = time.monotonic()
+        while time.monotonic() - first < max_delay:
+            more = watcher.wait(debounce)
+            if not more:
+                break
+            pending |= more
+
+        for md_file in sorted(pending):
+            convert_and_report(engine, md_file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='监视目录，Markdown 保存后自动转换为DOCX')
+    parser.add_argument('root', nargs='?', default='.', help='监视的目录（默认当前目录）')
+    parser.add_argument('-c', '--converter', choices=sorted(CONVERTERS), default='final',
+                        help='使用的转换器（默认 final）')
+    parser.add_argument('-o', '--out-dir', help='输出目录，保持监视目录的子目录结构（默认与输入文件同目录）')
+    parser.add_argument('--debounce', type=float, default=0.15,
+                        help='最后一个事件之后等待多久再转换，单位秒（默认 0.15）')
+    parser.add_argument('--poll', action='store_true', help='强制使用轮询，不用 inotify')
+    parser.add_argument('--interval', type=float, default=0.5, help='轮询间隔，单位秒（默认 0.5）')
+    parser.add_argument('--initial', action='store_true', help='启动时先转换输出缺失或过期的文件')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.root):
+        parser.error(f'目录不存在: {args.root}')
+
+    engine = WatchEngine(args.converter, args.out_dir, args.root)
+    watcher = make_watcher(args.root, args.poll, args.interval)
+    mode = 'inotify' if isinstance(watcher, InotifyWatcher) else f'轮询（{args.interval}s）'
+    print(f"👀 正在监视 {args.root}（{mode}），转换器 {args.converter}，按 Ctrl+C 退出")
+
+    if args.initial:
+        for md_file in iter_markdown(args.root):
+            if engine.is_stale(md_file):
+                convert_and_report(engine, md_file)
+
+    try:
+        watch(engine, watcher, args.debounce)
+    except KeyboardInterrupt:
+        print("\n👋 已停止监视")
+    finally:
+        watcher.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())